@@ -2,7 +2,7 @@ import argparse, importlib, os, sys, textwrap
 
 from tabulate import tabulate
 
-from library.utils import argparse_utils, iterables
+from library.utils import argparse_utils, iterables, profile_utils
 from library.utils.log_utils import log
 
 __version__ = "3.2.004"
@@ -312,6 +312,7 @@ def create_subcommands_parser() -> argparse.ArgumentParser:
             module = importlib.import_module(module_name)
             return getattr(module, function_name)()
 
+        import_func.__name__ = function_name
         subparser.set_defaults(func=import_func)
 
     def add_parser(subparsers, func, aliases=None):
@@ -370,6 +371,14 @@ def library(args=None) -> None:
         if len(sys.argv) >= 2:
             del sys.argv[1]
         try:
+            profile_args = profile_utils.argparse_profile()
+            if profile_args:
+                return profile_utils.profile_run(
+                    args.func,
+                    args.func.__name__,
+                    mode=profile_args.profiler,
+                    output_path=profile_args.profile_output,
+                )
             return args.func()
         except Exception:
             print("Bug found in", " ".join(sys.argv), file=sys.stderr)
@@ -24,10 +24,10 @@ def get_subtitle_tags(path, streams, scan_subtitles=False) -> dict:
 
     subtitles = []
     if scan_subtitles:
-        internal_subtitles = subtitle.externalize_internal_subtitles(path, streams)
+        subtitles.extend(subtitle.read_internal_subtitles(path, streams))
         external_subtitles = subtitle.get_external(path)
 
-        for subtitle_path in internal_subtitles + external_subtitles:
+        for subtitle_path in external_subtitles:
             try:
                 captions = subtitle.read_sub(subtitle_path)
             except UnicodeDecodeError:
@@ -31,6 +31,7 @@ def parse_args(action, usage):
 
     arggroups.media_scan(parser)
     parser.add_argument("--process", action="store_true")
+    arggroups.disk_space(parser)
 
     arggroups.clobber(parser)
     arggroups.process_ffmpeg(parser)
@@ -6,7 +6,7 @@ from timeit import default_timer as timer
 from library.createdb import av
 from library.files import sample_hash
 from library.mediafiles import process_ffmpeg, process_image
-from library.utils import consts, file_utils, iterables, nums, objects, processes, shell_utils, strings
+from library.utils import consts, disk_admission, file_utils, iterables, nums, objects, processes, shell_utils, strings
 from library.utils.consts import DBType
 from library.utils.log_utils import log
 
@@ -119,31 +119,42 @@ def extract_metadata(mp_args, path) -> dict[str, str | int | None] | list[dict[s
         path = m["path"] = shell_utils.rel_move(mp_args, path, str(mp_args.move))
 
     if getattr(mp_args, "process", False):
-        if objects.is_profile(mp_args, DBType.audio) and Path(path).suffix not in [".opus", ".mka"]:
-            result = process_ffmpeg.process_path(
-                mp_args,
-                path,
-                split_longer_than=2160 if mp_args.split_longer_than is None and "audiobook" in path.lower() else None,
-            )
-            if result is None:
-                return None
-            if isinstance(result, list):
-                processed_args = argparse.Namespace(**(vars(mp_args) | {"process": False}))
-                return [m for output_path in result if (m := extract_metadata(processed_args, output_path))]
-            path = m["path"] = str(result)
-        elif objects.is_profile(mp_args, DBType.video) and Path(path).suffix not in [".av1.mkv"]:
-            result = process_ffmpeg.process_path(mp_args, path)
-            if result is None:
-                return None
-            if isinstance(result, list):
-                processed_args = argparse.Namespace(**(vars(mp_args) | {"process": False}))
-                return [m for output_path in result if (m := extract_metadata(processed_args, output_path))]
-            path = m["path"] = str(result)
-        elif objects.is_profile(mp_args, DBType.image) and Path(path).suffix not in [".avif", ".avifs"]:
-            result = process_image.process_path(mp_args, path)
-            if result is None:
-                return None
-            path = m["path"] = str(result)
+        # the transcoded output is written next to the original
+        try:
+            with disk_admission.reserve(mp_args, m.get("size"), [os.path.dirname(path)]):
+                return process_media(mp_args, m, path)
+        except disk_admission.InsufficientSpace as excinfo:
+            log.error("Not processing %s: %s", path, excinfo)
+
+    return m
+
+
+def process_media(mp_args, m, path):
+    if objects.is_profile(mp_args, DBType.audio) and Path(path).suffix not in [".opus", ".mka"]:
+        result = process_ffmpeg.process_path(
+            mp_args,
+            path,
+            split_longer_than=(2160 if mp_args.split_longer_than is None and "audiobook" in path.lower() else None),
+        )
+        if result is None:
+            return None
+        if isinstance(result, list):
+            processed_args = argparse.Namespace(**(vars(mp_args) | {"process": False}))
+            return [m for output_path in result if (m := extract_metadata(processed_args, output_path))]
+        m["path"] = str(result)
+    elif objects.is_profile(mp_args, DBType.video) and Path(path).suffix not in [".av1.mkv"]:
+        result = process_ffmpeg.process_path(mp_args, path)
+        if result is None:
+            return None
+        if isinstance(result, list):
+            processed_args = argparse.Namespace(**(vars(mp_args) | {"process": False}))
+            return [m for output_path in result if (m := extract_metadata(processed_args, output_path))]
+        m["path"] = str(result)
+    elif objects.is_profile(mp_args, DBType.image) and Path(path).suffix not in [".avif", ".avifs"]:
+        result = process_image.process_path(mp_args, path)
+        if result is None:
+            return None
+        m["path"] = str(result)
 
     return m
 
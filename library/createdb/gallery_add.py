@@ -2,7 +2,7 @@ import argparse, sys
 from pathlib import Path
 
 from library import usage
-from library.createdb import gallery_backend
+from library.createdb import gallery_backend, playlist_update
 from library.mediadb import db_media, db_playlists
 from library.utils import arggroups, argparse_utils, consts, db_utils, shell_utils
 from library.utils.consts import SC
@@ -16,6 +16,8 @@ def parse_args(action, usage) -> argparse.Namespace:
     parser.set_defaults(profile=consts.DBType.image)
     parser.set_defaults(download_archive=str(Path("~/.local/share/gallerydl.sqlite3").expanduser().resolve()))
 
+    if action == SC.gallery_update:
+        arggroups.playlist_update(parser)
     arggroups.debug(parser)
 
     arggroups.database(parser)
@@ -84,7 +86,10 @@ def gallery_update(args=None) -> None:
 
     gdl_playlists = db_playlists.get_all(
         args,
+        cols=playlist_update.playlist_columns(args),
         sql_filters=["AND extractor_key NOT IN ('Local', 'reddit_praw_redditor', 'reddit_praw_subreddit')"],
     )
-    for d in gdl_playlists:
-        gallery_backend.get_playlist_metadata(args, d["path"])
+    gallery_backend.load_module_level_gallery_dl(args)  # configure once before starting worker threads
+    playlist_update.update_playlists(
+        args, gdl_playlists, lambda d: gallery_backend.get_playlist_metadata(args, d["path"])
+    )
@@ -6,7 +6,8 @@ import gallery_dl
 from gallery_dl.job import Job
 
 from library.mediadb import db_media, db_playlists
-from library.utils import consts, printing, strings
+from library.utils import consts, path_utils, printing, strings
+from library.utils.download_scheduler import db_call
 from library.utils.log_utils import log
 
 gallery_dl = None
@@ -41,7 +42,8 @@ def load_module_level_gallery_dl(args=None) -> ModuleType:
         if consts.PYTEST_RUNNING:
             gallery_dl.config.set(("extractor",), "download", False)
 
-        is_supported.extractors = gallery_dl.extractor.extractors()
+        is_supported.extractors = [ie for ie in gallery_dl.extractor.extractors() if ie.category != "generic"]
+        is_supported.domain_ies = {}
 
     if args is not None:
         is_supported.configured = True
@@ -59,7 +61,15 @@ def is_supported(url) -> bool:
     if not getattr(is_supported, "configured", False):
         raise RuntimeError("gallery_backend.is_supported() requires load_module_level_gallery_dl(args) to be called first")
 
-    return any(ie.pattern.match(url) and ie.category != "generic" for ie in is_supported.extractors)
+    # try the extractor which last matched this domain before walking the whole list
+    domain = path_utils.domain_from_url(url)
+    ie = is_supported.domain_ies.get(domain)
+    if ie is None or not ie.pattern.match(url):
+        ie = next((ie for ie in is_supported.extractors if ie.pattern.match(url)), None)
+        if ie is not None:
+            is_supported.domain_ies[domain] = ie
+
+    return ie is not None
 
 
 def parse_gdl_job_status(job_status, path, ignore_errors=False):
@@ -207,15 +217,17 @@ def get_playlist_metadata(args, playlist_path):
 
         playlists_id = None
         if is_playlist:
-            playlists_id = db_playlists.add(args, playlist_path, info)
+            playlists_id = db_call(args, db_playlists.add, args, playlist_path, info)
         else:
             log.warning("Importing playlist-less media %s", playlist_path)
 
-        if db_media.exists(args, webpath):
+        if db_call(args, db_media.exists, args, webpath):
             log.warning("Media already exists")
 
         info = {**info, "playlists_id": playlists_id, "webpath": webpath}
-        db_media.playlist_media_add(
+        db_call(
+            args,
+            db_media.playlist_media_add,
             args,
             playlist_path,
             info,
@@ -12,6 +12,7 @@ from library.utils import (
     argparse_utils,
     consts,
     devices,
+    http_cache,
     objects,
     printing,
     shell_utils,
@@ -283,23 +284,27 @@ def extractor(args, playlist_path):
         page_known = set()
         page_new = {}
         try:
+            page_links = []
             for link_dict in extract_links.get_inner_urls(args, page_path):
-                link = link_dict.pop("link")
-
-                if link == args.stop_link:
+                if link_dict["link"] == args.stop_link:
                     end_of_playlist = True
                     break
+                page_links.append(link_dict)
+
+            db_known = db_media.exists_many(args, (d["link"] for d in page_links))
+            for link_dict in page_links:
+                link = link_dict.pop("link")
 
                 if link in page_known:
                     pass
-                elif db_media.exists(args, link):
+                elif link in db_known:
                     page_known.add(link)
                     if args.category:
                         update_category(args, link)
                 else:
                     page_new[link] = objects.merge_dict_values_str(page_new.get(link) or {}, link_dict)
 
-                printing.print_overwrite(f"Page {page_count} link scan: {len(page_new)} new [{len(page_known)} known]")
+            printing.print_overwrite(f"Page {page_count} link scan: {len(page_new)} new [{len(page_known)} known]")
             print(file=sys.stderr)
 
             if not (args.backfill_pages or args.fixed_pages):
@@ -383,6 +388,7 @@ def links_add() -> None:
     else:
         if args.selenium:
             web.load_selenium(args)
+        http_cache.open_cache(args)
         try:
             playlist_count = 0
             for playlist_path in shell_utils.gen_paths(args):
@@ -394,6 +400,7 @@ def links_add() -> None:
                 playlist_count += 1
 
         finally:
+            http_cache.close_cache()
             if args.selenium:
                 web.quit_selenium(args)
 
@@ -413,6 +420,7 @@ def links_update() -> None:
     )
     if selenium_needed:
         web.load_selenium(args)
+    http_cache.open_cache(args, http_cache.default_path(args.database))
 
     try:
         playlist_count = 0
@@ -432,5 +440,6 @@ def links_update() -> None:
             playlist_count += 1
 
     finally:
+        http_cache.close_cache()
         if selenium_needed:
             web.quit_selenium(args)
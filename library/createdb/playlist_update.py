@@ -0,0 +1,73 @@
+import time
+from collections import Counter, defaultdict
+
+from library.utils import db_utils, path_utils, printing, strings
+from library.utils.download_scheduler import DownloadScheduler
+
+
+def extractor_key(d) -> str:
+    return d.get("extractor_key") or path_utils.domain_from_url(d["path"])
+
+
+def playlist_columns(args) -> str:
+    pl_columns = db_utils.columns(args, "playlists")
+    return ", ".join(s for s in ["path", "extractor_key", "extractor_config"] if s in pl_columns)
+
+
+def print_throughput(stats) -> None:
+    tbl = []
+    for key, d in sorted(stats.items(), key=lambda t: -t[1]["playlists"]):
+        tbl.append(
+            {
+                "extractor": key,
+                "playlists": d["playlists"],
+                "errors": d["errors"],
+                "new_media": d["media"],
+                "time": strings.duration_short(d["seconds"]),
+                "playlists_per_minute": f"{d['playlists'] / d['seconds'] * 60:.1f}" if d["seconds"] else "",
+            }
+        )
+    printing.table(tbl)
+
+
+def update_playlists(args, playlists, func, on_result=None) -> None:
+    """
+    Run func(playlist) for each playlist with up to --update-workers in parallel and --per-extractor
+    concurrent playlists for each extractor
+
+    func should return the number of new media or None if the playlist could not be extracted;
+    extractors which fail are backed off. on_result(playlist) is called on this thread
+    """
+    stats = defaultdict(Counter)
+
+    def run(d):
+        start = time.monotonic()
+        added = func(d)
+        return added, time.monotonic() - start
+
+    def handle_result(d, result):
+        added, seconds = result
+        key = extractor_key(d)
+        stats[key]["playlists"] += 1
+        stats[key]["errors"] += added is None
+        stats[key]["media"] += int(added or 0)
+        stats[key]["seconds"] += seconds
+        args.download_scheduler.backoff(key, failed=added is None)
+
+        if on_result is not None:
+            on_result(d)
+
+    args.download_scheduler = DownloadScheduler(
+        workers=args.update_workers,
+        per_domain=args.per_extractor,
+        domain_delay=args.extractor_delay,
+        lookahead=args.update_workers * 10,
+        key=extractor_key,
+    )
+    try:
+        args.download_scheduler.run(playlists, run, handle_result)
+    finally:
+        args.download_scheduler = None
+
+    if stats:
+        print_throughput(stats)
@@ -1,4 +1,4 @@
-import re, subprocess, tempfile
+import os, re, subprocess, tempfile, threading
 from pathlib import Path
 
 import ffmpeg
@@ -62,7 +62,10 @@ def ssa_to_markdown(text):
 def read_sub_unsafe(path):
     import pysubs2
 
-    subs = pysubs2.load(path, format_="srt")
+    return combine_captions(pysubs2.load(path, format_="srt"))
+
+
+def combine_captions(subs):
     subs.remove_miscellaneous_events()
     subs.sort()
 
@@ -111,6 +114,88 @@ def externalize_internal_subtitles(path, streams=None) -> list[str]:
     return external_paths
 
 
+def extract_all_from_video(path, stream_indexes) -> dict[int, str] | None:
+    """
+    Demux all subtitle streams in one ffmpeg run; each stream is written as SRT to its own pipe
+
+    Returns {stream_index: srt_text} or None if ffmpeg failed
+    """
+    if not stream_indexes:
+        return {}
+
+    pipes = []
+    try:
+        for _ in stream_indexes:
+            pipes.append(os.pipe())
+
+        cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-i", path]
+        for stream_index, (_read_fd, write_fd) in zip(stream_indexes, pipes, strict=True):
+            cmd.extend(["-map", f"0:{stream_index}", "-f", "srt", f"pipe:{write_fd}"])
+
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, pass_fds=[w for _r, w in pipes])
+    except BaseException:
+        for read_fd, _write_fd in pipes:
+            os.close(read_fd)
+        raise
+    finally:
+        for _read_fd, write_fd in pipes:
+            os.close(write_fd)
+
+    outputs = [b""] * len(pipes)
+
+    def read_pipe(i, read_fd):
+        with os.fdopen(read_fd, "rb") as f:
+            outputs[i] = f.read()
+
+    readers = [threading.Thread(target=read_pipe, args=(i, r), daemon=True) for i, (r, _w) in enumerate(pipes)]
+    for t in readers:
+        t.start()
+    _stdout, stderr = proc.communicate()
+    for t in readers:
+        t.join()
+
+    if proc.returncode != 0:
+        log.info("Could not extract subtitles in one pass. %s", path)
+        log.debug(stderr.decode(errors="replace"))
+        return None
+
+    return {
+        stream_index: output.decode("utf-8", errors="replace")
+        for stream_index, output in zip(stream_indexes, outputs, strict=True)
+    }
+
+
+def read_internal_subtitles(path, streams) -> list[dict]:
+    """
+    Captions of all text subtitle streams without writing temp files
+    """
+    import pysubs2
+
+    stream_indexes = [s["index"] for s in streams if is_text_subtitle_stream(s)]
+    if not stream_indexes:
+        return []
+
+    srt_texts = None
+    if os.name == "posix":
+        try:
+            srt_texts = extract_all_from_video(path, stream_indexes)
+        except OSError as excinfo:  # too many open files, etc
+            log.info("Could not extract subtitles in one pass: %s. %s", excinfo, path)
+
+    captions = []
+    if srt_texts is None:  # one ffmpeg per stream so that one bad stream does not lose the others
+        for subtitle_path in iterables.conform([extract_from_video(path, i) for i in stream_indexes]):
+            try:
+                captions.extend(read_sub(subtitle_path))
+            except UnicodeDecodeError:
+                log.warning(f"Could not decode subtitle {subtitle_path} for {path}")
+    else:
+        for srt_text in srt_texts.values():
+            captions.extend(combine_captions(pysubs2.SSAFile.from_string(srt_text, format_="srt")))
+
+    return captions
+
+
 def get_external(file) -> list[str]:
     p = Path(file)
 
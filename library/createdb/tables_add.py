@@ -35,7 +35,85 @@ def parse_args():
     return args
 
 
+def target_table(args, path, df_name, table_index, table_count) -> str:
+    if args.table_rename:
+        table = args.table_rename.replace("%n", df_name).replace("%i", str(table_index))
+    elif args.table_name == "stdin":
+        table = "stdin"
+    elif df_name.isnumeric():
+        table = Path(path).stem
+        if table_count > 1:
+            table += df_name
+    else:
+        table = df_name
+    return table
+
+
+def insert_dataframe(args, path, table, df):
+    log.info("[%s]: %s", path, table)
+
+    df = pd_utils.rename_duplicate_columns(df)
+    df[pd_utils.available_name(df, "source_path")] = "stdin" if args.table_name == "stdin" else path
+
+    skip_columns = args.skip_columns
+    primary_keys = args.primary_keys
+    if args.business_keys:
+        if not primary_keys:
+            primary_keys = list(o.name for o in args.db[table].columns if o.is_pk)
+
+        skip_columns = [*(args.skip_columns or []), *primary_keys]
+
+    selected_columns = df.columns.to_list()
+    if args.only_target_columns:
+        target_columns = args.db[table].columns_dict
+        selected_columns = [s for s in selected_columns if s in target_columns]
+    if skip_columns:
+        selected_columns = [s for s in selected_columns if s not in skip_columns]
+
+    log.info("[%s]: %s", table, selected_columns)
+    kwargs = {}
+    if args.business_keys or primary_keys:
+        source_table_pks = [s for s in (args.business_keys or primary_keys) if s in selected_columns]
+        if source_table_pks:
+            log.info("[%s]: Using %s as primary key(s)", table, ", ".join(source_table_pks))
+            kwargs["pk"] = source_table_pks
+
+    data = df.to_dict(orient="records")
+    data = ({k: v for k, v in d.items() if k in selected_columns} for d in data)
+    with args.db.conn:
+        args.db[table].insert_all(
+            data,
+            alter=True,
+            ignore=args.ignore,
+            replace=not args.ignore,
+            upsert=args.upsert,
+            **kwargs,
+        )
+
+
 def table_add(args, path):
+    mimetype = args.mimetype
+    if not (args.join_tables or args.transpose):
+        mimetype = file_utils.table_mimetype(path, mimetype)
+
+    if file_utils.has_chunked_reader(mimetype) and not (args.join_tables or args.transpose):
+        # insert one batch at a time instead of loading the whole file into memory
+        table_indexes = {}
+        for df_name, df in file_utils.read_file_to_dataframe_chunks(
+            path,
+            table_name=args.table_name,
+            table_index=args.table_index,
+            start_row=args.start_row,
+            end_row=args.end_row,
+            order_by=args.sort,
+            encoding=args.encoding,
+            mimetype=mimetype,
+            skip_headers=args.skip_headers,
+        ):
+            table_index = table_indexes.setdefault(df_name, len(table_indexes))
+            insert_dataframe(args, path, target_table(args, path, df_name, table_index, table_count=1), df)
+        return
+
     dfs = file_utils.read_file_to_dataframes(
         path,
         table_name=args.table_name,
@@ -44,61 +122,13 @@ def table_add(args, path):
         end_row=args.end_row,
         order_by=args.sort,
         encoding=args.encoding,
-        mimetype=args.mimetype,
+        mimetype=mimetype,
         join_tables=args.join_tables,
         transpose=args.transpose,
         skip_headers=args.skip_headers,
     )
     for i, (df_name, df) in enumerate(dfs):
-        if args.table_rename:
-            table = args.table_rename.replace("%n", df_name).replace("%i", str(i))
-        elif args.table_name == "stdin":
-            table = "stdin"
-        elif df_name.isnumeric():
-            table = Path(path).stem
-            if len(dfs) > 1:
-                table += df_name
-        else:
-            table = df_name
-        log.info("[%s]: %s", path, table)
-
-        df = pd_utils.rename_duplicate_columns(df)
-        df[pd_utils.available_name(df, "source_path")] = "stdin" if args.table_name == "stdin" else path
-
-        skip_columns = args.skip_columns
-        primary_keys = args.primary_keys
-        if args.business_keys:
-            if not primary_keys:
-                primary_keys = list(o.name for o in args.db[table].columns if o.is_pk)
-
-            skip_columns = [*(args.skip_columns or []), *primary_keys]
-
-        selected_columns = df.columns.to_list()
-        if args.only_target_columns:
-            target_columns = args.db[table].columns_dict
-            selected_columns = [s for s in selected_columns if s in target_columns]
-        if skip_columns:
-            selected_columns = [s for s in selected_columns if s not in skip_columns]
-
-        log.info("[%s]: %s", table, selected_columns)
-        kwargs = {}
-        if args.business_keys or primary_keys:
-            source_table_pks = [s for s in (args.business_keys or primary_keys) if s in selected_columns]
-            if source_table_pks:
-                log.info("[%s]: Using %s as primary key(s)", table, ", ".join(source_table_pks))
-                kwargs["pk"] = source_table_pks
-
-        data = df.to_dict(orient="records")
-        data = ({k: v for k, v in d.items() if k in selected_columns} for d in data)
-        with args.db.conn:
-            args.db[table].insert_all(
-                data,
-                alter=True,
-                ignore=args.ignore,
-                replace=not args.ignore,
-                upsert=args.upsert,
-                **kwargs,
-            )
+        insert_dataframe(args, path, target_table(args, path, df_name, i, len(dfs)), df)
 
 
 def tables_add():
@@ -2,7 +2,7 @@ import argparse, sys
 from pathlib import Path
 
 from library import usage
-from library.createdb import tube_backend
+from library.createdb import playlist_update, tube_backend
 from library.mediadb import db_media, db_playlists
 from library.utils import arggroups, argparse_utils, consts, db_utils, shell_utils
 from library.utils.consts import SC
@@ -16,6 +16,8 @@ def parse_args(action, usage) -> argparse.Namespace:
     arggroups.download_subtitle(parser)
     parser.set_defaults(download_archive=str(Path("~/.local/share/yt_archive.txt").expanduser().resolve()))
 
+    if action == SC.tube_update:
+        arggroups.playlist_update(parser)
     arggroups.debug(parser)
 
     arggroups.database(parser)
@@ -93,14 +95,14 @@ def tube_update(args=None) -> None:
 
     tube_playlists = db_playlists.get_all(
         args,
+        cols=playlist_update.playlist_columns(args),
         sql_filters=[
             "AND coalesce(extractor_key, '') NOT IN ('Local', 'reddit_praw_redditor', 'reddit_praw_subreddit')"
         ],
     )
 
-    print("Checking", len(tube_playlists), "playlists for updates")
-    for d in tube_playlists:
-        tube_backend.get_playlist_metadata(
+    def update_playlist(d):
+        return tube_backend.get_playlist_metadata(
             args,
             d["path"],
             tube_backend.tube_opts(
@@ -110,6 +112,11 @@ def tube_update(args=None) -> None:
             ),
         )
 
+    def get_extra_metadata(d):
         if args.extra or args.subs or args.auto_subs:
             log.warning("[%s]: Getting extra metadata", d["path"])
             tube_backend.get_extra_metadata(args, d["path"], playlist_dl_opts=d.get("extractor_config", "{}"))
+
+    print("Checking", len(tube_playlists), "playlists for updates")
+    tube_backend.load_module_level_yt_dlp()  # import once before starting worker threads
+    playlist_update.update_playlists(args, tube_playlists, update_playlist, on_result=get_extra_metadata)
@@ -1,4 +1,4 @@
-import json, re, subprocess, sys
+import json, re, subprocess, sys, threading
 from copy import deepcopy
 from pathlib import Path
 from subprocess import CalledProcessError
@@ -16,6 +16,7 @@ from library.mediadb import db_media, db_playlists
 from library.mediafiles import media_check
 from library.utils import consts, db_utils, iterables, objects, path_utils, printing, shell_utils, sql_utils, strings
 from library.utils.consts import DBType, DLStatus, VideoArchiveError
+from library.utils.download_scheduler import db_call
 from library.utils.log_utils import Timer, log
 from library.utils.processes import FFProbe
 
@@ -112,25 +113,39 @@ def is_supported(url) -> bool:  # thank you @dbr
 
     if getattr(is_supported, "yt_ies", None) is None:
         yt_dlp = load_module_level_yt_dlp()
-        is_supported.yt_ies = yt_dlp.extractor.gen_extractors()
+        is_supported.yt_ies = [ie for ie in yt_dlp.extractor.gen_extractors() if ie.IE_NAME != "generic"]
+        is_supported.domain_ies = {}
 
-    return any(ie.suitable(url) and ie.IE_NAME != "generic" for ie in is_supported.yt_ies)
+    # try the extractor which last matched this domain before walking the whole list
+    domain = path_utils.domain_from_url(url)
+    ie = is_supported.domain_ies.get(domain)
+    if ie is None or not ie.suitable(url):
+        ie = next((ie for ie in is_supported.yt_ies if ie.suitable(url)), None)
+        if ie is not None:
+            is_supported.domain_ies[domain] = ie
+
+    return ie is not None
 
 
 playlists_of_playlists = set()
-added_media_count = 0
 
 
-def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) -> None:
+def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) -> int | None:
+    """
+    Returns the number of media added or None if the playlist could not be extracted
+
+    Database calls go through db_call so that this can run in a tube-update worker thread
+    """
     yt_dlp = load_module_level_yt_dlp()
     t = Timer()
+    added_media_count = 0
 
     class ExistingPlaylistVideoReached(yt_dlp.DownloadCancelled):
         pass
 
     class AddToArchivePP(yt_dlp.postprocessor.PostProcessor):
         def run(self, info) -> tuple[list, dict]:  # pylint: disable=arguments-renamed
-            global added_media_count
+            nonlocal added_media_count
 
             if info:
                 webpath = iterables.safe_unpack(info.get("webpage_url"), info.get("url"), info.get("original_url"))
@@ -144,7 +159,7 @@ def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) ->
                     if playlist_root:
                         if not info.get("playlist_id") or webpath == playlist_path:
                             log.warning("Importing playlist-less media %s", playlist_path)
-                        db_playlists.add(args, playlist_path, info, extractor_key=extractor_key)
+                        db_call(args, db_playlists.add, args, playlist_path, info, extractor_key=extractor_key)
                         log.debug("playlists.add %s", t.elapsed())
 
                     if args.ignore_errors:
@@ -153,24 +168,29 @@ def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) ->
                     elif webpath in playlists_of_playlists:
                         raise ExistingPlaylistVideoReached  # prevent infinite bug
 
-                    get_playlist_metadata(args, webpath, ydl_opts, playlist_root=False)
+                    added_media_count += get_playlist_metadata(args, webpath, ydl_opts, playlist_root=False) or 0
                     log.debug("get_playlist_metadata %s", t.elapsed())
                     playlists_of_playlists.add(webpath)
                     return [], info
 
                 entry = objects.dumbcopy(info)
                 if entry:
-                    if db_playlists.media_exists(args, webpath, playlist_path) and not args.ignore_errors:
+                    if (
+                        db_call(args, db_playlists.media_exists, args, webpath, playlist_path)
+                        and not args.ignore_errors
+                    ):
                         raise ExistingPlaylistVideoReached
 
                     if not info.get("playlist_id") or webpath == playlist_path:
                         log.warning("Importing playlist-less media %s", playlist_path)
                     else:
                         # add sub-playlist
-                        entry["playlists_id"] = db_playlists.add(args, playlist_path, info, extractor_key=extractor_key)
+                        entry["playlists_id"] = db_call(
+                            args, db_playlists.add, args, playlist_path, info, extractor_key=extractor_key
+                        )
                         log.debug("playlists.add2 %s", t.elapsed())
 
-                    db_media.playlist_media_add(args, webpath, entry)  # type: ignore
+                    db_call(args, db_media.playlist_media_add, args, webpath, entry)  # type: ignore
                     log.debug("media.playlist_media_add %s", t.elapsed())
 
                     added_media_count += 1
@@ -183,7 +203,7 @@ def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) ->
         ydl.add_post_processor(AddToArchivePP(), when="pre_process")
 
         log.debug("yt-dlp initialized %s", t.elapsed())
-        count_before_extract = added_media_count
+        extracted = True
         try:
             pl = ydl.extract_info(playlist_path, download=False, process=True)
             log.debug("ydl.extract_info done %s", t.elapsed())
@@ -194,14 +214,14 @@ def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) ->
                 log.warning(
                     "Could not scrape playlist metadata successfully (will try again [in a few days] during tubeupdate)"
                 )
-                db_playlists.save_undownloadable(args, playlist_path)
-            return
+                db_call(args, db_playlists.save_undownloadable, args, playlist_path)
+            return None
         except ExistingPlaylistVideoReached:
-            if added_media_count > count_before_extract:
+            if added_media_count > 0:
                 sys.stderr.write("\n")
-            db_playlists.log_problem(args, playlist_path)
+            db_call(args, db_playlists.log_problem, args, playlist_path)
         else:
-            if added_media_count > count_before_extract:
+            if added_media_count > 0:
                 sys.stderr.write("\n")
             if not pl:
                 if args.safe:
@@ -210,13 +230,16 @@ def get_playlist_metadata(args, playlist_path, ydl_opts, playlist_root=True) ->
                     log.warning(
                         "Could not scrape playlist metadata successfully (will try again [in a few days] during tubeupdate)"
                     )
-                    db_playlists.save_undownloadable(args, playlist_path)
+                    db_call(args, db_playlists.save_undownloadable, args, playlist_path)
+                extracted = False
 
         if args.action == consts.SC.tube_update:
-            if added_media_count > count_before_extract:
-                db_playlists.update_more_frequently(args, playlist_path)
+            if added_media_count > 0:
+                db_call(args, db_playlists.update_more_frequently, args, playlist_path)
             else:
-                db_playlists.update_less_frequently(args, playlist_path)
+                db_call(args, db_playlists.update_less_frequently, args, playlist_path)
+
+    return added_media_count if extracted else None
 
 
 def yt_subs_config(args):
@@ -326,10 +349,25 @@ def get_extra_metadata(args, playlist_path, playlist_dl_opts=None) -> list[dict]
         print()
 
 
-def get_video_metadata(args, playlist_path) -> dict | None:
-    yt_dlp = load_module_level_yt_dlp()
+ydl_instances = threading.local()
 
-    with yt_dlp.YoutubeDL(
+
+def get_ydl(ydl_opts):
+    """
+    A YoutubeDL instance which is reused within the current thread for the same options
+
+    Creating a YoutubeDL instance takes ~50ms so this helps when fetching metadata for many URLs
+    """
+    key = json.dumps(ydl_opts, sort_keys=True, default=str)
+    instances = ydl_instances.__dict__.setdefault("instances", {})
+    if key not in instances:
+        yt_dlp = load_module_level_yt_dlp()
+        instances[key] = yt_dlp.YoutubeDL(deepcopy(ydl_opts))  # YoutubeDL adds its defaults to the given dict
+    return instances[key]
+
+
+def get_video_metadata(args, playlist_path) -> dict | None:
+    ydl = get_ydl(
         tube_opts(
             args,
             func_opts={
@@ -342,12 +380,12 @@ def get_video_metadata(args, playlist_path) -> dict | None:
                 "noplaylist": True,
             },
         ),
-    ) as ydl:
-        entry = ydl.extract_info(playlist_path, download=False)
-        if entry and "entries" in entry:
-            entries = entry.pop("entries")[0]
-            entry = {**entry, **entries}
-        return entry
+    )
+    entry = ydl.extract_info(playlist_path, download=False)
+    if entry and "entries" in entry:
+        entries = entry.pop("entries")[0]
+        entry = {**entry, **entries}
+    return entry
 
 
 def log_error(ydl_log, webpath):
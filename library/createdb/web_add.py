@@ -16,9 +16,11 @@ from library.utils import (
     consts,
     db_utils,
     file_utils,
+    http_cache,
     iterables,
     nums,
     objects,
+    path_utils,
     printing,
     shell_utils,
     sql_utils,
@@ -26,6 +28,7 @@ from library.utils import (
     web,
 )
 from library.utils.consts import DBType
+from library.utils.download_scheduler import DownloadScheduler
 from library.utils.log_utils import log
 
 
@@ -46,6 +49,9 @@ def parse_args(action, **kwargs):
     )
     parser.add_argument("--force", "-f", action="store_true")
     parser.add_argument("--hash", action="store_true")
+    parser.add_argument(
+        "--per-domain", type=int, default=2, help="Make up to N requests to the same host at the same time"
+    )
     parser.add_argument(
         "--sizes",
         "--size",
@@ -144,107 +150,146 @@ def add_basic_metadata(args, m):
     return m
 
 
-def spider(args, paths: list):
-    original_paths = set(paths)
-    get_inner_urls = iterables.return_unique(extract_links.get_inner_urls, lambda d: d.values())
+def save_new_media(args, new_paths, status) -> int:
+    media = [consolidate_media(args, k) | (v or {}) for k, v in new_paths.items()]
+
+    # get basic metadata
+    if DBType.filesystem in args.profiles or args.hash:
+        enriched_media = []
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=1 if args.verbose >= consts.LOG_DEBUG else args.threads
+        ) as executor:
+            gen_media = (f.result() for f in [executor.submit(add_basic_metadata, args, m) for m in media])
+            for i, m in enumerate(gen_media):
+                enriched_media.append(m)
+                printing.print_overwrite(f"{status()}; basic metadata {i + 1} of {len(media)}")
+        media = enriched_media
+    if media:
+        add_media(args, media)
 
+    # get extra_metadata
+    if args.sizes:
+        media = [d for d in media if d.get("size") is None or args.sizes(d["size"])]
+
+    enriched_media = []
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=1 if args.verbose >= consts.LOG_DEBUG else args.threads
+    ) as executor:
+        gen_media = (f.result() for f in [executor.submit(add_extra_metadata, args, m) for m in media])
+        for i, m in enumerate(gen_media):
+            enriched_media.append(m)
+            printing.print_overwrite(f"{status()}; extra metadata {i + 1} of {len(media)}")
+    media = enriched_media
+    if media:
+        add_media(args, media)
+
+    return len(new_paths)
+
+
+def spider_media(args, paths: list) -> int:
     new_media_count = 0
     known_paths = set()
-    traversed_paths = set()
+
+    def status():
+        return f"Pages to scan {len(paths)} link scan: {new_media_count} new [{len(known_paths)} known]"
+
     while len(paths) > 0:
         new_paths = {}
-        path = paths.pop()
-        traversed_paths.add(path)
-        log.info("Loading %s", path)
-
-        printing.print_overwrite(
-            f"Pages to scan {len(paths)} link scan: {new_media_count} new [{len(known_paths)} known]"
-        )
-
-        if args.media:
-            paths.append(path)
-            for _ in range(args.threads * 5):  # batch
-                if len(paths) > 0:
-                    path = paths.pop()
-
-                    if args.force:
-                        new_paths[path] = None  # add key to map; title: None
-                    elif db_media.exists(args, path):
-                        known_paths.add(path)
-                    else:
-                        new_paths[path] = None  # add key to map; title: None
-
-        elif path in original_paths or web.is_index(path) or web.is_html(args, path):
+        batch = [paths.pop() for _ in range(min(args.threads * 5, len(paths)))]
+        db_known = set() if args.force else db_media.exists_many(args, batch)
+        for path in batch:
+            if path in db_known:
+                known_paths.add(path)
+            else:
+                new_paths[path] = None  # add key to map; title: None
+
+        printing.print_overwrite(status())
+        new_media_count += save_new_media(args, new_paths, status)
+        printing.print_overwrite(status())
+
+    return new_media_count
+
+
+def spider(args, paths: list) -> int:
+    """
+    Fetch index pages and HEAD candidate sub-pages in a thread pool with a per-host limit
+
+    Network requests run in worker threads; link bookkeeping and DB writes happen on this thread
+    """
+    if args.media:
+        return spider_media(args, paths)
+
+    get_inner_urls = iterables.return_unique(extract_links.get_inner_urls, lambda d: d.values())
+
+    new_media_count = 0
+    known_paths = set()
+    traversed_paths = set()
+    queued_paths = set(paths)
+    new_paths = {}
+    batch_size = args.threads * 5
+
+    scheduler = DownloadScheduler(
+        workers=1 if args.selenium or args.verbose >= consts.LOG_DEBUG else args.threads,  # one browser
+        per_domain=args.per_domain,
+        key=lambda job: path_utils.domain_from_url(job[1]),
+    )
+
+    def status():
+        return f"Pages to scan {scheduler.pending_count} link scan: {new_media_count} new [{len(known_paths)} known]"
+
+    def fetch(job):
+        kind, url, _link_dict = job
+        if kind == "page":
+            log.info("Loading %s", url)
             try:
-                link_dicts = list(get_inner_urls(args, path))
+                return list(get_inner_urls(args, url))
             except requests.HTTPError as excinfo:
                 log.error(excinfo)
-                continue
+                return []
+        return web.is_html(args, url)
 
-            log.debug("%s urls found in %s", len(link_dicts), path)
-            random.shuffle(link_dicts)
-            for _link_idx, link_dict in enumerate(link_dicts):
-                link = web.remove_apache_sorting_params(link_dict.pop("link"))
+    def on_result(job, result):
+        nonlocal new_media_count, new_paths
+        kind, path, link_dict = job
 
-                if link in traversed_paths or link in paths:
+        if kind == "page":
+            traversed_paths.add(path)
+            log.debug("%s urls found in %s", len(result), path)
+            random.shuffle(result)
+            for link_dict in result:
+                link_dict["link"] = web.remove_apache_sorting_params(link_dict["link"])
+
+            db_known = db_media.exists_many(args, (d["link"] for d in result))
+            for link_dict in result:
+                link = link_dict.pop("link")
+
+                if link in traversed_paths or link in queued_paths:
                     continue
 
-                if db_media.exists(args, link):
+                if link in db_known:
                     known_paths.add(link)
-                elif web.is_subpath(path, link) and web.is_html(args, link):
-                    log.info("queueing sub-page %s", link)
-                    paths.append(link)
+                elif web.is_subpath(path, link):
+                    queued_paths.add(link)
+                    scheduler.add(("head", link, link_dict))
                 else:
                     new_paths[link] = objects.merge_dict_values_str(new_paths.get(link) or {}, link_dict)
-
-        # not HTML page
-        elif path in traversed_paths or path in paths:
-            pass
-        elif db_media.exists(args, path):
-            known_paths.add(path)
+        elif result:
+            log.info("queueing sub-page %s", path)
+            scheduler.add(("page", path, None))
         else:
-            new_paths[path] = None  # add key to map; title: None
-
-        media = [consolidate_media(args, k) | (v or {}) for k, v in new_paths.items()]
-        new_media_count += len(media)
-
-        # get basic metadata
-        if DBType.filesystem in args.profiles or args.hash:
-            enriched_media = []
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=1 if args.verbose >= consts.LOG_DEBUG else args.threads
-            ) as executor:
-                gen_media = (f.result() for f in [executor.submit(add_basic_metadata, args, m) for m in media])
-                for i, m in enumerate(gen_media):
-                    enriched_media.append(m)
-                    printing.print_overwrite(
-                        f"Pages to scan {len(paths)} link scan: {new_media_count} new [{len(known_paths)} known]; basic metadata {i + 1} of {len(media)}"
-                    )
-            media = enriched_media
-        if media:
-            add_media(args, media)
-
-        # get extra_metadata
-        if args.sizes:
-            media = [d for d in media if d.get("size") is None or args.sizes(d["size"])]
+            new_paths[path] = link_dict
 
-        enriched_media = []
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=1 if args.verbose >= consts.LOG_DEBUG else args.threads
-        ) as executor:
-            gen_media = (f.result() for f in [executor.submit(add_extra_metadata, args, m) for m in media])
-            for i, m in enumerate(gen_media):
-                enriched_media.append(m)
-                printing.print_overwrite(
-                    f"Pages to scan {len(paths)} link scan: {new_media_count} new [{len(known_paths)} known]; extra metadata {i + 1} of {len(media)}"
-                )
-        media = enriched_media
-        if media:
-            add_media(args, media)
+        if len(new_paths) >= batch_size:
+            new_media_count += save_new_media(args, new_paths, status)
+            new_paths = {}
+        printing.print_overwrite(status())
 
-        printing.print_overwrite(
-            f"Pages to scan {len(paths)} link scan: {new_media_count} new [{len(known_paths)} known]"
-        )
+    for path in paths:
+        scheduler.add(("page", path, None))
+    scheduler.run([], fetch, on_result)
+    if new_paths:
+        new_media_count += save_new_media(args, new_paths, status)
+    printing.print_overwrite(status())
 
     return new_media_count
 
@@ -282,6 +327,7 @@ def web_add(args=None) -> None:
     else:
         if args.selenium:
             web.load_selenium(args)
+        http_cache.open_cache(args)
         try:
             if args.media:
                 spider(args, list(shell_utils.gen_paths(args)))
@@ -291,6 +337,7 @@ def web_add(args=None) -> None:
                     spider(args, [playlist_path])
 
         finally:
+            http_cache.close_cache()
             if args.selenium:
                 web.quit_selenium(args)
 
@@ -315,6 +362,7 @@ def web_update(args=None) -> None:
     selenium_needed = any(json.loads(d.get("extractor_config") or "{}").get("selenium") for d in web_playlists)
     if selenium_needed:
         web.load_selenium(args)
+    http_cache.open_cache(args, http_cache.default_path(args.database))
 
     try:
         playlist_count = 0
@@ -335,5 +383,6 @@ def web_update(args=None) -> None:
             playlist_count += 1
 
     finally:
+        http_cache.close_cache()
         if selenium_needed:
             web.quit_selenium(args)
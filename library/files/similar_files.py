@@ -1,5 +1,10 @@
 from library import usage
-from library.folders.similar_folders import cluster_folders, map_and_name
+from library.folders.similar_folders import (
+    cluster_by_leaders,
+    cluster_by_leaders_linear,
+    cluster_folders,
+    map_and_name,
+)
 from library.utils import arggroups, argparse_utils, file_utils, filter_engine, nums, printing, shell_utils, strings
 from library.utils.log_utils import log
 
@@ -53,26 +58,13 @@ def is_same_size_group(args, m0, m):
 
 
 def cluster_by_size(args, media):
-    group_id = 0
-    temp_groups = []
-    media_groups = []
-    for m in media:
-        grouped = False
-        for i, group in enumerate(temp_groups):
-            m0 = group[0]
-            if is_same_size_group(args, m0, m):
-                group.append(m)
-                media_groups.append(i)
-                grouped = True
-                break
-
-        if not grouped:
-            temp_groups.append([m])
-            media_groups.append(group_id)
-            group_id += 1
-
-    assert len(media_groups) == len(media)
-    return media_groups
+    if args.filter_sizes:
+        return cluster_by_leaders(args, media, is_same_size_group, "size", args.sizes_delta)
+    elif args.filter_durations:
+        return cluster_by_leaders(
+            args, media, is_same_size_group, "duration", args.durations_delta, key_applies=lambda m: m.get("duration")
+        )
+    return cluster_by_leaders_linear(args, media, is_same_size_group)
 
 
 def filter_group_by_size(args, group):
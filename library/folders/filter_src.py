@@ -6,6 +6,7 @@ from library.utils import nums, printing, processes, strings
 
 MOVED_COUNT = 0
 MOVED_SIZE = 0
+MOVED_START = None
 
 
 def add_time_filters(parser, prefix="move"):
@@ -175,6 +176,9 @@ def print_stats(args, dest_path=None, file_size=None):
         " ",
         f"({strings.file_size(MOVED_SIZE)})",
     ]
+    if MOVED_START is not None and MOVED_COUNT and not args.simulate:
+        elapsed = max(time.monotonic() - MOVED_START, 0.001)
+        msg.append(f" {strings.file_size(MOVED_SIZE / elapsed)}/s {MOVED_COUNT / elapsed:.1f} files/s")
     if dest_path:
         msg.append(f"; {dest_path} ({strings.file_size(file_size)})")
 
@@ -186,7 +190,9 @@ def track_moved(func):
         if args[0].verbose == 0:
             return func(*args, **kwargs)
         else:
-            global MOVED_COUNT, MOVED_SIZE
+            global MOVED_COUNT, MOVED_SIZE, MOVED_START
+            if MOVED_START is None:
+                MOVED_START = time.monotonic()
             try:
                 file_size = Path(args[1]).stat().st_size
             except FileNotFoundError:
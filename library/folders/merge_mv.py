@@ -1,4 +1,4 @@
-import concurrent.futures, os, shutil
+import concurrent.futures, os, threading
 from pathlib import Path
 from collections.abc import Iterable
 
@@ -64,6 +64,12 @@ def parse_args(defaults_override=None):
         help="Shortcut for --file-over-file 'delete-src-larger delete-dest'",
     )
     arggroups.clobber(parser)
+    parser.add_argument(
+        "--per-device",
+        type=int,
+        default=1,
+        help="Transfer up to N files at the same time between each pair of source and destination devices",
+    )
 
     profiles = parser.add_argument_group("File Extension Profiles")
     profiles.add_argument(
@@ -160,11 +166,11 @@ def mcp_file(args, source, destination):
         print(source)
         print("==>", destination)
     else:
-        out = shutil.copy2(source, destination)
+        out = shell_utils.clone_file(source, destination)
         log.debug("copied %s\t%s", source, out)
 
 
-def gen_src_dest(args, sources: Iterable[str], destination: str, shortcut_allowed=False):
+def gen_src_dest(args, sources: Iterable[str], destination: str, shortcut_allowed=False, wait_for=None):
     for source in sources:
         if args.relative_to:  # modify the destination for each source
             source_destination = path_utils.gen_rel_path(source, destination, args.relative_to)
@@ -178,6 +184,9 @@ def gen_src_dest(args, sources: Iterable[str], destination: str, shortcut_allowe
                     folder_dest = os.path.join(folder_dest, path_utils.basename(source))
                     log.debug("folder parent %s", folder_dest)
 
+            if shortcut_allowed and wait_for:
+                wait_for(folder_dest)  # earlier transfers into folder_dest must exist before checking for conflicts
+
             # if no conflict, use shortcut
             if all(
                 [
@@ -225,6 +234,8 @@ def gen_src_dest(args, sources: Iterable[str], destination: str, shortcut_allowe
                 file_dest = os.path.join(folder_dest, relpath)
                 log.debug("rglob-file file_dest %s", file_dest)
 
+                if wait_for:
+                    wait_for(file_dest)
                 src, dest = devices.clobber(args, p, file_dest)
                 if src:
                     yield src, dest
@@ -260,11 +271,100 @@ def gen_src_dest(args, sources: Iterable[str], destination: str, shortcut_allowe
                     file_dest = os.path.join(file_dest, path_utils.basename(source))
                     log.debug("file append basename %s", file_dest)
 
+            if wait_for:
+                wait_for(file_dest)
             src, dest = devices.clobber(args, source, file_dest)
             if src:
                 yield src, dest
 
 
+def device_id(path) -> int:
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except FileNotFoundError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise
+            path = parent
+
+
+class TransferLanes:
+    """
+    Run transfers in parallel with one lane per (source device, destination device) pair
+
+    Renames within one filesystem only change metadata so they run immediately on the calling thread.
+    Cross-device transfers run in their lane with --per-device workers so that a spinning disk is not
+    read or written from many threads at once. --threads limits the number of transfers in flight.
+
+    wait_for(destination) is called before devices.clobber so that conflicts are always resolved
+    against the finished result of an earlier transfer to the same destination
+    """
+
+    def __init__(self, args, mv_fn):
+        self.args = args
+        self.mv_fn = mv_fn
+        self.per_lane = max(getattr(args, "per_device", None) or 1, 1)
+        self.slots = threading.BoundedSemaphore(max(args.threads or min(32, (os.cpu_count() or 1) + 4), 1))
+        self.lock = threading.Lock()
+        self.lanes = {}
+        self.in_flight = {}
+        self.dest_devices = {}
+        self.errors = []
+
+        # output order and --limit counting need one transfer at a time
+        self.serial = bool(args.simulate or getattr(args, "move_limit", None))
+
+    def lane_key(self, src, dest):
+        dest_parent = os.path.dirname(dest)
+        if dest_parent not in self.dest_devices:
+            self.dest_devices[dest_parent] = device_id(dest_parent)
+        return device_id(src), self.dest_devices[dest_parent]
+
+    def submit(self, src, dest) -> None:
+        self.raise_errors()
+
+        if self.serial:
+            self.mv_fn(self.args, src, dest)
+            return
+
+        src_device, dest_device = key = self.lane_key(src, dest)
+        if src_device == dest_device and self.mv_fn is mmv_file:
+            self.mv_fn(self.args, src, dest)  # rename
+            return
+
+        self.slots.acquire()
+        with self.lock:
+            if key not in self.lanes:
+                self.lanes[key] = concurrent.futures.ThreadPoolExecutor(max_workers=self.per_lane)
+            future = self.lanes[key].submit(self.mv_fn, self.args, src, dest)
+            self.in_flight[dest] = future
+        future.add_done_callback(lambda f, dest=dest: self.done(dest, f))
+
+    def done(self, dest, future) -> None:
+        with self.lock:
+            if self.in_flight.get(dest) is future:
+                del self.in_flight[dest]
+        self.slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.errors.append(future.exception())
+
+    def wait_for(self, dest) -> None:
+        prefix = dest.rstrip(os.sep) + os.sep
+        with self.lock:
+            futures = [f for p, f in self.in_flight.items() if p == dest or p.startswith(prefix)]
+        if futures:
+            concurrent.futures.wait(futures)
+
+    def raise_errors(self) -> None:
+        if self.errors:
+            raise self.errors[0]
+
+    def close(self, cancel=False) -> None:
+        for lane in self.lanes.values():
+            lane.shutdown(wait=True, cancel_futures=cancel)
+
+
 def mmv_folders(args, mv_fn, sources, destination, shortcut_allowed=False):
     if sources is None:
         processes.exit_error("No paths passed in")
@@ -276,12 +376,19 @@ def mmv_folders(args, mv_fn, sources, destination, shortcut_allowed=False):
         for s in sources
     )
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as ex:
-        for f in (
-            ex.submit(mv_fn, args, src, dest)
-            for src, dest in gen_src_dest(args, sources, destination, shortcut_allowed=shortcut_allowed)
+    lanes = TransferLanes(args, mv_fn)
+    interrupted = False
+    try:
+        for src, dest in gen_src_dest(
+            args, sources, destination, shortcut_allowed=shortcut_allowed, wait_for=lanes.wait_for
         ):
-            f.result()
+            lanes.submit(src, dest)
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        lanes.close(cancel=interrupted)
+    lanes.raise_errors()
 
 
 def merge_mv(defaults_override=None):
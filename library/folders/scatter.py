@@ -11,6 +11,7 @@ from library.utils import (
     devices,
     iterables,
     nums,
+    path_utils,
     printing,
     shell_utils,
     strings,
@@ -22,7 +23,14 @@ def parse_args() -> argparse.Namespace:
     parser = argparse_utils.ArgumentParser(usage=usage.scatter)
     parser.add_argument("--limit", "-L", "-l", "-queue", "--queue")
     parser.add_argument("--max-files-per-folder", "--max-files-per-directory", type=int)
-    parser.add_argument("--policy")
+    parser.add_argument(
+        "--policy",
+        help="""How to choose a destination for each file that needs to move
+rand: any other path, chosen at random
+free/pfrd, used/purd, total/ptrd: random, weighted by the free, used, or total space of each target
+optimal: move as few bytes (or files with --group count) as possible to reach the target distribution
+Without -m only rand, used, and optimal are available""",
+    )
     parser.add_argument("--group")
     parser.add_argument("--sort", default="random()", help="Sort files before moving")
     parser.add_argument("--targets", "--srcmounts", "-m", help="Colon separated destinations eg. /mnt/d1:/mnt/d2")
@@ -58,8 +66,8 @@ def parse_args() -> argparse.Namespace:
         )
         raise ValueError(msg)
 
-    if args.targets is None and args.policy not in ("rand", "used"):
-        msg = "Without targets defined the only meaningful policies are: `rand` or `used`"
+    if args.targets is None and args.policy not in ("rand", "used", "optimal"):
+        msg = "Without targets defined the only meaningful policies are: `rand`, `used`, or `optimal`"
         raise ValueError(msg)
 
     args.relative_paths = shell_utils.resolve_absolute_paths(args.relative_paths)
@@ -113,8 +121,8 @@ def get_path_stats(args, data) -> list[dict]:
         log.info("Treating as depletion targets: %s", read_only_mounts)
 
     result = []
-    for srcmount in args.targets + read_only_mounts:
-        disk_files = [d for d in data if d["path"].startswith(srcmount)]
+    mount_files = path_utils.group_by_prefixes(args.targets + read_only_mounts, data)
+    for srcmount, disk_files in mount_files.items():
         if disk_files:
             result.append(
                 {
@@ -150,12 +158,15 @@ def rebin_files(args, disk_stats, all_files) -> tuple[list, list]:
     read_only_mounts = [
         s for s in args.relative_paths if Path(s).is_absolute() and not any(m in s for m in args.targets)
     ]
-    for disk_stat in devices.get_mount_stats(read_only_mounts):
-        disk_files = [d for d in all_files if d["path"].startswith(disk_stat["mount"])]
+    read_only_stats = devices.get_mount_stats(read_only_mounts)
+    mount_files = path_utils.group_by_prefixes([d["mount"] for d in read_only_stats + disk_stats], all_files)
+
+    for disk_stat in read_only_stats:
+        disk_files = mount_files[disk_stat["mount"]]
         to_rebin.extend({"mount": disk_stat["mount"], **file} for file in disk_files)
 
     for disk_stat in disk_stats:
-        disk_files = [d for d in all_files if d["path"].startswith(disk_stat["mount"])]
+        disk_files = mount_files[disk_stat["mount"]]
 
         disk_rebin = []
         if disk_files:
@@ -208,11 +219,71 @@ def rebin_files(args, disk_stats, all_files) -> tuple[list, list]:
     return untouched, rebinned
 
 
+def rebin_files_optimal(args, disk_stats, all_files, equal_shares=False) -> tuple[list, list]:
+    """
+    Move as few bytes (or files with --group count) as possible to reach the target distribution
+
+    Files are picked largest-first from mounts which are over their target share, without
+    overshooting, and are placed on the mount with the largest remaining deficit.
+    Without -m the paths are only compared with each other so every path gets an equal share
+    """
+    if args.group == "size":
+        weight = lambda d: d["size"] or 0
+        shares = [1.0] * len(disk_stats) if equal_shares else [d["total"] for d in disk_stats]
+    else:
+        weight = lambda d: 1
+        shares = [1.0] * len(disk_stats)
+
+    read_only_mounts = [
+        s for s in args.relative_paths if Path(s).is_absolute() and not any(m in s for m in args.targets)
+    ]
+    mounts = [d["mount"] for d in disk_stats]
+    mount_files = path_utils.group_by_prefixes(mounts + read_only_mounts, all_files, longest=True)
+
+    total_weight = sum(weight(d) for files in mount_files.values() for d in files)
+    share_total = sum(shares) or 1
+    deficits = {}
+
+    untouched = []
+    to_rebin = []
+    for mount in read_only_mounts:
+        to_rebin.extend({"mount": mount, **file} for file in mount_files[mount])
+    for mount, share in zip(mounts, shares):
+        disk_files = mount_files[mount]
+        excess = sum(weight(d) for d in disk_files) - total_weight * share / share_total
+        deficits[mount] = -excess
+
+        for file in sorted(disk_files, key=weight, reverse=True):
+            file_weight = weight(file)
+            if 0 < file_weight <= excess:
+                excess -= file_weight
+                to_rebin.append({"mount": mount, **file})
+            else:
+                untouched.append(file)
+
+    rebinned = []
+    for file in sorted(to_rebin, key=weight, reverse=True):
+        valid_targets = [m for m in mounts if m != file["mount"]]
+        if not valid_targets:
+            untouched.append(file)
+            continue
+        new_mount = max(valid_targets, key=lambda m: deficits[m])
+        deficits[new_mount] -= weight(file)
+        deficits[file["mount"]] = deficits.get(file["mount"], 0) + weight(file)
+
+        file["from_path"] = file["path"]
+        file["path"] = file["path"].replace(file["mount"], new_mount, 1)
+        rebinned.append(file)
+
+    return untouched, rebinned
+
+
 def get_rel_stats(parents, files) -> list[dict[str, float | str]]:
     mount_space = []
     total_used = 1
+    mount_files = path_utils.group_by_prefixes(parents, files)
     for parent in parents:
-        used = sum([file["size"] for file in files if file["path"].startswith(parent)])
+        used = sum(file["size"] for file in mount_files[parent])
         total_used += used
         mount_space.append([parent, used])
 
@@ -366,6 +437,7 @@ def scatter() -> None:
         shell_utils.move_files_bash(rebinned)
         sys.exit(0)
 
+    relative_stats = not args.targets
     if args.targets:
         disk_stats = devices.get_mount_stats(args.targets)
     else:
@@ -388,6 +460,8 @@ def scatter() -> None:
 
     if args.consolidate:
         untouched, rebinned = rebin_consolidate(args, disk_stats, files)
+    elif args.policy == "optimal":
+        untouched, rebinned = rebin_files_optimal(args, disk_stats, files, equal_shares=relative_stats)
     else:
         untouched, rebinned = rebin_files(args, disk_stats, files)
 
@@ -402,11 +476,10 @@ def scatter() -> None:
     )
 
     print("\n######### Commands to run #########")
+    dest_mount_files = path_utils.group_by_prefixes([d["mount"] for d in disk_stats], rebinned)
     for disk_stat in sorted(disk_stats, key=lambda d: d["free"], reverse=True):
         dest_disk_files = [
-            d["from_path"].replace(d["mount"], d["mount"] + "/.")
-            for d in rebinned
-            if d["path"].startswith(disk_stat["mount"])
+            d["from_path"].replace(d["mount"], d["mount"] + "/.") for d in dest_mount_files[disk_stat["mount"]]
         ]
 
         if len(dest_disk_files) == 0:
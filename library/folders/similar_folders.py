@@ -1,3 +1,4 @@
+import bisect
 from pathlib import Path
 
 from library import usage
@@ -121,7 +122,7 @@ def is_same_group(args, m0, m):
     return all(bools)
 
 
-def cluster_by_numbers(args, media):
+def cluster_by_leaders_linear(args, media, is_same):
     group_id = 0
     temp_groups = []
     media_groups = []
@@ -129,7 +130,7 @@ def cluster_by_numbers(args, media):
         grouped = False
         for i, group in enumerate(temp_groups):
             m0 = group[0]
-            if is_same_group(args, m0, m):
+            if is_same(args, m0, m):
                 group.append(m)
                 media_groups.append(i)
                 grouped = True
@@ -144,6 +145,64 @@ def cluster_by_numbers(args, media):
     return media_groups
 
 
+def cluster_by_leaders(args, media, is_same, key, delta, key_applies=None):
+    """
+    Each item joins the first earlier group whose first item is_same, else it starts a new group
+
+    Group leaders are indexed by the value of `key` so that only leaders within
+    the percentage window of `delta` are compared instead of every group
+    """
+    media = list(media)
+    k = delta / 200
+    if k >= 1 or any((m.get(key) or 0) < 0 for m in media):
+        return cluster_by_leaders_linear(args, media, is_same)
+
+    leaders = []
+    sorted_values = []  # leaders with positive values, sorted by value
+    sorted_group_ids = []
+    zero_group_ids = []
+    media_groups = []
+    for m in media:
+        x = m.get(key) or 0
+        if key_applies and not key_applies(m):
+            candidates = range(len(leaders))
+        elif x > 0:
+            lo = bisect.bisect_right(sorted_values, x * (1 - k) / (1 + k) * (1 - 1e-9))
+            hi = bisect.bisect_left(sorted_values, x * (1 + k) / (1 - k) * (1 + 1e-9))
+            candidates = sorted(sorted_group_ids[lo:hi])
+        elif delta > 100:  # nums.percentage_difference(0, 0) == 100
+            candidates = zero_group_ids
+        else:
+            candidates = []
+
+        group_id = next((i for i in candidates if is_same(args, leaders[i], m)), None)
+        if group_id is None:
+            group_id = len(leaders)
+            leaders.append(m)
+            if x > 0:
+                idx = bisect.bisect_right(sorted_values, x)
+                sorted_values.insert(idx, x)
+                sorted_group_ids.insert(idx, group_id)
+            else:
+                zero_group_ids.append(group_id)
+        media_groups.append(group_id)
+
+    assert len(media_groups) == len(media)
+    return media_groups
+
+
+def cluster_by_numbers(args, media):
+    if args.filter_sizes:
+        key, delta = ("size" if args.total_sizes else "median_size"), args.sizes_delta
+        return cluster_by_leaders(args, media, is_same_group, key, delta)
+    elif args.filter_counts:
+        return cluster_by_leaders(args, media, is_same_group, "exists", args.counts_delta)
+    elif args.filter_durations:
+        key, delta = ("duration" if args.total_durations else "median_duration"), args.durations_delta
+        return cluster_by_leaders(args, media, is_same_group, key, delta, key_applies=lambda m: m.get("duration"))
+    return cluster_by_leaders_linear(args, media, is_same_group)
+
+
 def filter_group_by_numbers(args, group):
     media = group["grouped_paths"]
 
@@ -3,10 +3,12 @@ from collections import defaultdict
 
 from library import usage
 from library.fsdb import folder_stats
+from library.mediadb import db_media
 from library.playback import media_printer
 from library.utils import (
     arggroups,
     argparse_utils,
+    db_utils,
     file_utils,
     filter_engine,
     iterables,
@@ -174,12 +176,17 @@ def get_subset_group_by_extensions(args) -> list[dict]:
 
 
 def get_subset_group_by_mimetypes(args) -> list[dict]:
-    d = {}
-    for m in args.data:
-        if args.cwd is not None and not m["path"].startswith(args.cwd):
-            continue
+    media = [m for m in args.data if args.cwd is None or m["path"].startswith(args.cwd)]
+
+    untyped = [m for m in media if m.get("type") is None]
+    if untyped:
+        file_utils.get_files_types(untyped)
+        if args.database:
+            db_media.update_types(args, untyped)  # so that the next run does not need to detect them again
 
-        mimetype = file_utils.get_file_type(m)["type"]
+    d = {}
+    for m in media:
+        mimetype = m["type"]
         if mimetype not in d:
             d[mimetype] = {"size": 0, "duration": 0, "count": 0}
         d[mimetype]["size"] += m.get("size") or 0
@@ -282,6 +289,8 @@ def load_subset(args):
 
 def get_data(args) -> list[dict]:
     if args.database:
+        if args.group_by_mimetypes and "type" in db_utils.columns(args, "media"):
+            args.select = [*(args.select or []), "type"]
         media = list(args.db.query(*sqlgroups.fs_sql(args, limit=None)))
     else:
         if any([args.group_by_size, args.group_by_extensions, args.group_by_mimetypes]):
@@ -0,0 +1,79 @@
+import hashlib, sqlite3
+
+from library.utils import consts, iterables
+from library.utils.log_utils import log
+
+"""
+embeddings table
+    path = media path (or any other stable key)
+    model = embedding model configuration, eg. wordllama config and dim
+    text_hash = hash of the text that was embedded; a changed title/path means a stale embedding
+    embedding = float32 vector bytes
+"""
+
+
+def create(args):
+    args.db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            path TEXT NOT NULL,
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            PRIMARY KEY (path, model)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def text_hash(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8", errors="replace")).hexdigest()
+
+
+def get(args, model, paths) -> dict[str, tuple[str, bytes]]:
+    cached = {}
+    try:
+        for chunk_paths in iterables.chunks(list(paths), consts.SQLITE_PARAM_LIMIT - 1):
+            rows = args.db.execute(
+                "SELECT path, text_hash, embedding FROM embeddings WHERE model = ? AND path IN ("
+                + ",".join(["?"] * len(chunk_paths))
+                + ")",
+                [model, *chunk_paths],
+            )
+            cached.update({path: (h, blob) for path, h, blob in rows})
+    except sqlite3.OperationalError as excinfo:
+        log.debug(excinfo)
+    return cached
+
+
+def add(args, model, rows) -> None:
+    with args.db.conn:
+        args.db.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (path, model, text_hash, embedding) VALUES (?, ?, ?, ?)",
+            [(path, model, h, blob) for path, h, blob in rows],
+        )
+
+
+def cached_embeddings(args, model, embed, paths, sentence_strings):
+    import numpy as np
+
+    create(args)
+
+    hashes = [text_hash(s) for s in sentence_strings]
+    cached = get(args, model, paths)
+
+    missing = [i for i, (path, h) in enumerate(zip(paths, hashes)) if cached.get(path, (None,))[0] != h]
+    log.info("embeddings cache: %s hits, %s misses", len(paths) - len(missing), len(missing))
+
+    new_embeddings = {}
+    if missing:
+        vectors = np.asarray(embed([sentence_strings[i] for i in missing]), dtype=np.float32)
+        new_embeddings = dict(zip(missing, vectors))
+        add(args, model, ((paths[i], hashes[i], v.tobytes()) for i, v in new_embeddings.items()))
+
+    return np.vstack(
+        [
+            new_embeddings[i] if i in new_embeddings else np.frombuffer(cached[path][1], dtype=np.float32)
+            for i, path in enumerate(paths)
+        ]
+    )
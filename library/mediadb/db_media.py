@@ -9,6 +9,7 @@ from library.editdb.dedupe_db import dedupe_rows
 from library.fsdb import folder_stats
 from library.utils import consts, date_utils, db_utils, iterables, log_utils, objects, processes, sql_utils, strings
 from library.utils.consts import DBType
+from library.utils.download_scheduler import db_call
 from library.utils.log_utils import log
 
 
@@ -60,6 +61,31 @@ def exists(args, path) -> bool:
     return True
 
 
+def exists_many(args, paths) -> set[str]:
+    """
+    The subset of paths which are already in the media table (matching path or webpath)
+    """
+    paths = list({str(p) for p in paths})
+    if not paths:
+        return set()
+
+    m_columns = db_utils.columns(args, "media")
+    path_columns = ["path", "webpath"] if "webpath" in m_columns else ["path"]
+
+    known = set()
+    try:
+        for chunk in iterables.chunks(paths, consts.SQLITE_PARAM_LIMIT):
+            placeholders = ",".join("?" * len(chunk))
+            for column in path_columns:
+                known.update(
+                    d[column]
+                    for d in args.db.query(f"select {column} from media where {column} in ({placeholders})", chunk)
+                )
+    except sqlite3.OperationalError as excinfo:
+        log.debug(excinfo)
+    return known
+
+
 def get(args, path):
     return args.db.pop_dict("select * from media where path = ?", [path])
 
@@ -269,6 +295,16 @@ def mark_media_undeleted(args, paths) -> int:
     return modified_row_count
 
 
+def update_types(args, media) -> None:
+    if "type" not in db_utils.columns(args, "media"):
+        return
+
+    with args.db.conn:
+        args.db.conn.executemany(
+            "UPDATE media SET type = ? WHERE path = ?", [(d["type"], d["path"]) for d in media if d.get("type")]
+        )
+
+
 def mark_media_deleted(args, paths) -> int:
     paths = iterables.conform(paths)
 
@@ -373,7 +409,8 @@ def download_add(
         )
         fs_tags = fs_add_metadata.extract_metadata(fs_args, local_path)
         fs_tags = objects.dict_filter_bool(fs_tags, keep_0=False) or {}
-        clean_up_temp_dirs()
+        if getattr(args, "download_scheduler", None) is None:
+            clean_up_temp_dirs()  # other workers may still be using SUB_TEMP_DIR; download() cleans up after the run
     else:
         fs_tags = {"time_modified": consts.now()}
 
@@ -391,6 +428,12 @@ def download_add(
         "time_modified": consts.now(),
         "download_attempts": info.get("download_attempts") or 0,
     }
+
+    # worker threads hand their writes back to the thread which owns the DB connection
+    db_call(args, download_add_entry, args, webpath, entry, delete_webpath_entry)
+
+
+def download_add_entry(args, webpath, entry, delete_webpath_entry) -> None:
     add(args, entry)
 
     if delete_webpath_entry and entry["path"] != webpath:
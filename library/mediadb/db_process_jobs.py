@@ -0,0 +1,117 @@
+import json, os, socket
+
+from library.utils import consts, iterables
+
+"""
+process_jobs table
+    path = Media path which was estimated to shrink (one job per path)
+    state = queued, running, done, failed
+    savings, processing_time = estimates from process_media.check_shrink
+    priority = estimated bytes saved per second of processing
+    attempts = number of times the job was started
+    worker = hostname:pid of the process which last started the job
+    time_queued, time_started, time_finished = unix timestamps
+    run_time = seconds spent processing
+    media = check_shrink output as JSON so that resumed jobs do not need to be probed again
+"""
+
+MAX_ATTEMPTS = 3
+
+
+def create(args):
+    args.db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS process_jobs (
+            path TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            media_type TEXT,
+            size INTEGER,
+            savings INTEGER,
+            processing_time REAL,
+            priority REAL,
+            attempts INTEGER DEFAULT 0,
+            worker TEXT,
+            time_queued INTEGER,
+            time_started INTEGER,
+            time_finished INTEGER,
+            run_time REAL,
+            new_path TEXT,
+            new_size INTEGER,
+            media TEXT
+        );
+        """
+    )
+    args.db.execute("CREATE INDEX IF NOT EXISTS process_jobs_state_idx ON process_jobs (state);")
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_unfinished(args, paths) -> dict[str, dict]:
+    """
+    Queued jobs and jobs which were interrupted while running, keyed by path
+    """
+    jobs = {}
+    for chunk in iterables.chunks(list(paths), consts.SQLITE_PARAM_LIMIT):
+        for d in args.db.query(
+            f"""
+            SELECT path, attempts, media FROM process_jobs
+            WHERE state IN ('queued', 'running') AND path IN ({",".join("?" * len(chunk))})
+            """,
+            chunk,
+        ):
+            jobs[d["path"]] = {**json.loads(d["media"]), "attempts": d["attempts"]}
+    return jobs
+
+
+def queue(args, media, priority) -> None:
+    now = consts.now()
+    with args.db.conn:
+        for m in media:
+            args.db.conn.execute(
+                """
+                INSERT INTO process_jobs
+                (path, state, media_type, size, savings, processing_time, priority, time_queued, media)
+                VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    state = CASE WHEN state IN ('done', 'failed') THEN 'queued' ELSE state END
+                    , attempts = CASE WHEN state IN ('done', 'failed') THEN 0 ELSE attempts END
+                    , priority = excluded.priority
+                    , media = excluded.media
+                """,
+                [
+                    m["path"],
+                    m["media_type"],
+                    m["size"],
+                    m["savings"],
+                    m["processing_time"],
+                    priority(m),
+                    now,
+                    json.dumps({k: v for k, v in m.items() if k != "attempts"}, default=str),
+                ],
+            )
+
+
+def start(args, path) -> None:
+    with args.db.conn:
+        args.db.conn.execute(
+            """
+            UPDATE process_jobs
+            SET state = 'running', attempts = attempts + 1, worker = ?, time_started = ?
+            WHERE path = ?
+            """,
+            [worker_name(), consts.now(), path],
+        )
+
+
+def finish(args, path, failed, run_time, new_path=None, new_size=None) -> None:
+    with args.db.conn:
+        args.db.conn.execute(
+            """
+            UPDATE process_jobs
+            SET state = ?, time_finished = ?, run_time = ?, new_path = ?, new_size = ?
+            WHERE path = ?
+            """,
+            ["failed" if failed else "done", consts.now(), run_time, new_path, new_size, path],
+        )
@@ -1,9 +1,10 @@
-import sys
+import argparse, sys
 
 import requests
 
 from library import usage
 from library.createdb import gallery_backend, tube_backend
+from library.createdb.subtitle import clean_up_temp_dirs
 from library.data.http_errors import HTTPStatus
 from library.mediadb import db_media, db_playlists
 from library.mediafiles import process_ffmpeg, process_image
@@ -14,6 +15,7 @@ from library.utils import (
     argparse_utils,
     consts,
     db_utils,
+    disk_admission,
     iterables,
     processes,
     shell_utils,
@@ -22,6 +24,7 @@ from library.utils import (
     web,
 )
 from library.utils.consts import DBType
+from library.utils.download_scheduler import DownloadScheduler, db_call
 from library.utils.log_utils import log
 from library.utils.sqlgroups import construct_download_query
 
@@ -37,6 +40,22 @@ def parse_args():
     arggroups.filter_links(parser)
 
     parser.add_argument("--same-domain", action="store_true", help="Choose a random domain to focus on")
+    parser.add_argument(
+        "--download-workers", "--workers", type=int, default=1, help="Download up to N media at the same time"
+    )
+    parser.add_argument(
+        "--download-workers-per-domain",
+        "--per-domain",
+        type=int,
+        default=1,
+        help="Download up to N media from the same domain at the same time",
+    )
+    parser.add_argument(
+        "--domain-delay",
+        metavar="SECONDS",
+        type=float,
+        help="Wait N seconds between downloads from the same domain (default: --sleep-requests)",
+    )
 
     parser.add_argument("--live", action="store_true", help="Video: Allow live streams to be downloaded")
 
@@ -49,6 +68,13 @@ def parse_args():
     parser.add_argument("--links", action="store_true", help="Download media linked within pages")
 
     parser.add_argument("--process", action="store_true", help="Transcode images to AVIF and video/audio to AV1/Opus")
+    arggroups.disk_space(parser)
+    parser.add_argument(
+        "--spread-prefixes",
+        "--prefixes",
+        action=argparse_utils.ArgparseList,
+        help="Comma separated download destinations; each download goes to the one with the most free space",
+    )
     arggroups.clobber(parser)
     arggroups.process_ffmpeg(parser)
     parser.add_argument("--check-corrupt", "--check-corruption", action="store_true")
@@ -67,6 +93,8 @@ def parse_args():
 
     if args.safe and args.profile == DBType.filesystem:
         parser.error("--safe is supported only with --audio, --video, or --image")
+    if args.spread_prefixes and args.profile == DBType.image:
+        parser.error("--spread-prefixes is supported only with --audio, --video, or --filesystem")
 
     arggroups.args_post(args, parser, create_db=args.database and args.database.endswith(consts.SQLITE_EXTENSIONS))
     args.unk = unk
@@ -79,6 +107,194 @@ def parse_args():
     return args
 
 
+def get_download_states(args, m_columns, paths) -> dict[str, dict]:
+    states = {}
+    for chunk_paths in iterables.chunks(paths, consts.SQLITE_PARAM_LIMIT):
+        rows = args.db.query(
+            f"""
+            SELECT
+                path
+                , time_modified
+                , time_deleted
+                {", download_attempts" if 'download_attempts' in m_columns else ', 0 as download_attempts'}
+            FROM media
+            WHERE path IN ({",".join(["?"] * len(chunk_paths))})
+            """,
+            chunk_paths,
+        )
+        for d in rows:
+            states.setdefault(d["path"], d)
+    return states
+
+
+def gen_media_to_download(args, m_columns, media, batch_size=10):
+    for batch in iterables.chunks(media, batch_size):
+        to_check = []
+        for m in batch:
+            if args.blocklist_rules and sql_utils.is_blocked_dict_like_sql(m, args.blocklist_rules):
+                continue
+
+            if args.safe:
+                if (args.profile in (DBType.audio, DBType.video) and not tube_backend.is_supported(m["path"])) or (
+                    args.profile in (DBType.image,) and not gallery_backend.is_supported(m["path"])
+                ):
+                    log.info("Skipping unsupported URL (safe_mode) %s", m["path"])
+                    continue
+            to_check.append(m)
+
+        if args.force or "time_modified" not in m_columns:
+            yield from to_check
+            continue
+
+        # prefilter; download_unattempted checks each row again right before downloading
+        states = get_download_states(args, m_columns, [m["path"] for m in to_check])
+        for m in to_check:
+            if is_unattempted(args, m, states.get(m["path"])):
+                yield m
+
+
+def is_unattempted(args, m, d) -> bool:
+    # check if download already attempted recently by another process
+    previous_time_attempted = m.get("time_modified") or consts.APPLICATION_START  # 0 is nullified
+    log.debug(d)
+    if d:
+        if d["time_deleted"]:
+            log.info(
+                "Download was marked as deleted %s ago. Skipping %s",
+                strings.duration(consts.now() - d["time_deleted"]),
+                m["path"],
+            )
+            return False
+        elif d.get("time_modified") and d["time_modified"] > int(previous_time_attempted):
+            log.info(
+                "Download already attempted %s ago. Skipping %s",
+                strings.duration(consts.now() - d["time_modified"]),
+                m["path"],
+            )
+            return False
+        elif d.get("download_attempts") and d["download_attempts"] >= args.download_retries:
+            log.info("Download attempts exceed download retries limit. Skipping %s", m["path"])
+            return False
+    return True
+
+
+def download_unattempted(args, m_columns, m, get_inner_urls) -> None:
+    if not args.force and "time_modified" in m_columns:
+        # the queue can hold an item for a while so read its row again just before downloading
+        states = db_call(args, get_download_states, args, m_columns, [m["path"]])
+        if not is_unattempted(args, m, states.get(m["path"])):
+            return
+
+    download_media(args, m, get_inner_urls)
+
+
+def expected_download_size(args, m) -> int:
+    if m.get("size"):
+        return m["size"]
+    if args.profile == DBType.filesystem and not args.links and disk_admission.is_enabled(args):
+        try:
+            return web.stat(m["path"]).st_size
+        except Exception as excinfo:
+            log.debug("Could not get Content-Length %s %s", excinfo, m["path"])
+    return 0
+
+
+def download_media(args, m, get_inner_urls) -> None:
+    size = expected_download_size(args, m)
+    if args.process:
+        size *= 2  # original and transcoded output exist at the same time
+
+    try:
+        with disk_admission.reserve(args, size, args.spread_prefixes or [args.prefix]) as prefix:
+            if prefix != args.prefix:
+                args = argparse.Namespace(**(vars(args) | {"prefix": prefix}))
+            download_media_to_prefix(args, m, get_inner_urls)
+    except disk_admission.InsufficientSpace as excinfo:
+        log.error("Skipping %s: %s", m["path"], excinfo)
+
+
+def download_media_to_prefix(args, m, get_inner_urls) -> None:
+    try:  # attempt to download
+        log.debug(m)
+
+        if args.profile in (DBType.audio, DBType.video):
+            tube_backend.download(args, m)
+        elif args.profile == DBType.image:
+            gallery_backend.download(args, m)
+        elif args.profile == DBType.filesystem:
+            original_path = m["path"]
+
+            dl_paths = [original_path]
+            if args.links:
+                dl_paths = []
+                try:
+                    for link_dict in get_inner_urls(args, original_path):
+                        dl_paths.append(link_dict["link"])
+                except requests.HTTPError as excinfo:
+                    log.warning(
+                        "HTTPError %s. Recording download attempt: %s", excinfo.response.status_code, original_path
+                    )
+                    db_media.download_add(
+                        args,
+                        webpath=original_path,
+                        info=m,
+                        error=str(excinfo),
+                        mark_deleted=excinfo.response.status_code == HTTPStatus.NOT_FOUND,
+                        delete_webpath_entry=False,
+                    )
+                    web.post_download(args)
+                    return
+
+            if not dl_paths:
+                log.info("No relevant links in page. Recording download attempt: %s", original_path)
+                db_media.download_add(args, original_path, m, error="No relevant links in page")
+                web.post_download(args)
+                return
+
+            any_error = False
+            for i, dl_path in enumerate(dl_paths):
+                error = None
+                try:
+                    local_path = web.download_url(args, dl_path)
+                except RuntimeError as excinfo:
+                    local_path = None
+                    error = str(excinfo)
+
+                local_paths = [local_path]
+                if local_path and args.process:
+                    extension = local_path.rsplit(".", 1)[-1].lower()
+                    if extension in consts.AUDIO_ONLY_EXTENSIONS | consts.VIDEO_EXTENSIONS:
+                        result = process_ffmpeg.process_path(args, local_path)
+                    elif extension in consts.IMAGE_EXTENSIONS:
+                        result = process_image.process_path(args, local_path)
+
+                    if result is not None:
+                        local_paths = process_ffmpeg.result_paths(result)
+
+                is_not_found = error is not None and "HTTPNotFound" in error
+                if error is not None and "HTTPNotFound" not in error:
+                    any_error = True
+
+                for output_index, local_path in enumerate(local_paths):
+                    db_media.download_add(
+                        args,
+                        webpath=original_path,
+                        info=m,
+                        local_path=local_path,
+                        error=error,
+                        mark_deleted=is_not_found,
+                        delete_webpath_entry=(
+                            not any_error if i == len(dl_paths) - 1 and output_index == len(local_paths) - 1 else False
+                        ),  # only check after last downloaded output was saved
+                    )
+        else:
+            raise NotImplementedError
+
+    except Exception:
+        print("db:", args.database)
+        raise
+
+
 def download(args=None) -> None:
     if args:
         sys.argv = ["lb", *args]
@@ -121,129 +337,18 @@ def download(args=None) -> None:
     get_inner_urls = iterables.return_unique(extract_links.get_inner_urls, lambda d: d["link"])
     if args.safe and args.profile == DBType.image:
         gallery_backend.load_module_level_gallery_dl(args)
-    for m in media:
-        if args.blocklist_rules and sql_utils.is_blocked_dict_like_sql(m, args.blocklist_rules):
-            continue
-
-        if args.safe:
-            if (args.profile in (DBType.audio, DBType.video) and not tube_backend.is_supported(m["path"])) or (
-                args.profile in (DBType.image,) and not gallery_backend.is_supported(m["path"])
-            ):
-                log.info("Skipping unsupported URL (safe_mode) %s", m["path"])
-                continue
-
-        # check if download already attempted recently by another process
-        previous_time_attempted = m.get("time_modified") or consts.APPLICATION_START  # 0 is nullified
-        if not args.force and "time_modified" in m_columns:
-            d = args.db.pop_dict(
-                f"""
-                SELECT
-                    time_modified
-                    , time_deleted
-                    {", download_attempts" if 'download_attempts' in m_columns else ', 0 as download_attempts'}
-                FROM media
-                WHERE path=?
-                """,
-                [m["path"]],
-            )
-            log.debug(d)
-            if d:
-                if d["time_deleted"]:
-                    log.info(
-                        "Download was marked as deleted %s ago. Skipping %s",
-                        strings.duration(consts.now() - d["time_deleted"]),
-                        m["path"],
-                    )
-                    continue
-                elif d.get("time_modified") and d["time_modified"] > int(previous_time_attempted):
-                    log.info(
-                        "Download already attempted %s ago. Skipping %s",
-                        strings.duration(consts.now() - d["time_modified"]),
-                        m["path"],
-                    )
-                    continue
-                elif d.get("download_attempts") and d["download_attempts"] >= args.download_retries:
-                    log.info("Download attempts exceed download retries limit. Skipping %s", m["path"])
-                    continue
-
-        try:  # attempt to download
-            log.debug(m)
-
-            if args.profile in (DBType.audio, DBType.video):
-                tube_backend.download(args, m)
-            elif args.profile == DBType.image:
-                gallery_backend.download(args, m)
-            elif args.profile == DBType.filesystem:
-                original_path = m["path"]
-
-                dl_paths = [original_path]
-                if args.links:
-                    dl_paths = []
-                    try:
-                        for link_dict in get_inner_urls(args, original_path):
-                            dl_paths.append(link_dict["link"])
-                    except requests.HTTPError as excinfo:
-                        log.warning(
-                            "HTTPError %s. Recording download attempt: %s", excinfo.response.status_code, original_path
-                        )
-                        db_media.download_add(
-                            args,
-                            webpath=original_path,
-                            info=m,
-                            error=str(excinfo),
-                            mark_deleted=excinfo.response.status_code == HTTPStatus.NOT_FOUND,
-                            delete_webpath_entry=False,
-                        )
-                        web.post_download(args)
-                        continue
-
-                if not dl_paths:
-                    log.info("No relevant links in page. Recording download attempt: %s", original_path)
-                    db_media.download_add(args, original_path, m, error="No relevant links in page")
-                    web.post_download(args)
-                    continue
 
-                any_error = False
-                for i, dl_path in enumerate(dl_paths):
-                    error = None
-                    try:
-                        local_path = web.download_url(args, dl_path)
-                    except RuntimeError as excinfo:
-                        local_path = None
-                        error = str(excinfo)
-
-                    local_paths = [local_path]
-                    if local_path and args.process:
-                        extension = local_path.rsplit(".", 1)[-1].lower()
-                        if extension in consts.AUDIO_ONLY_EXTENSIONS | consts.VIDEO_EXTENSIONS:
-                            result = process_ffmpeg.process_path(args, local_path)
-                        elif extension in consts.IMAGE_EXTENSIONS:
-                            result = process_image.process_path(args, local_path)
-
-                        if result is not None:
-                            local_paths = process_ffmpeg.result_paths(result)
-
-                    is_not_found = error is not None and "HTTPNotFound" in error
-                    if error is not None and "HTTPNotFound" not in error:
-                        any_error = True
-
-                    for output_index, local_path in enumerate(local_paths):
-                        db_media.download_add(
-                            args,
-                            webpath=original_path,
-                            info=m,
-                            local_path=local_path,
-                            error=error,
-                            mark_deleted=is_not_found,
-                            delete_webpath_entry=(
-                                not any_error
-                                if i == len(dl_paths) - 1 and output_index == len(local_paths) - 1
-                                else False
-                            ),  # only check after last downloaded output was saved
-                        )
-            else:
-                raise NotImplementedError
-
-        except Exception:
-            print("db:", args.database)
-            raise
+    args.download_scheduler = DownloadScheduler(
+        workers=args.download_workers,
+        per_domain=args.download_workers_per_domain,
+        domain_delay=args.domain_delay if args.domain_delay is not None else (args.sleep_interval_requests or 0),
+        lookahead=args.download_workers * 10,
+    )
+    try:
+        args.download_scheduler.run(
+            gen_media_to_download(args, m_columns, media, batch_size=args.download_workers * 10),
+            lambda m: download_unattempted(args, m_columns, m, get_inner_urls),
+        )
+    finally:
+        args.download_scheduler = None
+        clean_up_temp_dirs()
@@ -107,18 +107,21 @@ def search() -> None:
     if args.open:
         pl = media_player.MediaPrefetcher(args, merged_captions)
         pl.fetch()
-        while pl.remaining:
-            d = pl.get_m()
-            if d:
-                print(d["text"])
-                m = args.db.pop_dict("select * from media where path = ?", [d["path"]])
-                m["player"].extend([f'--start={d["time"] - 2}', f'--end={int(d["end"] + 1.5)}'])
-                r = media_player.single_player(args, m)
-                if r.returncode != 0:
-                    log.warning("Player exited with code %s", r.returncode)
-                    if args.ignore_errors:
-                        return
-                    else:
-                        raise SystemExit(r.returncode)
+        try:
+            while pl.remaining:
+                d = pl.get_m()
+                if d:
+                    print(d["text"])
+                    m = args.db.pop_dict("select * from media where path = ?", [d["path"]])
+                    m["player"].extend([f'--start={d["time"] - 2}', f'--end={int(d["end"] + 1.5)}'])
+                    r = media_player.single_player(args, m)
+                    if r.returncode != 0:
+                        log.warning("Player exited with code %s", r.returncode)
+                        if args.ignore_errors:
+                            return
+                        else:
+                            raise SystemExit(r.returncode)
+        finally:
+            pl.close()
     else:
         printer(args, merged_captions)
@@ -21,15 +21,53 @@ def parse_args():
     return args
 
 
-def decode_quick_scan(path, scans, scan_duration=3, audio_scan=False):
+def count_failed_scans(decode, scans, batch_size=8, max_workers=4) -> int:
+    """
+    Decode scans in batches of up to batch_size with one process per batch
+
+    Batches with errors are decoded again in smaller pieces until the failing scans are found:
+    split in half when errors are sparse and one scan at a time when most batches failed
+    """
+    pending = [scans[i : i + batch_size] for i in range(0, len(scans), batch_size)]
+
+    fail_count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending:
+            results = list(pool.map(decode, pending))
+            failed_batches = [batch for batch, is_ok in zip(pending, results) if not is_ok]
+            mostly_corrupt = len(failed_batches) > len(pending) / 2
+
+            pending = []
+            for batch in failed_batches:
+                if len(batch) == 1:
+                    fail_count += 1
+                elif mostly_corrupt:
+                    pending.extend([scan] for scan in batch)
+                else:
+                    mid = len(batch) // 2
+                    pending.extend([batch[:mid], batch[mid:]])
+
+    return fail_count
+
+
+def decode_quick_scan(path, scans, scan_duration=3, audio_scan=False, batch_size=8):
     assert which("ffmpeg")
 
-    def decode(scan):
+    def decode(batch) -> bool:
+        inputs = []
+        maps = []
+        for i, scan in enumerate(batch):
+            # input options only apply to the next -i
+            inputs += ["-err_detect", "buffer+crccheck+explode", "-ss", f"{scan:.2f}", "-t", str(scan_duration)]
+            inputs += ["-i", path]
+            if audio_scan:
+                maps += ["-map", f"{i}:a"]
+            else:
+                maps += ["-map", f"{i}:v:0?", "-map", f"{i}:a:0?"]
+
         opts = []
         if audio_scan:
             opts += [
-                "-map",
-                "0:a",
                 "-c:a",
                 "copy",
                 "-map_metadata",
@@ -44,35 +82,21 @@ def decode_quick_scan(path, scans, scan_duration=3, audio_scan=False):
             "-xerror",
             "-v",
             "16",
-            "-err_detect",
-            "buffer+crccheck+explode",
-            "-ss",
-            f"{scan:.2f}",
-            "-i",
-            path,
-            "-t",
-            str(scan_duration),
+            *inputs,
+            *maps,
             *opts,
             "-f",
             "null",
             os.devnull,
         ]
 
-        proc = processes.cmd(*cmd, limit_ram=True, nice=5, journald=False)
-        # I wonder if something like this would be faster: -map 0:v:0 -filter:v "select=eq(pict_type\,I)" -frames:v 1
-        if proc.stderr != "":
-            raise RuntimeError
-
-    with ThreadPoolExecutor(max_workers=4) as pool:
-        futures = [pool.submit(decode, scan) for scan in scans]
-
-    fail_count = 0
-    for future in futures:
         try:
-            future.result()
-        except (RuntimeError, subprocess.CalledProcessError):
-            fail_count += 1
+            proc = processes.cmd(*cmd, limit_ram=True, nice=5, journald=False)
+        except subprocess.CalledProcessError:
+            return False
+        return proc.stderr == ""
 
+    fail_count = count_failed_scans(decode, scans, batch_size=batch_size)
     return fail_count / len(scans)
 
 
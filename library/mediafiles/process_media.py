@@ -1,10 +1,10 @@
-import argparse, concurrent.futures, json, math, os, sqlite3, subprocess
+import argparse, concurrent.futures, json, math, os, sqlite3, subprocess, threading, time
 from contextlib import suppress
 from pathlib import Path
 from shutil import which
 
 from library import usage
-from library.mediadb import db_history
+from library.mediadb import db_history, db_process_jobs
 from library.mediafiles import process_ffmpeg, process_image, process_text
 from library.utils import (
     arggroups,
@@ -23,6 +23,7 @@ from library.utils import (
     sqlgroups,
     strings,
 )
+from library.utils.download_scheduler import DownloadScheduler
 from library.utils.log_utils import log
 
 
@@ -82,6 +83,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--continue-from", help="Skip media until specific file path is seen")
     parser.add_argument("--move", help="Directory to move successful files")
     parser.add_argument("--move-broken", help="Directory to move unsuccessful files")
+    parser.add_argument(
+        "--process-workers",
+        "--workers",
+        type=int,
+        help="Process up to N files at the same time (default: based on CPU cores and available RAM)",
+    )
 
     arggroups.process_ffmpeg(parser)
     arggroups.clobber(parser)
@@ -303,18 +310,207 @@ def check_shrink(args, m) -> list:
     return []
 
 
+def default_workers() -> int:
+    cores = os.cpu_count() or 1
+    workers = max(cores // 4, 1)  # ffmpeg and ImageMagick use several threads per job
+
+    with suppress(ValueError, OSError, AttributeError):
+        available_ram = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+        workers = min(workers, max(available_ram // (2 * 1024**3), 1))  # ~2GiB per job
+    return workers
+
+
+def job_priority(args, m) -> float:
+    # estimated bytes saved per second of processing
+    return m["savings"] / (m["processing_time"] or args.transcoding_image_time)
+
+
+unarchive_lock = threading.Lock()
+
+
+def process_job(args, m, uncompressed_archives) -> dict | None:
+    """
+    Transcode one file; runs in a worker thread so database changes are left to save_result
+    """
+    if m.get("compressed_size") and os.path.exists(m["archive_path"]):
+        with unarchive_lock:
+            if m["archive_path"] not in uncompressed_archives:
+                uncompressed_archives.add(m["archive_path"])
+
+                if args.simulate:
+                    log.info("Unarchiving %s", m["archive_path"])
+                else:
+                    processes.unar_delete(m["archive_path"], flatten=False)
+
+    if not os.path.exists(m["path"]):
+        log.error("[%s]: FileNotFoundError", m["path"])
+        m["time_deleted"] = consts.APPLICATION_START
+        return m
+
+    if args.simulate:
+        if m["media_type"] in ("Audio", "Video"):
+            log.info("FFMPEG processing %s", m["path"])
+        elif m["media_type"] == "Image":
+            log.info("ImageMagick processing %s", m["path"])
+        elif m["media_type"] == "Text":
+            log.info("Calibre processing %s", m["path"])
+        else:
+            raise NotImplementedError
+
+        m["freed_space"] = (m.get("compressed_size") or m["size"]) - m["future_size"]
+        return None
+
+    try:
+        if m["media_type"] in ("Audio", "Video"):
+            new_path = process_ffmpeg.process_path(args, m["path"])
+        elif m["media_type"] == "Image":
+            new_path = process_image.process_path(args, m["path"])
+        elif m["media_type"] == "Text":
+            new_path = process_text.process_path(args, m["path"])
+        else:
+            raise NotImplementedError
+    except (subprocess.CalledProcessError, processes.UnplayableFile):
+        new_path = None
+
+    if new_path is None:
+        m["time_deleted"] = consts.APPLICATION_START
+    elif isinstance(new_path, list):
+        new_outputs = []
+        for output_path in new_path:
+            output_path = str(output_path)
+            try:
+                duration = processes.FFProbe(output_path).duration
+            except (TimeoutError, subprocess.TimeoutExpired):
+                log.error(f"FFProbe timed out. {output_path}")
+                continue
+            except processes.UnplayableFile:
+                if args.delete_unplayable:
+                    log.warning("Deleting unplayable (ffprobe): %s", output_path)
+                    Path(output_path).unlink(missing_ok=True)
+                continue
+            new_outputs.append(
+                {
+                    "path": output_path,
+                    "size": os.stat(output_path).st_size,
+                    "duration": duration,
+                }
+            )
+
+        if len(new_outputs) != len(new_path):
+            m["time_deleted"] = consts.APPLICATION_START
+        else:
+            m["new_outputs"] = new_outputs
+            m["new_path"] = new_outputs[0]["path"]
+            m["new_size"] = new_outputs[0]["size"]
+            m["total_new_size"] = sum(output["size"] for output in new_outputs)
+            m["duration"] = new_outputs[0]["duration"]
+    elif new_path == m["path"]:
+        if args.move:
+            # move original file
+            dest = path_utils.relative_from_mountpoint(m["path"], args.move)
+            shell_utils.rename_move_file(m["path"], dest)
+        return None
+    else:
+        if m["media_type"] in ("Audio", "Video", "Image"):
+            m["new_path"] = str(new_path)
+            m["new_size"] = os.stat(new_path).st_size
+        elif m["media_type"] in ("Text",):
+            m["new_path"] = str(new_path)
+            for p in [
+                os.path.join(new_path, "index.html"),
+                os.path.join(new_path, "OEBPS"),
+            ]:
+                if os.path.exists(p):
+                    m["new_path"] = p
+                    break
+
+            m["new_size"] = path_utils.folder_size(new_path)
+
+        if m["media_type"] in ("Audio", "Video"):
+            try:
+                m["duration"] = processes.FFProbe(new_path).duration
+            except (TimeoutError, subprocess.TimeoutExpired):
+                log.error(f"FFProbe timed out. {new_path}")
+                return None
+            except processes.UnplayableFile:
+                if args.delete_unplayable:
+                    log.warning("Deleting unplayable (ffprobe): %s", new_path)
+                    Path(new_path).unlink(missing_ok=True)
+                return None
+
+        if not os.path.exists(m["path"]):
+            m["freed_space"] = (m.get("compressed_size") or m["size"]) - m.get("total_new_size", m["new_size"])
+
+    if args.move and not m.get("time_deleted") and m.get("new_path"):
+        if m.get("new_outputs"):
+            for output in m["new_outputs"]:
+                dest = path_utils.relative_from_mountpoint(output["path"], args.move)
+                shell_utils.rename_move_file(output["path"], dest)
+                output["path"] = dest
+            m["new_path"] = m["new_outputs"][0]["path"]
+        else:
+            dest = path_utils.relative_from_mountpoint(m["new_path"], args.move)
+            shell_utils.rename_move_file(m["new_path"], dest)
+    elif args.move_broken and m.get("time_deleted") and os.path.exists(m["path"]):
+        dest = path_utils.relative_from_mountpoint(m["path"], args.move_broken)
+        shell_utils.rename_move_file(m["path"], dest)
+
+    return m
+
+
+def save_result(args, m) -> None:
+    with suppress(sqlite3.OperationalError), args.db.conn:
+        if m.get("time_deleted"):
+            args.db.conn.execute("UPDATE media set time_deleted = ? where path = ?", [m["time_deleted"], m["path"]])
+        elif m.get("new_path") and m.get("new_path") != m["path"]:
+            args.db.conn.execute("DELETE FROM media where path = ?", [m["new_path"]])
+            args.db.conn.execute(
+                "UPDATE media SET path = ?, size = ?, duration = ? WHERE path = ?",
+                [m["new_path"], m["new_size"], nums.safe_int(m.get("duration")), m["path"]],
+            )
+            if m.get("new_outputs"):
+                media_columns = db_utils.columns(args, "media")
+                for output in m["new_outputs"][1:]:
+                    args.db.conn.execute("DELETE FROM media where path = ?", [output["path"]])
+                    entry = {
+                        key: value
+                        for key, value in m.items()
+                        if key in media_columns and key not in {"id", "path", "size", "duration"}
+                    }
+                    entry |= output
+                    args.db["media"].insert(
+                        entry,
+                        pk=["playlists_id", "path"],
+                        alter=False,
+                        replace=True,
+                    )
+
+
 def process_media() -> None:
     args = parse_args()
     media = collect_media(args)
 
+    use_queue = args.database and not args.simulate
+    resumed_jobs = {}
+    if use_queue:
+        db_process_jobs.create(args)
+        resumed_jobs = db_process_jobs.get_unfinished(args, [m["path"] for m in media])
+        if resumed_jobs:
+            log.warning("Resuming %s unfinished jobs", len(resumed_jobs))
+            media = [m for m in media if m["path"] not in resumed_jobs]
+
     mp_args = argparse.Namespace(**{k: v for k, v in args.__dict__.items() if k not in {"db"}})
     with concurrent.futures.ThreadPoolExecutor() as executor:  # mostly for lsar but also ffprobe
         futures = {executor.submit(check_shrink, mp_args, m) for m in media}
     media = iterables.conform(v.result() for v in futures)
 
-    media = sorted(
-        media, key=lambda d: d["savings"] / (d["processing_time"] or args.transcoding_image_time), reverse=True
-    )
+    for m in resumed_jobs.values():
+        if m["attempts"] >= db_process_jobs.MAX_ATTEMPTS:
+            log.warning("[%s]: Skipping after %s attempts", m["path"], m["attempts"])
+        else:
+            media.append(m)
+
+    media = sorted(media, key=lambda d: job_priority(args, d), reverse=True)
 
     if args.continue_from:
         media = iterables.tail_from(media, args.continue_from, key="path")
@@ -368,170 +564,49 @@ def process_media() -> None:
     print("Estimated savings:", strings.file_size(savings))
     print("Estimated processing time:", strings.duration(processing_time))
 
+    if not (args.no_confirm or devices.confirm("Proceed?")):
+        return
+
+    if use_queue:
+        db_process_jobs.queue(args, media, priority=lambda d: job_priority(args, d))
+
     uncompressed_archives = set()
     new_free_space = 0
-    if args.no_confirm or devices.confirm("Proceed?"):
-        for m in media:
-            log.info(
-                "%s freed. Processing %s (%s)",
-                strings.file_size(new_free_space),
+    workers = args.process_workers or default_workers()
+    scheduler = DownloadScheduler(
+        workers=workers,
+        per_domain=workers,
+        lookahead=workers * 2,
+        key=lambda m: m["media_type"],
+    )
+
+    def run_job(m):
+        log.info(
+            "%s freed. Processing %s (%s)",
+            strings.file_size(new_free_space),
+            m["path"],
+            strings.file_size(m["size"]),
+        )
+        if use_queue:
+            scheduler.write(db_process_jobs.start, args, m["path"])
+        start_time = time.monotonic()
+        return process_job(args, m, uncompressed_archives), time.monotonic() - start_time
+
+    def on_result(m, result):
+        nonlocal new_free_space
+        processed_m, run_time = result
+
+        new_free_space += m.get("freed_space") or 0
+        if processed_m is not None and args.database:
+            save_result(args, processed_m)
+        if use_queue:
+            db_process_jobs.finish(
+                args,
                 m["path"],
-                strings.file_size(m["size"]),
+                failed=bool(m.get("time_deleted")),
+                run_time=run_time,
+                new_path=m.get("new_path"),
+                new_size=m.get("total_new_size", m.get("new_size")),
             )
 
-            if m.get("compressed_size") and os.path.exists(m["archive_path"]):
-                if m["archive_path"] not in uncompressed_archives:
-                    uncompressed_archives.add(m["archive_path"])
-
-                    if args.simulate:
-                        log.info("Unarchiving %s", m["archive_path"])
-                    else:
-                        processes.unar_delete(m["archive_path"], flatten=False)
-
-            if not os.path.exists(m["path"]):
-                log.error("[%s]: FileNotFoundError", m["path"])
-                m["time_deleted"] = consts.APPLICATION_START
-                if args.database:
-                    with suppress(sqlite3.OperationalError), args.db.conn:
-                        args.db.conn.execute(
-                            "UPDATE media set time_deleted = ? where path = ?", [m["time_deleted"], m["path"]]
-                        )
-                continue
-
-            if args.simulate:
-                if m["media_type"] in ("Audio", "Video"):
-                    log.info("FFMPEG processing %s", m["path"])
-                elif m["media_type"] == "Image":
-                    log.info("ImageMagick processing %s", m["path"])
-                elif m["media_type"] == "Text":
-                    log.info("Calibre processing %s", m["path"])
-                else:
-                    raise NotImplementedError
-
-                new_free_space += (m.get("compressed_size") or m["size"]) - m["future_size"]
-            else:
-                try:
-                    if m["media_type"] in ("Audio", "Video"):
-                        new_path = process_ffmpeg.process_path(args, m["path"])
-                    elif m["media_type"] == "Image":
-                        new_path = process_image.process_path(args, m["path"])
-                    elif m["media_type"] == "Text":
-                        new_path = process_text.process_path(args, m["path"])
-                    else:
-                        raise NotImplementedError
-                except (subprocess.CalledProcessError, processes.UnplayableFile):
-                    new_path = None
-
-                if new_path is None:
-                    m["time_deleted"] = consts.APPLICATION_START
-                elif isinstance(new_path, list):
-                    new_outputs = []
-                    for output_path in new_path:
-                        output_path = str(output_path)
-                        try:
-                            duration = processes.FFProbe(output_path).duration
-                        except (TimeoutError, subprocess.TimeoutExpired):
-                            log.error(f"FFProbe timed out. {output_path}")
-                            continue
-                        except processes.UnplayableFile:
-                            if args.delete_unplayable:
-                                log.warning("Deleting unplayable (ffprobe): %s", output_path)
-                                Path(output_path).unlink(missing_ok=True)
-                            continue
-                        new_outputs.append(
-                            {
-                                "path": output_path,
-                                "size": os.stat(output_path).st_size,
-                                "duration": duration,
-                            }
-                        )
-
-                    if len(new_outputs) != len(new_path):
-                        m["time_deleted"] = consts.APPLICATION_START
-                    else:
-                        m["new_outputs"] = new_outputs
-                        m["new_path"] = new_outputs[0]["path"]
-                        m["new_size"] = new_outputs[0]["size"]
-                        m["total_new_size"] = sum(output["size"] for output in new_outputs)
-                        m["duration"] = new_outputs[0]["duration"]
-                elif new_path == m["path"]:
-                    if args.move:
-                        # move original file
-                        dest = path_utils.relative_from_mountpoint(m["path"], args.move)
-                        shell_utils.rename_move_file(m["path"], dest)
-                    continue
-                else:
-                    if m["media_type"] in ("Audio", "Video", "Image"):
-                        m["new_path"] = str(new_path)
-                        m["new_size"] = os.stat(new_path).st_size
-                    elif m["media_type"] in ("Text",):
-                        m["new_path"] = str(new_path)
-                        for p in [
-                            os.path.join(new_path, "index.html"),
-                            os.path.join(new_path, "OEBPS"),
-                        ]:
-                            if os.path.exists(p):
-                                m["new_path"] = p
-                                break
-
-                        m["new_size"] = path_utils.folder_size(new_path)
-
-                    if m["media_type"] in ("Audio", "Video"):
-                        try:
-                            m["duration"] = processes.FFProbe(new_path).duration
-                        except (TimeoutError, subprocess.TimeoutExpired):
-                            log.error(f"FFProbe timed out. {new_path}")
-                            continue
-                        except processes.UnplayableFile:
-                            if args.delete_unplayable:
-                                log.warning("Deleting unplayable (ffprobe): %s", new_path)
-                                Path(new_path).unlink(missing_ok=True)
-                            continue
-
-                    if not os.path.exists(m["path"]):
-                        new_free_space += (m.get("compressed_size") or m["size"]) - m.get(
-                            "total_new_size", m["new_size"]
-                        )
-
-                if args.move and not m.get("time_deleted") and m.get("new_path"):
-                    if m.get("new_outputs"):
-                        for output in m["new_outputs"]:
-                            dest = path_utils.relative_from_mountpoint(output["path"], args.move)
-                            shell_utils.rename_move_file(output["path"], dest)
-                            output["path"] = dest
-                        m["new_path"] = m["new_outputs"][0]["path"]
-                    else:
-                        dest = path_utils.relative_from_mountpoint(m["new_path"], args.move)
-                        shell_utils.rename_move_file(m["new_path"], dest)
-                elif args.move_broken and m.get("time_deleted") and os.path.exists(m["path"]):
-                    dest = path_utils.relative_from_mountpoint(m["path"], args.move_broken)
-                    shell_utils.rename_move_file(m["path"], dest)
-
-                if args.database:
-                    with suppress(sqlite3.OperationalError), args.db.conn:
-                        if m.get("time_deleted"):
-                            args.db.conn.execute(
-                                "UPDATE media set time_deleted = ? where path = ?", [m["time_deleted"], m["path"]]
-                            )
-                        elif m.get("new_path") and m.get("new_path") != m["path"]:
-                            args.db.conn.execute("DELETE FROM media where path = ?", [m["new_path"]])
-                            args.db.conn.execute(
-                                "UPDATE media SET path = ?, size = ?, duration = ? WHERE path = ?",
-                                [m["new_path"], m["new_size"], nums.safe_int(m.get("duration")), m["path"]],
-                            )
-                            if m.get("new_outputs"):
-                                media_columns = db_utils.columns(args, "media")
-                                for output in m["new_outputs"][1:]:
-                                    args.db.conn.execute("DELETE FROM media where path = ?", [output["path"]])
-                                    entry = {
-                                        key: value
-                                        for key, value in m.items()
-                                        if key in media_columns and key not in {"id", "path", "size", "duration"}
-                                    }
-                                    entry |= output
-                                    args.db["media"].insert(
-                                        entry,
-                                        pk=["playlists_id", "path"],
-                                        alter=False,
-                                        replace=True,
-                                    )
+    scheduler.run(media, run_job, on_result)
@@ -1,4 +1,5 @@
-import os, sqlite3
+import heapq, itertools, os, sqlite3, statistics
+from collections import Counter
 
 import humanize
 import pandas as pd
@@ -48,6 +49,15 @@ def parse_args():
         help="Exclude disks that do not have enough space",
     )
     parser.add_argument("--max-io-rate", type=nums.human_to_bytes, default="100MiB", help="Exclude disks that are busy")
+    parser.add_argument("--max-per-computer", type=int, help="Maximum number of torrents to allocate to each computer")
+    parser.add_argument(
+        "--max-per-tracker", type=int, help="Maximum number of torrents from the same tracker to allocate to each disk"
+    )
+    parser.add_argument(
+        "--greedy",
+        action="store_true",
+        help="Fill one disk at a time (smallest free space first) instead of spreading torrents across disks",
+    )
     parser.add_argument("--hide-unallocated", action="store_true", help="Hide unallocated disks")
     parser.add_argument("--hide-unallocatable", action="store_true", help="Hide unallocatable torrents")
 
@@ -110,6 +120,167 @@ def get_disks(args, computer_db):
     return disks
 
 
+def fill_ratio(disk, size=0) -> float:
+    return (disk["total"] - disk["free"] + disk["download_size"] + size) / max(disk["total"], 1)
+
+
+def allocation_stats(disks) -> dict:
+    fill_ratios = [fill_ratio(d) for d in disks]
+    return {
+        "allocated_count": sum(len(d["downloads"]) for d in disks),
+        "allocated_size": sum(d["download_size"] for d in disks),
+        "max_fill": max(fill_ratios, default=0),
+        "fill_stddev": statistics.pstdev(fill_ratios) if fill_ratios else 0,
+    }
+
+
+class Allocation:
+    """
+    Assign torrents to disks while keeping min_free_space, max_per_computer, and max_per_tracker
+
+    allocate_balanced places each torrent (in priority order) on the least-full disk which can take it and then
+    moves or swaps torrents away from the fullest disks while that lowers their fill ratio
+    """
+
+    def __init__(self, args, disks):
+        self.args = args
+        self.disks = [d | {"downloads": [], "download_size": 0, "tracker_counts": Counter()} for d in disks]
+        self.host_counts = Counter()
+
+    def available_space(self, disk) -> int:
+        return disk["free"] - self.args.min_free_space - disk["download_size"]
+
+    def has_tracker_room(self, disk, tracker) -> bool:
+        return not self.args.max_per_tracker or disk["tracker_counts"][tracker] < self.args.max_per_tracker
+
+    def is_host_full(self, disk) -> bool:
+        return bool(self.args.max_per_computer) and self.host_counts[disk["host"]] >= self.args.max_per_computer
+
+    def fits(self, disk, torrent) -> bool:
+        return (
+            torrent["size"] < self.available_space(disk)
+            and not self.is_host_full(disk)
+            and self.has_tracker_room(disk, torrent["tracker"])
+        )
+
+    def add(self, disk, torrent) -> None:
+        disk["downloads"].append(torrent)
+        disk["download_size"] += torrent["size"]
+        disk["tracker_counts"][torrent["tracker"]] += 1
+        self.host_counts[disk["host"]] += 1
+
+    def remove(self, disk, torrent) -> None:
+        disk["downloads"].remove(torrent)
+        disk["download_size"] -= torrent["size"]
+        disk["tracker_counts"][torrent["tracker"]] -= 1
+        self.host_counts[disk["host"]] -= 1
+
+    def allocate_greedy(self, torrents) -> None:
+        # fill one disk at a time, smallest free space first
+        allocated = set()
+        for disk in self.disks:
+            for torrent in torrents:
+                if torrent["path"] not in allocated and self.fits(disk, torrent):
+                    allocated.add(torrent["path"])
+                    self.add(disk, torrent)
+
+    def place(self, torrents) -> list:
+        largest_space = max((self.available_space(d) for d in self.disks), default=0)
+        heap = [(fill_ratio(d), i) for i, d in enumerate(self.disks)]
+        heapq.heapify(heap)
+
+        unallocated = []
+        for torrent in torrents:
+            if torrent["size"] >= largest_space:
+                unallocated.append(torrent)
+                continue
+
+            skipped = []
+            while heap:
+                entry = heapq.heappop(heap)
+                disk = self.disks[entry[1]]
+                if self.fits(disk, torrent):
+                    self.add(disk, torrent)
+                    heapq.heappush(heap, (fill_ratio(disk), entry[1]))
+                    break
+                if not self.is_host_full(disk):  # computers never get less full while placing
+                    skipped.append(entry)
+            else:
+                unallocated.append(torrent)
+
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+
+        return unallocated
+
+    def can_move(self, src, dst, torrent) -> bool:
+        return (
+            torrent["size"] < self.available_space(dst)
+            and (dst["host"] == src["host"] or not self.is_host_full(dst))
+            and self.has_tracker_room(dst, torrent["tracker"])
+        )
+
+    def can_swap(self, src, dst, src_torrent, dst_torrent) -> bool:
+        if not (
+            src_torrent["size"] < self.available_space(dst) + dst_torrent["size"]
+            and dst_torrent["size"] < self.available_space(src) + src_torrent["size"]
+        ):
+            return False
+        if src_torrent["tracker"] == dst_torrent["tracker"]:
+            return True
+        return self.has_tracker_room(dst, src_torrent["tracker"]) and self.has_tracker_room(src, dst_torrent["tracker"])
+
+    def improve(self, src, min_gain=0.001, swap_candidates=8) -> bool:
+        src_fill = fill_ratio(src)
+        limit = src_fill - min_gain
+        others = sorted(((fill_ratio(d), d) for d in self.disks if d is not src), key=lambda t: t[0])
+        others = list(itertools.takewhile(lambda t: t[0] < limit, others))
+        src_torrents = sorted(src["downloads"], key=lambda t: t["size"], reverse=True)
+
+        for torrent in src_torrents:
+            if src_fill - torrent["size"] / src["total"] >= limit:
+                break  # the remaining torrents are too small to make a difference
+            for dst_fill, dst in others:
+                if dst_fill + torrent["size"] / dst["total"] < limit and self.can_move(src, dst, torrent):
+                    self.remove(src, torrent)
+                    self.add(dst, torrent)
+                    return True
+
+        for dst_fill, dst in others[:swap_candidates]:
+            dst_torrents = sorted(dst["downloads"], key=lambda t: t["size"])
+            for src_torrent in src_torrents:
+                for dst_torrent in dst_torrents:
+                    delta = src_torrent["size"] - dst_torrent["size"]
+                    if delta <= 0 or dst_fill + delta / dst["total"] >= limit:
+                        break
+                    if src_fill - delta / src["total"] < limit and self.can_swap(src, dst, src_torrent, dst_torrent):
+                        self.remove(src, src_torrent)
+                        self.remove(dst, dst_torrent)
+                        self.add(dst, src_torrent)
+                        self.add(src, dst_torrent)
+                        return True
+        return False
+
+    def rebalance(self, max_rounds=1000) -> None:
+        stuck = set()
+        for _ in range(max_rounds):
+            candidates = [(fill_ratio(d), i) for i, d in enumerate(self.disks) if d["downloads"] and i not in stuck]
+            if not candidates:
+                break
+
+            _fill, i = max(candidates)
+            if self.improve(self.disks[i]):
+                stuck.clear()
+            else:
+                stuck.add(i)
+
+    def allocate_balanced(self, torrents) -> None:
+        unallocated = self.place(torrents)
+        self.rebalance()
+        if unallocated:
+            self.place(unallocated)  # rebalancing may have opened up space
+
+
 def print_torrent_info(disks):
     for d in disks:
         if d["downloads"]:
@@ -143,6 +314,7 @@ def print_disks(args, disks):
                 "before_free": strings.file_size(d["free"]),
                 "download_size": strings.file_size(sum(t["size"] for t in d["downloads"])),
                 "after_free": strings.file_size(d["free"] - sum(t["size"] for t in d["downloads"])),
+                "after_fill": strings.percent(fill_ratio(d)),
             }
             for d in disks
             if not args.hide_unallocated or (args.hide_unallocated and d["downloads"])
@@ -234,16 +406,12 @@ def allocate_torrents():
         ).to_dict(orient="records")
     torrents = torrents[: args.limit]
 
-    downloaded_torrents = set()
-    for disk in disks:
-        available_space = disk["free"] - args.min_free_space
-
-        disk["downloads"] = []
-        for torrent in torrents:
-            if torrent["size"] < available_space and torrent["path"] not in downloaded_torrents:
-                downloaded_torrents.add(torrent["path"])
-                available_space -= torrent["size"]
-                disk["downloads"].append(torrent)
+    allocation = Allocation(args, disks)
+    if args.greedy:
+        allocation.allocate_greedy(torrents)
+    else:
+        allocation.allocate_balanced(torrents)
+    disks = allocation.disks
 
     # TODO: use nvme download_dir
     # but better to chunk one drive at a time because temp download _moving_ can occur
@@ -260,8 +428,11 @@ def allocate_torrents():
     if not allocated_torrents:
         processes.exit_error("No torrents could be allocated")
 
-    total_size = sum(t["size"] for t in allocated_torrents)
-    print(f"{len(allocated_torrents)} torrents allocated ({strings.file_size(total_size)})")
+    stats = allocation_stats(disks)
+    print(
+        f"{stats['allocated_count']} torrents allocated ({strings.file_size(stats['allocated_size'])}).",
+        f"Max disk fill {strings.percent(stats['max_fill'])} (stddev {strings.percent(stats['fill_stddev'])})",
+    )
 
     if not args.print and (args.no_confirm or devices.confirm("Allocate and start downloads?")):
         import paramiko.ssh_exception
@@ -11,7 +11,17 @@ from time import sleep
 from library.createdb import subtitle
 from library.mediadb import db_history, db_media
 from library.playback import playback_control, post_actions
-from library.utils import consts, db_utils, devices, iterables, log_utils, mpv_utils, path_utils, processes
+from library.utils import (
+    consts,
+    db_utils,
+    devices,
+    file_utils,
+    iterables,
+    log_utils,
+    mpv_utils,
+    path_utils,
+    processes,
+)
 from library.utils.consts import SC
 from library.utils.log_utils import log
 
@@ -374,6 +384,14 @@ def get_multiple_player_template(args) -> list[tuple[str, str]]:
 
 
 class MediaPrefetcher:
+    """
+    Prepare upcoming media in the background while the current media plays
+
+    prep_media runs on one long-lived worker thread which owns its own DB connection.
+    With --readahead the first bytes of upcoming local files are pulled into the page cache
+    so that playback from sleeping HDDs or network mounts starts without waiting
+    """
+
     def __init__(self, args, media: list[dict]):
         self.args = Namespace(**{k: v for k, v in args.__dict__.items() if k not in {"db"}})
         self.media = media
@@ -381,23 +399,34 @@ class MediaPrefetcher:
         self.remaining = len(media)
         self.ignore_paths = set()
         self.futures = deque()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.readahead_executor = ThreadPoolExecutor(max_workers=1) if getattr(args, "readahead", None) else None
 
     def fetch(self):
-        if self.media:
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                fill_count = 0
-                while self.media and len(self.futures) < max(1, self.args.prefetch):
-                    m = self.media.pop()
-                    if m["path"] in self.ignore_paths:
-                        continue
-
-                    future = executor.submit(self.prep_media, m)  # if self.args.prefetch > 1 else []
-                    self.ignore_paths.add(m["path"])
-                    self.futures.append(future)
-                    fill_count += 1
-                # log.debug("prefetch full (inserted %s)", fill_count)
+        while self.media and len(self.futures) < max(1, self.args.prefetch):
+            m = self.media.pop()
+            if m["path"] in self.ignore_paths:
+                continue
+
+            if self.readahead_executor and not m["path"].startswith("http"):
+                self.readahead_executor.submit(file_utils.read_ahead, self.args.prefix + m["path"], self.args.readahead)
+            self.futures.append(self.executor.submit(self.prep_media, m))
+            self.ignore_paths.add(m["path"])
         return self
 
+    def close_db(self):
+        if getattr(self.args, "db", None):
+            self.args.db.close()
+            self.args.db = None
+
+    def close(self):
+        for future in self.futures:
+            future.cancel()
+        self.executor.submit(self.close_db)  # the connection belongs to the worker thread
+        self.executor.shutdown(wait=False)
+        if self.readahead_executor:
+            self.readahead_executor.shutdown(wait=False, cancel_futures=True)
+
     def infer_command(self, m) -> tuple[list[str], bool]:
         args = self.args
 
@@ -484,7 +513,8 @@ class MediaPrefetcher:
 
     def prep_media(self, m: dict):
         t = log_utils.Timer()
-        self.args.db = db_utils.connect(self.args)
+        if getattr(self.args, "db", None) is None:
+            self.args.db = db_utils.connect(self.args)
 
         m["original_path"] = m["path"]
         if not m["path"].startswith("http"):
@@ -705,6 +735,7 @@ def play(args, m, media_len) -> None:
 
 
 def play_list(args, media):
+    playlist = None
     try:
         playlist = MediaPrefetcher(args, media)
         playlist.fetch()
@@ -718,6 +749,8 @@ def play_list(args, media):
                     play(args, m, playlist.remaining)
 
     finally:
+        if playlist:
+            playlist.close()
         Path(args.mpv_socket).unlink(missing_ok=True)
         if args.chromecast:
             Path(consts.CAST_NOW_PLAYING).unlink(missing_ok=True)
@@ -19,6 +19,7 @@ from library.utils import (
     iterables,
     nums,
     processes,
+    profile_utils,
     shell_utils,
     sqlgroups,
 )
@@ -319,33 +320,35 @@ def process_playqueue(args) -> None:
     t = Timer()
     filter_engine_obj = filter_engine.FilterEngine(args)
 
-    if args.database:
-        db_history.create(args)
+    with profile_utils.span("query"):
+        if args.database:
+            db_history.create(args)
 
-        m_columns = filter_engine.db_utils.columns(args, "media")
-        args.table, m_columns = filter_engine_obj.apply_sql_filters(m_columns)
-        args.select_sql = sqlgroups.media_select_sql(args, m_columns)
+            m_columns = filter_engine.db_utils.columns(args, "media")
+            args.table, m_columns = filter_engine_obj.apply_sql_filters(m_columns)
+            args.select_sql = sqlgroups.media_select_sql(args, m_columns)
 
-        if args.action == SC.filesystem:
-            db_sql_func = lambda a: sqlgroups.fs_sql(a, a.limit)
-        else:
-            db_sql_func = sqlgroups.media_sql
+            if args.action == SC.filesystem:
+                db_sql_func = lambda a: sqlgroups.fs_sql(a, a.limit)
+            else:
+                db_sql_func = sqlgroups.media_sql
 
-        if args.playlists:
-            args.playlists = [p if p.startswith("http") else str(Path(p).resolve()) for p in args.playlists]
-            media = db_media.get_playlist_media(args, args.playlists)
+            if args.playlists:
+                args.playlists = [p if p.startswith("http") else str(Path(p).resolve()) for p in args.playlists]
+                media = db_media.get_playlist_media(args, args.playlists)
+            else:
+                media = filter_engine_obj.get_filtered_data(db_sql_func=db_sql_func)
+                log.debug("len(media_sql) = %s", len(media))
+            log.debug("query: %s", t.elapsed())
         else:
-            media = filter_engine_obj.get_filtered_data(db_sql_func=db_sql_func)
-            log.debug("len(media_sql) = %s", len(media))
-        log.debug("query: %s", t.elapsed())
-    else:
-        media = file_or_folder_media(args, args.paths)
-        log.debug("file_or_folder_media: %s", t.elapsed())
+            media = file_or_folder_media(args, args.paths)
+            log.debug("file_or_folder_media: %s", t.elapsed())
 
     if args.fetch_siblings:
         media = db_media.get_sibling_media(args, media)
 
-    media = filter_engine_obj.apply_post_filters(media)
+    with profile_utils.span("post_filters"):
+        media = filter_engine_obj.apply_post_filters(media)
     log.debug("apply_post_filters: %s", t.elapsed())
 
     if not media:
@@ -424,49 +427,50 @@ def process_playqueue(args) -> None:
     if args.play_in_order:
         media = db_media.natsort_media(args, media)
 
-    if args.re_rank:
-        import numpy as np
-        import pandas as pd
+    with profile_utils.span("sort"):
+        if args.re_rank:
+            import numpy as np
+            import pandas as pd
+
+            from library.utils import pd_utils
 
-        from library.utils import pd_utils
+            df = pd.DataFrame(media)
+            df = pd_utils.from_dict_add_path_rank(df, media, "sort")
 
-        df = pd.DataFrame(media)
-        df = pd_utils.from_dict_add_path_rank(df, media, "sort")
+            if args.regex_sort:
+                from library.text import regex_sort
 
-        if args.regex_sort:
+                sorted_media = regex_sort.sort_dicts(args, media)
+                df = pd_utils.from_dict_add_path_rank(df, sorted_media, "regex_sort")
+                log.debug("regex-sort: %s", t.elapsed())
+            elif args.cluster_sort:
+                from library.text import cluster_sort
+
+                sorted_media = cluster_sort.sort_dicts(args, media)
+                df = pd_utils.from_dict_add_path_rank(df, sorted_media, "cluster_sort")
+                log.debug("cluster-sort: %s", t.elapsed())
+
+            column_weights = {
+                k.lstrip("-"): {
+                    "direction": "desc" if k.startswith("-") else "asc",
+                    "weight": v or 1,
+                }
+                for k, v in args.re_rank.items()
+            }
+            df = pd_utils.rank_dataframe(df, column_weights)
+            media = df.replace({np.nan: None}).to_dict(orient="records")
+            log.debug("re-rank: %s", t.elapsed())
+        elif args.regex_sort:
             from library.text import regex_sort
 
-            sorted_media = regex_sort.sort_dicts(args, media)
-            df = pd_utils.from_dict_add_path_rank(df, sorted_media, "regex_sort")
+            media = regex_sort.sort_dicts(args, media)
             log.debug("regex-sort: %s", t.elapsed())
         elif args.cluster_sort:
             from library.text import cluster_sort
 
-            sorted_media = cluster_sort.sort_dicts(args, media)
-            df = pd_utils.from_dict_add_path_rank(df, sorted_media, "cluster_sort")
+            media = cluster_sort.sort_dicts(args, media)
             log.debug("cluster-sort: %s", t.elapsed())
 
-        column_weights = {
-            k.lstrip("-"): {
-                "direction": "desc" if k.startswith("-") else "asc",
-                "weight": v or 1,
-            }
-            for k, v in args.re_rank.items()
-        }
-        df = pd_utils.rank_dataframe(df, column_weights)
-        media = df.replace({np.nan: None}).to_dict(orient="records")
-        log.debug("re-rank: %s", t.elapsed())
-    elif args.regex_sort:
-        from library.text import regex_sort
-
-        media = regex_sort.sort_dicts(args, media)
-        log.debug("regex-sort: %s", t.elapsed())
-    elif args.cluster_sort:
-        from library.text import cluster_sort
-
-        media = cluster_sort.sort_dicts(args, media)
-        log.debug("cluster-sort: %s", t.elapsed())
-
     if args.timeout_size:
         max_size = nums.human_to_bytes(args.timeout_size)
         media = filter_total_size(media, max_size)
@@ -482,10 +486,12 @@ def process_playqueue(args) -> None:
             args.mark_watched,
         ]
     ):
-        media_printer.media_printer(args, media)
+        with profile_utils.span("print"):
+            media_printer.media_printer(args, media)
         return None
     else:
-        media_player.play_list(args, media)
+        with profile_utils.span("play"):
+            media_player.play_list(args, media)
         return None
 
 
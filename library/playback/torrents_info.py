@@ -1,5 +1,6 @@
-import argparse, os, statistics
+import argparse, os, statistics, threading, time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from random import randint, shuffle
 from statistics import mean, median
@@ -100,7 +101,7 @@ def parse_args():
     return args
 
 
-def torrent_files(t):
+def qbt_retry(func, *args, default=None, **kwargs):
     import qbittorrentapi
 
     attempts = 10
@@ -109,57 +110,110 @@ def torrent_files(t):
         attempt += 1
 
         try:
-            return t.files
+            return func(*args, **kwargs)
         except (qbittorrentapi.APIConnectionError, ConnectionRefusedError, TimeoutError):
             sleep(randint(1, 10))
 
-    return []
+    return default
+
+
+class TorrentsSnapshot:
+    """
+    Trackers and files of many torrents without one API request per torrent per lookup
+
+    Tracker URLs for every torrent come from a single sync/maindata request (older qBittorrent versions
+    fall back to torrents/trackers per torrent). File lists are fetched once per torrent, in parallel via
+    prefetch_files. Both are reused until they are older than max_age seconds
+    """
+
+    def __init__(self, qbt_client, max_age=60):
+        self.qbt_client = qbt_client
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.trackers_by_hash = None
+        self.trackers_time = 0.0
+        self.per_torrent_trackers = False
+        self.files_by_hash = {}
+
+    def is_fresh(self, fetch_time):
+        return time.monotonic() - fetch_time < self.max_age
+
+    def load_trackers(self):
+        maindata = qbt_retry(self.qbt_client.sync_maindata, default={})
+        trackers = maindata.get("trackers")
+        if trackers is None:
+            return None  # WebAPI older than v2.2
+
+        trackers_by_hash = defaultdict(list)
+        for url, torrent_hashes in trackers.items():
+            for torrent_hash in torrent_hashes:
+                trackers_by_hash[torrent_hash].append(url)
+        return trackers_by_hash
+
+    def trackers(self, torrent_hash) -> list[str]:
+        with self.lock:
+            if self.trackers_by_hash is None or not self.is_fresh(self.trackers_time):
+                trackers_by_hash = self.load_trackers()
+                self.per_torrent_trackers = trackers_by_hash is None
+                self.trackers_by_hash = trackers_by_hash or {}
+                self.trackers_time = time.monotonic()
+
+            if self.per_torrent_trackers and torrent_hash not in self.trackers_by_hash:
+                self.trackers_by_hash[torrent_hash] = [
+                    tr.url
+                    for tr in qbt_retry(self.qbt_client.torrents_trackers, torrent_hash, default=[])
+                    if not tr.url.startswith("** [")  # DHT, PeX, LSD
+                ]
+            return self.trackers_by_hash.get(torrent_hash, [])
+
+    def cached_files(self, torrent_hash):
+        cached = self.files_by_hash.get(torrent_hash)
+        if cached and self.is_fresh(cached[0]):
+            return cached[1]
+        return None
+
+    def files(self, torrent):
+        files = self.cached_files(torrent.hash)
+        if files is None:
+            files = qbt_retry(lambda: torrent.files, default=[])
+            self.files_by_hash[torrent.hash] = (time.monotonic(), files)
+        return files
+
+    def prefetch_files(self, torrents, max_workers=16):
+        torrents = [t for t in torrents if self.cached_files(t.hash) is None]
+        if len(torrents) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                list(pool.map(self.files, torrents))
 
 
-def qbt_get_tracker(qbt_client, torrent):
-    import qbittorrentapi
+def torrent_files(t):
+    snapshot = getattr(t, "snapshot", None)
+    if snapshot is None:
+        return qbt_retry(lambda: t.files, default=[])
+    return snapshot.files(t)
 
-    attempts = 10
-    attempt = 0
-    while attempt < attempts:
-        attempt += 1
 
-        try:
-            tracker = torrent.tracker
-            if not tracker:
-                tracker = iterables.safe_unpack(
-                    sorted(
-                        (tr.url for tr in qbt_client.torrents_trackers(torrent.hash) if tr.url.startswith("http")),
-                        reverse=True,
-                    )
-                )
-            return tld_from_url(tracker)
-        except (qbittorrentapi.APIConnectionError, ConnectionRefusedError, TimeoutError):
-            sleep(randint(1, 10))
+def prefetch_torrent_files(torrents):
+    snapshot = getattr(torrents[0], "snapshot", None) if torrents else None
+    if snapshot is not None:
+        snapshot.prefetch_files(torrents)
 
-    return None
 
+def http_trackers(torrent):
+    return [url for url in torrent.snapshot.trackers(torrent.hash) if url.startswith("http")]
 
-def qbt_get_tracker_count(qbt_client, torrent):
-    import qbittorrentapi
 
-    attempts = 10
-    attempt = 0
-    while attempt < attempts:
-        attempt += 1
+def qbt_get_tracker(torrent):
+    tracker = torrent.tracker or iterables.safe_unpack(sorted(http_trackers(torrent), reverse=True))
+    return tld_from_url(tracker)
 
-        try:
-            tracker_count = len(
-                set(tr.url for tr in qbt_client.torrents_trackers(torrent.hash) if tr.url.startswith("http"))
-            )
-            return tracker_count
-        except (qbittorrentapi.APIConnectionError, ConnectionRefusedError, TimeoutError):
-            sleep(randint(1, 10))
 
-    return None
+def qbt_get_tracker_count(torrent):
+    return len(set(http_trackers(torrent)))
 
 
 def qbt_enhance_torrents(qbt_client, qbt_torrents):
+    snapshot = TorrentsSnapshot(qbt_client)
     for t in qbt_torrents:
         t.is_active = (not t.state_enum.is_complete and t.downloaded_session > 0) or (
             t.state_enum.is_complete and t.uploaded_session > 0
@@ -168,8 +222,9 @@ def qbt_enhance_torrents(qbt_client, qbt_torrents):
             t.state_enum.is_complete and t.uploaded_session == 0
         )
         t.downloading_time = t.time_active - t.seeding_time
-        t.tracker_domain = lambda self=t: qbt_get_tracker(qbt_client, self)
-        t.tracker_count = lambda self=t: qbt_get_tracker_count(qbt_client, self)
+        t.snapshot = snapshot
+        t.tracker_domain = lambda self=t: qbt_get_tracker(self)
+        t.tracker_count = lambda self=t: qbt_get_tracker_count(self)
 
 
 def filter_torrents_by_activity(args, torrents):
@@ -217,6 +272,17 @@ def filter_torrents_by_activity(args, torrents):
 
 
 def filter_torrents_by_criteria(args, torrents):
+    if (
+        "file_count" not in args.defaults
+        or "avg_sizes" not in args.defaults
+        or args.file_search
+        or args.file_exclude
+        or args.any_exists is not None
+        or args.all_exists is not None
+        or args.opened is not None
+    ):
+        prefetch_torrent_files(torrents)
+
     if "dl_speed" not in args.defaults:
         torrents = [t for t in torrents if args.dl_speed(t.dlspeed)]
     if "ul_speed" not in args.defaults:
@@ -590,10 +656,12 @@ def torrents_info():
     elif args.sort == "tracker_count":
         torrents = sorted(torrents, key=lambda t: t.tracker_count(), reverse=reverse_sort)
     elif args.sort in ["counts", "count"]:
+        prefetch_torrent_files(torrents)
         torrents = sorted(torrents, key=lambda t: len(torrent_files(t)), reverse=reverse_sort)
     elif args.sort in ["size", "total_size"]:
         torrents = sorted(torrents, key=lambda t: t.total_size, reverse=reverse_sort)
     elif args.sort in ["avg_size"]:
+        prefetch_torrent_files(torrents)
         torrents = sorted(torrents, key=lambda t: mean([f.size for f in torrent_files(t)]), reverse=reverse_sort)
     elif args.sort in ["network", "download+upload", "ingress+egress"]:
         torrents = sorted(
@@ -632,6 +700,8 @@ def torrents_info():
         )
 
     torrents = filter_torrents(args, torrents)
+    if args.file_counts:
+        prefetch_torrent_files(torrents)
 
     if args.print and "a" in args.print:
         interesting_states = [
@@ -676,13 +746,11 @@ def torrents_info():
             print_torrents_by_tracker(args, torrents)
 
     elif args.print:
-        ignore_trackers = ("** [DHT] **", "** [PeX] **", "** [LSD] **")
         for t in torrents:
             if "tr" in args.print:
-                for tr in qbt_client.torrents_trackers(t.hash):
+                for url in t.snapshot.trackers(t.hash):
                     try:
-                        if tr.url not in ignore_trackers:
-                            print(tr.url)
+                        print(url)
                     except UnicodeDecodeError:
                         pass
                 continue
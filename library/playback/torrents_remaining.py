@@ -59,6 +59,8 @@ def torrents_remaining():
 
     torrents = torrents_info.filter_torrents(args, torrents)
     torrents = natsorted(torrents, key=lambda t: t.content_path)
+    if args.file_counts:
+        torrents_info.prefetch_torrent_files(torrents)
 
     torrents_by_mountpoint = {}
     for t in torrents:
@@ -79,7 +81,9 @@ def torrents_remaining():
             {
                 "mountpoint": mountpoint,
                 "count": len(mountpoint_torrents),
-                "files": (sum(len(t.files) for t in mountpoint_torrents) if args.file_counts else None),
+                "files": (
+                    sum(len(torrents_info.torrent_files(t)) for t in mountpoint_torrents) if args.file_counts else None
+                ),
                 "size": strings.file_size(sum(t.total_size for t in mountpoint_torrents)),
                 "used": strings.file_size(used) if used else None,
                 "wasted": strings.file_size(wasted) if wasted else None,
@@ -1,34 +1,45 @@
+import itertools
+
 from library import usage
-from library.utils import arggroups, argparse_utils, file_utils, nums, web
+from library.utils import arggroups, argparse_utils, file_utils, nums, processes, web
 from library.utils.consts import DEFAULT_FILE_ROWS_READ_LIMIT
 from library.utils.log_utils import log
 from library.utils.printing import print_df, print_series
+from library.utils.sketches import HeavyHitters, HyperLogLog, Moments, QuantileSketch
 
 
 def parse_args():
     parser = argparse_utils.ArgumentParser(description="Perform EDA on one or more files", usage=usage.eda)
 
     parser.add_argument("--groupby", "--group-by", "-g", action="store_true")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Read files in chunks and report approximate statistics (reads all rows unless --end-row is set)",
+    )
     arggroups.table_like(parser)
 
-    parser.add_argument("--sort", "-u", default="random()")
+    parser.add_argument("--sort", "-u")
     arggroups.debug(parser)
 
     arggroups.paths_or_stdin(parser)
     args = parser.parse_intermixed_args()
     arggroups.args_post(args, parser)
 
+    if args.streaming:
+        if args.join_tables or args.transpose:
+            processes.exit_error("--streaming does not support --join-tables or --transpose")
+        if args.end_row == str(DEFAULT_FILE_ROWS_READ_LIMIT):
+            args.end_row = "inf"
+    if args.sort is None and not args.streaming:
+        args.sort = "random()"
+
     arggroups.table_like_post(args)
 
     return args
 
 
-def df_column_values(df, column_name) -> dict:
-    total = len(df)
-
-    null = df[column_name].isnull().sum()
-    zero = (df[column_name] == 0).sum()
-    empty = (df[column_name] == "").sum()
+def column_values(column_name, total, null, zero, empty) -> dict:
     values = total - empty - zero - null
 
     return {
@@ -44,14 +55,166 @@ def df_column_values(df, column_name) -> dict:
     }
 
 
-def print_info(args, dft):
-    import pandas as pd
+class DataFrameStats:
+    """Exact report values for a table which fits in memory"""
 
-    df_name, df = dft
+    in_memory = True
 
-    if df.shape == (0, 0):
-        print(f"Table [{df_name}] empty")
-        return
+    def __init__(self, df):
+        converted = df.convert_dtypes()
+        self.df = df
+        self.rows = len(df)
+        self.columns = df.columns.to_list()
+        self.dtypes = [(col, df.dtypes[col], converted.dtypes[col]) for col in df.columns]
+        self.summary_columns = converted.select_dtypes("number").columns.to_list()
+        self.numeric_columns = df.select_dtypes("number").columns.to_list()
+        self.categorical_columns = [s for s in self.columns if s not in self.numeric_columns]
+        self.null = df.isna().sum()
+
+    def sample(self):
+        import pandas as pd
+
+        if self.rows > 6:
+            return pd.concat([self.df.head(3), self.df.tail(3)])
+        return self.df.head(6)
+
+    def summary_statistics(self):
+        import pandas as pd
+
+        number_df = self.df.convert_dtypes().select_dtypes("number")
+        return pd.concat([number_df.describe(), number_df.agg(["sum", "skew", "kurt"])])
+
+    def bins(self, col, bins=6):
+        import pandas as pd
+
+        try:
+            return pd.cut(self.df[col], bins=bins).value_counts().sort_index()
+        except TypeError:  # putmask: first argument must be an array
+            return None
+
+    def common_values(self, col):
+        return self.df[col].value_counts()
+
+    def count_errors(self, col):
+        return None
+
+    def unique_count(self, col) -> int:
+        return self.df[col].nunique()
+
+    def groupby_describe(self, col):
+        groups = self.df.groupby(col).size()
+        groups = groups[groups >= 15]
+        if len(groups) > 0:
+            return self.df[self.df[col].isin(groups.index)].groupby(col).describe()
+        return None
+
+    def zero_and_empty(self):
+        return (self.df == 0).sum(), (self.df == "").sum()
+
+
+class StreamingStats:
+    """Exact counts and mergeable sketches for a table which is read one chunk at a time"""
+
+    in_memory = False
+
+    def __init__(self, df):
+        import pandas as pd
+
+        converted = df.convert_dtypes()
+        self.columns = df.columns.to_list()
+        self.dtypes = [(col, df.dtypes[col], converted.dtypes[col]) for col in self.columns]
+        self.summary_columns = converted.select_dtypes("number").columns.to_list()
+        self.numeric_columns = df.select_dtypes("number").columns.to_list()
+        self.categorical_columns = [s for s in self.columns if s not in self.numeric_columns]
+
+        self.rows = 0
+        self.head = df.head(0)
+        self.tail = df.head(0)
+        self.moments = {col: Moments() for col in set(self.summary_columns + self.numeric_columns)}
+        self.quantiles = {col: QuantileSketch() for col in self.moments}
+        self.distinct = {col: HyperLogLog() for col in self.categorical_columns}
+        self.common = {col: HeavyHitters() for col in self.categorical_columns}
+        self.null = pd.Series(0, index=self.columns)
+        self.zero = pd.Series(0, index=self.columns)
+        self.empty = pd.Series(0, index=self.columns)
+
+    def update(self, df) -> None:
+        import pandas as pd
+
+        df = df.reindex(columns=self.columns)  # later chunks of jsonl files may have other keys
+
+        self.rows += len(df)
+        if len(self.head) < 6:
+            self.head = pd.concat([self.head, df.head(6 - len(self.head))])
+        self.tail = pd.concat([self.tail, df.tail(3)]).tail(3)
+
+        for col, sketch in self.quantiles.items():
+            values = pd.to_numeric(df[col], errors="coerce").dropna().to_numpy(dtype=float)
+            sketch.update(values)
+            self.moments[col].update(values)
+
+        for col in self.categorical_columns:
+            values = df[col].dropna()
+            self.distinct[col].update(values)
+            self.common[col].update(values)
+
+        self.null += df.isnull().sum()
+        self.zero += (df == 0).sum()
+        self.empty += (df == "").sum()
+
+    def sample(self):
+        import pandas as pd
+
+        if self.rows > 6:
+            return pd.concat([self.head.head(3), self.tail])
+        return self.head
+
+    def summary_statistics(self):
+        import pandas as pd
+
+        stats = {}
+        for col in self.summary_columns:
+            m = self.moments[col]
+            quartiles = self.quantiles[col].quantiles([0.25, 0.5, 0.75])
+            stats[col] = [m.n, m.mean, m.std, m.min, *quartiles, m.max, m.total, m.skew, m.kurt]
+        return pd.DataFrame(
+            stats, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max", "sum", "skew", "kurt"]
+        )
+
+    def bins(self, col, bins=6):
+        import numpy as np
+        import pandas as pd
+
+        m = self.moments[col]
+        if m.n == 0:
+            return None
+
+        # pd.cut only looks at the min and max to choose the edges
+        intervals, edges = pd.cut(pd.Series([m.min, m.max]), bins=bins, retbins=True)
+        ranks = self.quantiles[col].ranks(edges)
+        ranks[0] = 0
+        return pd.Series(np.diff(ranks), index=intervals.cat.categories.rename(col), name="count")
+
+    def common_values(self, col):
+        return self.common[col].counts.rename_axis(col)
+
+    def count_errors(self, col):
+        return self.common[col].errors
+
+    def unique_count(self, col) -> int:
+        return self.distinct[col].count()
+
+    def zero_and_empty(self):
+        return self.zero, self.empty
+
+
+def print_report(args, stats):
+    """
+    Print the EDA report for DataFrameStats or StreamingStats
+
+    Streaming reports note the error bounds of their approximate tables
+    """
+    import pandas as pd
 
     if args.end_row is None:
         partial_dataset_msg = ""
@@ -59,34 +222,31 @@ def print_info(args, dft):
         partial_dataset_msg = f"(limited by default --end-row {args.end_row})"
     else:
         partial_dataset_msg = f"(limited by --end-row {args.end_row})"
-    if args.end_row is not None and args.end_row != df.shape[0]:
+    if args.end_row is not None and args.end_row != stats.rows:
         partial_dataset_msg = ""
     print("### Shape")
     print()
-    print(df.shape, partial_dataset_msg)
+    print((stats.rows, len(stats.columns)), partial_dataset_msg)
     print()
 
     print("### Sample of rows")
-    if len(df) > 6:
-        print_df(pd.concat([df.head(3), df.tail(3)]))
-    else:
-        print_df(df.head(6))
+    print_df(stats.sample())
 
-    number_df = df.convert_dtypes().select_dtypes("number")
-    if not number_df.empty:
+    if stats.summary_columns and stats.rows:
         print("### Summary statistics")
-        summary_stats = number_df.describe()
-        summary_stats = pd.concat([summary_stats, number_df.agg(["sum", "skew", "kurt"])])
-        print_df(summary_stats)
+        print_df(stats.summary_statistics())
+        if not stats.in_memory:
+            rank_error = QuantileSketch().rank_error
+            print(f"Quartiles are approximate (within {rank_error:.1%} of rows in rank); other statistics are exact")
+            print()
 
-    converted = df.convert_dtypes()
     same_dtypes = []
     diff_dtypes = []
-    for col in df.columns:
-        if df.dtypes[col] == converted.dtypes[col]:
-            same_dtypes.append((col, df.dtypes[col]))
+    for col, dtype, converted_dtype in stats.dtypes:
+        if dtype == converted_dtype:
+            same_dtypes.append((col, dtype))
         else:
-            diff_dtypes.append((col, df.dtypes[col], converted.dtypes[col]))
+            diff_dtypes.append((col, dtype, converted_dtype))
     if len(same_dtypes) > 0:
         print("### Pandas columns with 'original' dtypes")
         same_dtypes = pd.DataFrame(same_dtypes, columns=["column", "dtype"])
@@ -96,47 +256,56 @@ def print_info(args, dft):
         diff_dtypes = pd.DataFrame(diff_dtypes, columns=["column", "original_dtype", "converted_dtype"])
         print_df(diff_dtypes.set_index("column"))
 
-    if len(df) > 15:
-        numeric_columns = df.select_dtypes("number").columns.to_list()
-        if numeric_columns:
+    if stats.rows > 15:
+        if stats.numeric_columns:
             print("### Numerical columns")
             print()
             print("#### Bins")
             print()
-            for col in numeric_columns:
-                try:
-                    bins = pd.cut(df[col], bins=6)
-                    print_df(bins.value_counts().sort_index())
-                except TypeError:  # putmask: first argument must be an array
+            for col in stats.numeric_columns:
+                bins = stats.bins(col)
+                if bins is None:
                     log.warning("Could not calculate bins for col %s", col)
+                else:
+                    print_df(bins)
+            if not stats.in_memory:
+                print(f"Bin counts are approximate (within {QuantileSketch().rank_error:.1%} of rows per edge)")
+                print()
 
-        categorical_columns = [s for s in df.columns.to_list() if s not in numeric_columns]
-        if categorical_columns:
+        if stats.categorical_columns:
             high_cardinality_cols = set()
             low_cardinality_cols = set()
 
+            if args.groupby and not stats.in_memory:
+                log.warning("--groupby needs the whole table in memory; skipping it in --streaming mode")
+
             print("### Categorical columns")
             print()
-            for col in categorical_columns:
-                vc = df[col].value_counts()
-                vc = vc[vc > (len(df) * 0.005)]
+            for col in stats.categorical_columns:
+                vc = stats.common_values(col)
+                vc = vc[vc > (stats.rows * 0.005)]
                 if len(vc) > 0:
                     low_cardinality_cols.add(col)
                     print(f"#### common values of {col} column")
-                    vc = pd.DataFrame({"Count": vc, "Percentage": (vc / len(df)) * 100}).sort_values(
+                    vc = pd.DataFrame({"Count": vc, "Percentage": (vc / stats.rows) * 100}).sort_values(
                         by="Count", ascending=False
                     )
                     print_df(vc.head(30))
 
-                    if args.groupby:
-                        groups = df.groupby(col).size()
-                        groups = groups[groups >= 15]
-                        if len(groups) > 0:
+                    errors = stats.count_errors(col)
+                    max_error = errors.reindex(vc.head(30).index).max() if errors is not None else 0
+                    if max_error:
+                        print(f"Counts may be overestimated by up to {max_error:,}")
+                        print()
+
+                    if args.groupby and stats.in_memory:
+                        groups = stats.groupby_describe(col)
+                        if groups is not None:
                             print(f"#### group by {col}")
-                            print_df(df[df[col].isin(groups.index)].groupby(col).describe())
+                            print_df(groups)
 
-                unique_count = df[col].nunique()
-                if unique_count >= (len(df) * 0.2):
+                unique_count = stats.unique_count(col)
+                if unique_count >= (stats.rows * 0.2):
                     high_cardinality_cols.add(col)
 
             med_cardinality_cols = low_cardinality_cols.intersection(high_cardinality_cols)
@@ -155,30 +324,72 @@ def print_info(args, dft):
 
     print("### Missing values")
     print()
-    nan_col_sums = df.isna().sum()
+    nan_col_sums = stats.null
     print(
         f"{nan_col_sums.sum():,} nulls/NaNs",
-        f"({(nan_col_sums.sum() / (df.shape[0] * df.shape[1])):.1%} dataset values missing)",
+        f"({(nan_col_sums.sum() / (stats.rows * len(stats.columns))):.1%} dataset values missing)",
     )
     print()
 
     if nan_col_sums.sum():
-        no_nas = df.columns[df.notnull().all()]
+        no_nas = nan_col_sums.index[nan_col_sums == 0]
         if len(no_nas) > 0:
             print(f"#### {len(no_nas)} columns with no missing values")
             print_series(no_nas)
 
-        all_nas = df.columns[df.isnull().all()]
+        all_nas = nan_col_sums.index[nan_col_sums == stats.rows]
         if len(all_nas) > 0:
             print(f"#### {len(all_nas)} columns with all missing values")
             print_series(all_nas)
 
         print("#### Value stats")
-        column_report = pd.DataFrame(df_column_values(df, col) for col in df.columns).set_index("column")
+        zero, empty = stats.zero_and_empty()
+        column_report = pd.DataFrame(
+            column_values(col, stats.rows, nan_col_sums[col], zero[col], empty[col]) for col in stats.columns
+        ).set_index("column")
         column_report = column_report.sort_values(["empty_string_count", "zero_count", "null_count"])
         print_df(column_report[["values", "null", "zero", "empty_string"]])
 
 
+def print_info(args, dft):
+    df_name, df = dft
+
+    if df.shape == (0, 0):
+        print(f"Table [{df_name}] empty")
+        return
+
+    print_report(args, DataFrameStats(df))
+
+
+def file_eda_streaming(args, path):
+    chunks = file_utils.read_file_to_dataframe_chunks(
+        path,
+        table_name=args.table_name,
+        table_index=args.table_index,
+        start_row=args.start_row,
+        end_row=args.end_row,
+        order_by=args.sort,
+        encoding=args.encoding,
+        mimetype=args.mimetype,
+        skip_headers=args.skip_headers,
+    )
+    for df_name, table_chunks in itertools.groupby(chunks, key=lambda t: t[0]):
+        stats = None
+        for _df_name, df in table_chunks:
+            if stats is None:
+                stats = StreamingStats(df)
+            stats.update(df)
+
+        if args.table_name == "stdin":
+            print(f"## stdin:{df_name}")
+        else:
+            print(f"## {path}:{df_name}")
+        if stats is None or not stats.columns:
+            print(f"Table [{df_name}] empty")
+        else:
+            print_report(args, stats)
+
+
 def file_eda(args, path):
     dfs = file_utils.read_file_to_dataframes(
         path,
@@ -210,4 +421,7 @@ def eda():
     args = parse_args()
     web.requests_session(args)  # configure session
     for path in args.paths:
-        file_eda(args, path)
+        if args.streaming:
+            file_eda_streaming(args, path)
+        else:
+            file_eda(args, path)
@@ -1,4 +1,4 @@
-import argparse
+import argparse, json, os, sqlite3, tempfile
 
 from library import usage
 from library.utils import arggroups, argparse_utils, consts, file_utils, web
@@ -46,86 +46,187 @@ def parse_args():
     return args
 
 
-def process_chunks(args):
-    chunk_start_row = args.start_row
-    chunk_end_row = args.batch_size
-    while True:
-        dfs1 = file_utils.read_file_to_dataframes(
-            args.path1,
-            table_name=args.table1_name,
-            table_index=args.table1_index,
-            start_row=chunk_start_row,
-            end_row=chunk_end_row,
-            order_by=args.sort,
-            encoding=args.encoding1,
-            mimetype=args.mimetype1,
-            join_tables=args.join_tables,
-            transpose=args.transpose,
+class RowStore:
+    """
+    Rows of both inputs in a temporary SQLite database so that tables larger than memory can be diffed
+
+    Each input is read once, from start to end. Rows are matched by --join-keys (or by the whole row when there are
+    no join keys) so rows which moved to a different position or chunk are still compared with each other
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("CREATE TABLE rows (side INTEGER, tbl TEXT, key TEXT, row TEXT)")
+        self.tables = {1: {}, 2: {}}  # table name -> {column: has non-null values}
+
+    def add(self, side, df_name, df, join_keys=None) -> None:
+        columns = self.tables[side].setdefault(df_name, {})
+        for col, has_values in df.notna().any().items():
+            columns[str(col)] = columns.get(str(col), False) or bool(has_values)
+
+        rows = []
+        for d in df.to_dict(orient="records"):
+            d = {str(k): normalize_value(v) for k, v in d.items()}
+            key = json.dumps([d.get(k) for k in join_keys], default=str) if join_keys else None
+            rows.append((side, df_name, key, json.dumps(d, default=str)))
+        with self.conn:
+            self.conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?)", rows)
+
+    def set_row_keys(self, side, df_name, columns) -> None:
+        cursor = self.conn.execute("SELECT rowid, row FROM rows WHERE side = ? AND tbl = ?", [side, df_name])
+        while batch := cursor.fetchmany(10_000):
+            keys = []
+            for rowid, row in batch:
+                d = json.loads(row)
+                keys.append((json.dumps([d.get(c) for c in columns], default=str), rowid))
+            with self.conn:
+                self.conn.executemany("UPDATE rows SET key = ? WHERE rowid = ?", keys)
+
+    def only_in(self, side, df_name, other_df_name):
+        return self.conn.execute(
+            """
+            SELECT a.row FROM rows a
+            WHERE a.side = ? AND a.tbl = ?
+            AND NOT EXISTS (SELECT 1 FROM rows b WHERE b.side = ? AND b.tbl = ? AND b.key = a.key)
+            ORDER BY a.rowid
+            """,
+            [side, df_name, 3 - side, other_df_name],
         )
-        dfs2 = file_utils.read_file_to_dataframes(
-            args.path2,
-            table_name=args.table2_name,
-            table_index=args.table2_index,
-            start_row=chunk_start_row,
-            end_row=chunk_end_row,
+
+    def in_both(self, df_name1, df_name2):
+        return self.conn.execute(
+            """
+            SELECT a.row, b.row FROM rows a
+            JOIN rows b ON b.side = 2 AND b.tbl = ? AND b.key = a.key
+            WHERE a.side = 1 AND a.tbl = ? AND a.row != b.row
+            ORDER BY a.rowid
+            """,
+            [df_name2, df_name1],
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def normalize_value(v):
+    import pandas as pd
+
+    if pd.api.types.is_scalar(v) and pd.isna(v):  # None, NaN, NaT, pd.NA
+        return None
+    if hasattr(v, "item"):  # numpy scalar
+        v = v.item()
+    if isinstance(v, float) and v.is_integer():
+        return int(v)  # integer columns with nulls are read as floats
+    return v
+
+
+def read_chunks(args, path, table_name, table_index, encoding, mimetype):
+    if args.join_tables or args.transpose or not args.batch_size:
+        return file_utils.read_file_to_dataframes(
+            path,
+            table_name=table_name,
+            table_index=table_index,
+            start_row=args.start_row,
             order_by=args.sort,
-            encoding=args.encoding2,
-            mimetype=args.mimetype2,
+            encoding=encoding,
+            mimetype=mimetype,
             join_tables=args.join_tables,
             transpose=args.transpose,
         )
+    return file_utils.read_file_to_dataframe_chunks(
+        path,
+        chunk_rows=args.batch_size,
+        table_name=table_name,
+        table_index=table_index,
+        start_row=args.start_row,
+        order_by=args.sort,
+        encoding=encoding,
+        mimetype=mimetype,
+    )
 
-        # TODO: https://github.com/ICRAR/ijson
-
-        tables1 = {df.df_name for df in dfs1}
-        tables2 = {df.df_name for df in dfs2}
-        common_tables = tables1.intersection(tables2)
-        dfs1 = sorted(dfs1, key=lambda df: (df.df_name in common_tables, df.df_name), reverse=True)
-        dfs2 = sorted(dfs2, key=lambda df: (df.df_name in common_tables, df.df_name), reverse=True)
-
-        empty_dfs = set()
-        for df_idx in range(len(dfs1)):
-            df1 = dfs1[df_idx].df
-            df2 = dfs2[df_idx].df
-            df1_name = dfs1[df_idx].df_name
-            df2_name = dfs2[df_idx].df_name
-
-            # drop cols with all nulls to allow merging "X" and object columns
-            df1 = df1.drop(columns=df1.columns[df1.isnull().all()])
-            df2 = df2.drop(columns=df2.columns[df2.isnull().all()])
-
-            if df1.empty and df2.empty:
-                empty_dfs.add(df_idx)
-                continue
-            elif df1.empty:
-                log.warning("df1 has no more rows")
-            elif df2.empty:
-                log.warning("df2 has no more rows")
-
-            df_diff = df1.merge(df2, on=args.join_keys, how="outer", indicator=True)
-            df_diff = df_diff[df_diff["_merge"] != "both"]
-
-            if len(df_diff) > 0:
-                print(f"## Diff {args.path1}:{df1_name} and {args.path2}:{df2_name}")
-                print_df(df_diff)
-            del df1
-            del df2
-
-        if len(empty_dfs) == len(dfs1):
-            break
-
-        del dfs1
-        del dfs2
-
-        if args.batch_size:
-            if chunk_start_row is None:
-                chunk_start_row = 0
-            chunk_start_row += args.batch_size
-            chunk_end_row += args.batch_size
-            log.debug(chunk_end_row)
+
+def diff_tables(args, store, df_name1, df_name2):
+    import pandas as pd
+
+    columns1 = [c for c, has_values in store.tables[1][df_name1].items() if has_values]
+    columns2 = {c for c, has_values in store.tables[2][df_name2].items() if has_values}
+    common_columns = [c for c in columns1 if c in columns2]
+
+    if not args.join_keys:
+        store.set_row_keys(1, df_name1, common_columns)
+        store.set_row_keys(2, df_name2, common_columns)
+
+    header_printed = False
+
+    def print_rows(rows):
+        nonlocal header_printed
+        if not rows:
+            return
+        if not header_printed:
+            print(f"## Diff {args.path1}:{df_name1} and {args.path2}:{df_name2}")
+            header_printed = True
+        print_df(pd.DataFrame(rows))
+
+    fetch_size = args.batch_size or 10_000
+    for side, df_name, other_df_name, label in [
+        (1, df_name1, df_name2, "left_only"),
+        (2, df_name2, df_name1, "right_only"),
+    ]:
+        cursor = store.only_in(side, df_name, other_df_name)
+        while batch := cursor.fetchmany(fetch_size):
+            print_rows([json.loads(row) | {"_merge": label} for (row,) in batch])
+
+    if args.join_keys:
+        cursor = store.in_both(df_name1, df_name2)
+        while batch := cursor.fetchmany(fetch_size):
+            rows = (changed_row(args.join_keys, common_columns, row1, row2) for row1, row2 in batch)
+            print_rows([d for d in rows if d])
+
+
+def changed_row(join_keys, common_columns, row1, row2) -> dict | None:
+    d1 = json.loads(row1)
+    d2 = json.loads(row2)
+    if all(d1.get(c) == d2.get(c) for c in common_columns):
+        return None
+
+    d = {k: d1.get(k) for k in join_keys}
+    for c in common_columns:
+        if c in join_keys:
             continue
+        if d1.get(c) == d2.get(c):
+            d[c] = d1.get(c)
         else:
-            break
+            d[f"{c}_x"] = d1.get(c)
+            d[f"{c}_y"] = d2.get(c)
+    d["_merge"] = "changed"
+    return d
+
+
+def process_chunks(args):
+    with tempfile.TemporaryDirectory(prefix="lb-incremental-diff-") as temp_dir:
+        store = RowStore(os.path.join(temp_dir, "rows.db"))
+        try:
+            for side, path, table_name, table_index, encoding, mimetype in [
+                (1, args.path1, args.table1_name, args.table1_index, args.encoding1, args.mimetype1),
+                (2, args.path2, args.table2_name, args.table2_index, args.encoding2, args.mimetype2),
+            ]:
+                for df_name, df in read_chunks(args, path, table_name, table_index, encoding, mimetype):
+                    store.add(side, df_name, df, args.join_keys)
+                    log.debug("%s:%s read %s rows", path, df_name, len(df))
+            store.conn.execute("CREATE INDEX rows_key_idx ON rows (side, tbl, key)")
+
+            tables1 = list(store.tables[1])
+            tables2 = list(store.tables[2])
+            common_tables = set(tables1).intersection(tables2)
+            tables1 = sorted(tables1, key=lambda name: (name in common_tables, name), reverse=True)
+            tables2 = sorted(tables2, key=lambda name: (name in common_tables, name), reverse=True)
+
+            for df_name1, df_name2 in zip(tables1, tables2):
+                diff_tables(args, store, df_name1, df_name2)
+        finally:
+            store.close()
 
 
 def incremental_diff():
@@ -2,6 +2,7 @@ import argparse, difflib, json
 from pathlib import Path
 
 from library import usage
+from library.mediadb import db_embeddings
 from library.tablefiles import eda, mcda
 from library.utils import (
     arggroups,
@@ -77,7 +78,31 @@ def map_and_name(paths, clusters):
     return result
 
 
-def find_clusters(args, sentence_strings):
+def fit_kmeans(X, n_clusters):
+    n_samples = X.shape[0]
+    random_state = 0 if consts.PYTEST_RUNNING else None
+
+    if n_samples < consts.MINIBATCH_KMEANS_THRESHOLD:
+        from sklearn.cluster import KMeans
+
+        clusterizer = KMeans(n_clusters=n_clusters, n_init=10, max_iter=8, tol=1e-3, random_state=random_state)
+        return clusterizer.fit(X)
+
+    import numpy as np
+    from sklearn.cluster import MiniBatchKMeans
+
+    batch_size = max(consts.MINIBATCH_KMEANS_BATCH_SIZE, n_clusters * 3)
+    clusterizer = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, n_init=3, random_state=random_state)
+    for _epoch in range(3):
+        for start in range(0, n_samples - n_clusters + 1, batch_size):
+            clusterizer.partial_fit(X[start : start + batch_size])
+    clusterizer.labels_ = np.concatenate(
+        [clusterizer.predict(X[start : start + batch_size]) for start in range(0, n_samples, batch_size)]
+    )
+    return clusterizer
+
+
+def find_clusters(args, sentence_strings, keys=None):
     if args.verbose >= consts.LOG_DEBUG:
         sentence_strings = log_utils.gen_logging("sentence_strings", sentence_strings)
 
@@ -96,17 +121,36 @@ def find_clusters(args, sentence_strings):
 
         wl = WordLlama.load(**args.wordllama)
 
+        use_cache = keys is not None and getattr(args, "db", None) and getattr(args, "embeddings_cache", True)
+        if use_cache:
+            try:
+                from wordllama.algorithms import kmeans_clustering
+            except ImportError:
+                log.info("wordllama kmeans_clustering not found; skipping embeddings cache")
+                use_cache = False
+
+        k = args.clusters or int(len(sentence_strings) ** 0.5)
+        min_iter = 3 * (args.wordllama["dim"] // 64)
+        kmeans_kwargs = {
+            "n_init": min_iter,
+            "min_iterations": min_iter,
+            "max_iterations": min_iter * 2,
+            "tolerance": 1e-3,
+            "random_state": np.random.RandomState(0) if consts.PYTEST_RUNNING else None,
+        }
         try:
-            min_iter = 3 * (args.wordllama["dim"] // 64)
-            clusters, loss = wl.cluster(
-                sentence_strings,
-                k=args.clusters or int(len(sentence_strings) ** 0.5),
-                n_init=min_iter,
-                min_iterations=min_iter,
-                max_iterations=min_iter * 2,
-                tolerance=1e-3,
-                random_state=np.random.RandomState(0) if consts.PYTEST_RUNNING else None,
-            )
+            if use_cache:
+                # the same k-means that WordLlama.cluster runs, only the embeddings come from the database
+                embeddings = db_embeddings.cached_embeddings(
+                    args,
+                    "wordllama:" + json.dumps(args.wordllama, sort_keys=True),
+                    lambda strings: wl.embed(strings, norm=True),
+                    keys,
+                    sentence_strings,
+                )
+                clusters, loss = kmeans_clustering(embeddings, k, **kmeans_kwargs)
+            else:
+                clusters, loss = wl.cluster(sentence_strings, k=k, **kmeans_kwargs)
         except AttributeError:  # best_labels.tolist when best_labels is None
             use_sklearn = True
         else:
@@ -114,7 +158,6 @@ def find_clusters(args, sentence_strings):
             return clusters
 
     if use_sklearn:
-        from sklearn.cluster import KMeans
         from sklearn.feature_extraction.text import TfidfVectorizer
         from sklearn.metrics import pairwise_distances_argmin_min
 
@@ -140,13 +183,7 @@ def find_clusters(args, sentence_strings):
                     vectorizer = TfidfVectorizer(analyzer="char_wb")
                     X = vectorizer.fit_transform(sentence_strings)
 
-        clusterizer = KMeans(
-            n_clusters=args.clusters or int(X.shape[0] ** 0.5),
-            n_init=10,
-            max_iter=8,
-            tol=1e-3,
-            random_state=0 if consts.PYTEST_RUNNING else None,
-        ).fit(X)
+        clusterizer = fit_kmeans(X, args.clusters or int(X.shape[0] ** 0.5))
         clusters = clusterizer.labels_
 
         if args.verbose >= consts.LOG_INFO:
@@ -194,7 +231,7 @@ def sort_dicts(args, media):
         strings.path_to_sentence(" ".join(str(v) for k, v in d.items() if v and k in search_columns)) for d in media
     )
 
-    clusters = find_clusters(args, sentence_strings)
+    clusters = find_clusters(args, sentence_strings, keys=paths)
 
     if args.verbose >= consts.LOG_INFO:
         from pandas import DataFrame
@@ -8,6 +8,7 @@ from library.utils import (
     argparse_utils,
     consts,
     devices,
+    http_cache,
     iterables,
     path_utils,
     printing,
@@ -208,19 +209,26 @@ def get_inner_urls(args, url):
             markup = pathlib.Path(url).read_text()
             url = "file://" + url
         else:
+            headers, cached = http_cache.cache.conditional_headers(url) if http_cache.cache else ({}, None)
             try:
-                r = web.session.get(url, timeout=120)
+                r = web.session.get(url, timeout=120, headers=headers)
             except Exception as excinfo:
                 if "too many 429 error" in str(excinfo):
                     raise
                 log.exception("Could not get a valid response from the server")
                 return None
-            if r.status_code == HTTPStatus.NOT_FOUND:
-                log.warning("404 Not Found Error: %s", url)
-                is_error = True
+            if r.status_code == HTTPStatus.NOT_MODIFIED and cached:
+                log.debug("Not modified: %s", url)
+                markup = http_cache.cache.not_modified(url, cached)  # type: ignore
             else:
-                r.raise_for_status()
-            markup = r.content
+                if r.status_code == HTTPStatus.NOT_FOUND:
+                    log.warning("404 Not Found Error: %s", url)
+                    is_error = True
+                else:
+                    r.raise_for_status()
+                markup = r.content
+                if http_cache.cache and not is_error:
+                    http_cache.cache.modified(url, r, markup)
 
         yield from parse_inner_urls(args, url, markup)
 
@@ -264,11 +272,13 @@ def extract_links() -> None:
 
     if args.selenium:
         web.load_selenium(args)
+    http_cache.open_cache(args)
     try:
         for url in shell_utils.gen_paths(args):
             for d in iterables.return_unique(get_inner_urls, lambda d: d["link"])(args, url):
                 print_or_download(args, d)
 
     finally:
+        http_cache.close_cache()
         if args.selenium:
             web.quit_selenium(args)
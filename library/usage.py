@@ -147,6 +147,14 @@ download = r"""library download DATABASE [--prefix /mnt/d/] [--video (default) |
 
         library download photos.db --photos --image --sort "ROW_NUMBER() OVER ( PARTITION BY SUBSTR(m.path, INSTR(m.path, '//') + 2, INSTR( SUBSTR(m.path, INSTR(m.path, '//') + 2), '/') - 1) )"
 
+    Download from many domains at the same time; at most 2 at once from any one domain with 5 seconds between them
+
+        library download dl.db --workers 8 --per-domain 2 --domain-delay 5
+
+    Keep at least 50GB free; spread downloads across two disks
+
+        library download dl.db --min-free-space 50GB --prefixes /mnt/d1/dl,/mnt/d2/dl
+
     Print list of queued up downloads
 
         library download --print
@@ -598,6 +606,10 @@ tube_update = """library tube-update [--audio | --video] DATABASE
 
         library tubeupdate educational.db --extra https://www.youtube.com/channel/UCBsEUcR-ezAuxB2WlfeENvA/videos
 
+    Check many playlists at the same time
+
+        library tubeupdate educational.db --workers 8 --per-extractor 2 --extractor-delay 5
+
     Remove duplicate playlists
 
         library dedupe-db video.db playlists --bk extractor_playlist_id
@@ -615,6 +627,8 @@ gallery_add = """library gallery-add DATABASE URL ...
 gallery_update = """library gallery-update DATABASE
 
     Check previously saved gallery_dl URLs for new content
+
+        library galleryupdate images.db --workers 4
 """
 
 big_dirs = """library big-dirs PATH ... [--limit (4000)] [--depth (0)] [--sort-groups-by deleted | played]
@@ -1136,6 +1150,10 @@ scatter = """library scatter [--limit LIMIT] [--policy POLICY] [--sort SORT] --t
 
         library scatter -m /mnt/d1:/mnt/d2 -l 100 -s 'time_modified desc' fs.db /
 
+    Multi-device re-bin: move as little data as possible (largest files first) to reach the target distribution
+
+        library scatter -m /mnt/d1:/mnt/d2:/mnt/d3 --policy optimal fs.db /
+
     Multi-device re-bin: empty out a disk (/mnt/d2) into many other disks (/mnt/d1, /mnt/d3, and /mnt/d4)
 
         library scatter fs.db -m /mnt/d1:/mnt/d3:/mnt/d4 /mnt/d2
@@ -1237,6 +1255,15 @@ eda = """library eda PATH ... [--table STR] [--end-row INT] [--repl]
     Perform Exploratory Data Analysis (EDA) on one or more files
 
     Only 500,000 rows per file are loaded for performance purposes. Set `--end-row inf` to read all the rows and/or run out of RAM.
+
+    Summarize files which are larger than RAM
+
+        library eda --streaming dump.parquet
+
+    --streaming reads every row (unless --end-row is set) one chunk at a time and keeps a small summary per column.
+    Counts, sums, means, std, skew, kurtosis, and missing values are exact.
+    Quartiles and bin counts are approximate and the error bound is printed below each table.
+    Common values and cardinality are approximate too.
 """
 
 plot = """library plot PATH ... [--table STR] [--end-row INT] -- [PLT.COMMAND ...]
@@ -1381,10 +1408,11 @@ incremental_diff = """library incremental-diff PATH1 PATH2 [--join-keys JOIN_KEY
 
     Data (PATH1, PATH2) can be two different files of different file formats (CSV, Excel) or it could even be the same file with different tables.
 
-    If files are unsorted you may need to use `--join-keys id,name` to specify ID columns. Rows that have the same ID will then be compared.
-    If you are comparing SQLite files you may be able to use `--sort id,name` to achieve the same effect.
+    Each file is read once from start to end, `--batch-size` rows at a time. Rows are matched even if they are in a different order:
+    use `--join-keys id,name` to specify ID columns. Rows that have the same ID will then be compared and listed as changed if any other column differs.
+    Without join keys, rows are matched by all of the columns which the two tables have in common.
 
-    To diff everything at once run with `--batch-size inf`
+    To read and print everything at once run with `--batch-size inf`
 """
 
 extract_links = """library extract-links PATH ... [--case-sensitive] [--scroll] [--download] [--local-html] [--file FILE]
@@ -1897,6 +1925,11 @@ process_media = """library process-media DATABASE_OR_PATH
 
         library process-media --invalid --no-valid --delete-unplayable video.db
 
+    Jobs are saved in the process_jobs table of the database so an interrupted run (Ctrl+C) resumes
+    without estimating again. Files with the most estimated savings per second of processing go first
+
+        library process-media video.db --workers 4
+
     If not installed, related file extensions will be skipped during scan:
 
         - FFmpeg is required for shrinking video and audio
@@ -2040,6 +2073,10 @@ allocate_torrents = """library allocate-torrents
     Filter to specific words or tracker
 
         library allocate-torrents computers.db torrents.db -s specific words or tracker
+
+    Limit the number of torrents per computer and per tracker on each disk
+
+        library allocate-torrents computers.db torrents.db --max-per-computer 100 --max-per-tracker 10
 """
 
 getty_add = """library getty-add DATABASE
@@ -11,6 +11,7 @@ from library.utils import (
     nums,
     objects,
     processes,
+    profile_utils,
     shell_utils,
     sql_utils,
     web,
@@ -159,6 +160,25 @@ def debug(parent_parser):
 -vvvv  # debug, with external libraries logging""",
     )
     parser.add_argument("--no-pdb", action="store_true", help="Exit immediately on error. Never launch debugger")
+    parser.add_argument(
+        "--profile",
+        dest="profiler",
+        nargs="?",
+        const="cprofile",
+        choices=profile_utils.PROFILE_MODES,
+        help="""Profile the subcommand and record timing spans for each phase
+--profile          # cProfile
+--profile sample   # low-overhead sampling profiler
+--profile spans    # only record timing spans""",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="""Where to write profiling results
+.json     # Chrome trace events (Perfetto, speedscope); the default
+.folded   # folded stacks (flamegraph.pl, speedscope)
+.prof     # cProfile stats (snakeviz, gprof2dot)""",
+    )
     parser.add_argument("--timeout", "-T", metavar="TIME", help="Quit after N minutes")
     parser.add_argument(
         "--timeout-size",
@@ -982,6 +1002,12 @@ where 'o' is a key that seeks the amount you want in mpv""",
     parser.add_argument(
         "--prefetch", type=int, default=3, help="Prepare for playback by reading some file metadata before it is needed"
     )
+    parser.add_argument(
+        "--readahead",
+        type=nums.human_to_bytes,
+        help="""Read the first part of upcoming files into the page cache (for sleeping HDDs or network mounts)
+--readahead 32MB""",
+    )
     parser.add_argument(
         "--prefix", default="", help="Add a prefix for file paths; eg. SSHFS mount makes paths different from normal"
     )
@@ -1285,6 +1311,12 @@ def cluster_sort(parent_parser):
         help="Configure wordllama",
     )
     parser.add_argument("--tfidf", action="store_true", help="Use TF-IDF+kmeans instead of wordllama")
+    parser.add_argument(
+        "--embeddings-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Store wordllama embeddings in the database so that only new or renamed media needs to be embedded",
+    )
 
     parser.add_argument("--print-groups", "--groups", "-g", action="store_true", help="Print groups")
     parser.add_argument("--move-groups", action="store_true", help="Move groups into subfolders")
@@ -1470,6 +1502,43 @@ def file_over_file(value):
     return parts
 
 
+def disk_space(parent_parser):
+    parser = parent_parser.add_argument_group("Disk Space")
+    parser.add_argument(
+        "--min-free-space",
+        "--min-free",
+        type=nums.human_to_bytes,
+        help="Wait before starting a job which would leave less than SIZE free on the destination mount",
+    )
+    parser.add_argument(
+        "--free-space-wait",
+        metavar="SECONDS",
+        type=float,
+        default=60,
+        help="Check for free space every N seconds while waiting",
+    )
+
+
+def playlist_update(parent_parser):
+    parser = parent_parser.add_argument_group("Playlist Update")
+    parser.add_argument(
+        "--update-workers", "--workers", type=int, default=1, help="Check up to N playlists at the same time"
+    )
+    parser.add_argument(
+        "--per-extractor",
+        type=int,
+        default=1,
+        help="Check up to N playlists from the same extractor at the same time",
+    )
+    parser.add_argument(
+        "--extractor-delay",
+        metavar="SECONDS",
+        type=float,
+        default=0,
+        help="Wait N seconds between playlists from the same extractor (doubles after each failure)",
+    )
+
+
 def clobber(parent_parser):
     parser = parent_parser.add_argument_group("Replace Files")
     parser.add_argument(
@@ -1933,6 +2002,19 @@ def requests(parent_parser):
         default=4,
         help="Allow N redirects (also counted as a retry)",
     )
+    parser.add_argument(
+        "--http-cache",
+        metavar="PATH",
+        help="""SQLite file to remember ETag/Last-Modified/Content-Length per URL
+web-update and links-update use DATABASE.http_cache.db by default""",
+    )
+    parser.add_argument("--no-http-cache", action="store_true", help="Do not use or update the HTTP cache")
+    parser.add_argument(
+        "--http-cache-ttl",
+        type=nums.human_to_seconds,
+        default="1 day",
+        help="Re-use cached HEAD responses for this long before asking the server again",
+    )
     parser.add_argument(
         "--sleep-requests",
         metavar="SECONDS",
@@ -1,6 +1,6 @@
 import argparse, json, shlex, sys
 
-from library.utils import nums
+from library.utils import nums, profile_utils
 from library.utils.consts import SQLITE_EXTENSIONS
 from library.utils.iterables import flatten
 from library.utils.strings import format_two_columns, load_string
@@ -267,6 +267,14 @@ class ArgumentParser(argparse.ArgumentParser):
         kwargs["formatter_class"] = lambda prog: CustomHelpFormatter(prog, max_help_position=40)
         super().__init__(*args, **kwargs)
 
+    def parse_args(self, *args, **kwargs):  # type: ignore
+        with profile_utils.span("parse_args"):
+            return super().parse_args(*args, **kwargs)
+
+    def parse_intermixed_args(self, *args, **kwargs):  # type: ignore
+        with profile_utils.span("parse_args"):
+            return super().parse_intermixed_args(*args, **kwargs)
+
 
 def arggroup_parser(functions):
     temp_parser = ArgumentParser(add_help=False)
@@ -73,6 +73,8 @@ REGEX_V_REDD_IT = re.compile(r"https?://v.redd.it/(?:[^/?#&]+)")
 APPLICATION_START = now()
 TABULATE_STYLE = "simple"
 DEFAULT_DIFFLIB_RATIO = 0.73
+MINIBATCH_KMEANS_THRESHOLD = 50_000
+MINIBATCH_KMEANS_BATCH_SIZE = 4096
 DEFAULT_MIN_SPLIT = "150s"
 IS_LINUX = sys.platform == "linux"
 IS_MAC = sys.platform == "darwin"
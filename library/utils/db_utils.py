@@ -4,7 +4,7 @@ from pathlib import Path
 from textwrap import dedent
 from typing import Any
 
-from library.utils import consts, iterables, nums, strings
+from library.utils import consts, iterables, nums, profile_utils, strings
 from library.utils.log_utils import log
 
 from sqlite_utils import Database
@@ -67,12 +67,13 @@ def connect(args, conn=None, **kwargs):
         log.error(f"Database file '{args.database}' does not exist. Create one with lb fsadd, tubeadd, or tabsadd.")
         raise SystemExit(1)
 
-    db = DB(conn or args.database, tracer=tracer, **kwargs)  # type: ignore
-    with db.conn:  # type: ignore
-        db.conn.execute("PRAGMA threads = 4")  # type: ignore
-        db.conn.execute("PRAGMA main.cache_size = -8000")  # type: ignore
+    with profile_utils.span("db_connect", database=str(args.database)):
+        db = DB(conn or args.database, tracer=tracer, **kwargs)  # type: ignore
+        with db.conn:  # type: ignore
+            db.conn.execute("PRAGMA threads = 4")  # type: ignore
+            db.conn.execute("PRAGMA main.cache_size = -8000")  # type: ignore
 
-    db.enable_wal()
+        db.enable_wal()
     return db
 
 
@@ -0,0 +1,115 @@
+import os, shutil, threading, time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from library.utils import strings
+from library.utils.log_utils import log
+
+"""
+Reserve disk space before starting a job that writes output
+
+Reservations are tracked per device so that concurrent jobs (eg. download --workers) do not all
+see the same free space and overcommit a mount. When no destination has room the job waits until
+other jobs finish or space is freed. Jobs which could not fit even if every other job finished raise
+InsufficientSpace instead of waiting
+"""
+
+WARNING_INTERVAL = 300
+
+condition = threading.Condition()
+reserved = defaultdict(int)
+
+
+class InsufficientSpace(OSError):
+    pass
+
+
+def existing_parent(path) -> Path:
+    p = Path(path).expanduser().absolute()
+    while not p.exists() and p != p.parent:
+        p = p.parent
+    return p
+
+
+def device_available(path) -> tuple[int, int]:
+    p = existing_parent(path)
+    device = os.stat(p).st_dev
+    return device, shutil.disk_usage(p).free - reserved[device]
+
+
+def is_enabled(args) -> bool:
+    return getattr(args, "min_free_space", None) is not None or len(getattr(args, "spread_prefixes", None) or []) > 1
+
+
+def could_fit(destinations, size, min_free) -> bool:
+    """
+    Whether any destination would have room once this process's other reservations are released
+    """
+    for destination in destinations:
+        p = existing_parent(destination)
+        device = os.stat(p).st_dev
+        if shutil.disk_usage(p).free + reserved[device] - size >= min_free:
+            return True
+    return False
+
+
+def pick_destination(destinations, size, min_free) -> tuple[str, int] | None:
+    candidates = []
+    for destination in destinations:
+        device, available = device_available(destination)
+        if available - size >= min_free:
+            candidates.append((available, destination, device))
+    if not candidates:
+        return None
+
+    _available, destination, device = max(candidates)
+    return destination, device
+
+
+@contextmanager
+def reserve(args, size, destinations):
+    """
+    Yields the destination with the most available space which can fit size bytes
+    while keeping at least --min-free-space bytes free
+
+    Raises InsufficientSpace when no destination could ever fit size bytes
+    """
+    destinations = [str(s) for s in destinations]
+    if not is_enabled(args):
+        yield destinations[0]
+        return
+
+    size = size or 0
+    min_free = args.min_free_space or 0
+    with condition:
+        result = pick_destination(destinations, size, min_free)
+        last_warning = None
+        while result is None:
+            if not could_fit(destinations, size, min_free):
+                raise InsufficientSpace(
+                    f"{strings.file_size(size)} will not fit in {', '.join(destinations)}"
+                    f" while keeping {strings.file_size(min_free)} free"
+                )
+
+            if last_warning is None or time.monotonic() - last_warning >= WARNING_INTERVAL:
+                log.warning(
+                    "Waiting for %s of free space in %s (keeping %s free)",
+                    strings.file_size(size),
+                    ", ".join(destinations),
+                    strings.file_size(min_free),
+                )
+                last_warning = time.monotonic()
+
+            condition.wait(timeout=args.free_space_wait)
+            result = pick_destination(destinations, size, min_free)
+
+        destination, device = result
+        reserved[device] += size
+
+    try:
+        yield destination
+    finally:
+        with condition:
+            reserved[device] -= size
+            condition.notify_all()
@@ -0,0 +1,194 @@
+import concurrent.futures, queue, threading, time
+from collections import defaultdict, deque
+
+from library.utils import path_utils
+from library.utils.log_utils import log
+
+
+class DownloadScheduler:
+    """
+    Run func(item) across a pool of worker threads with per-domain concurrency limits and politeness delays
+
+    SQLite connections belong to the thread which created them so database writes from workers are
+    handed back to the scheduling thread via write() and run there one at a time.
+    With one worker func runs on the scheduling thread itself
+    """
+
+    def __init__(self, workers=1, per_domain=1, domain_delay=0.0, lookahead=1_000, key=None):
+        self.workers = max(workers or 1, 1)
+        self.per_domain = max(per_domain or 1, 1)
+        self.domain_delay = domain_delay or 0.0
+        self.lookahead = lookahead
+        self.key = key or (lambda item: path_utils.domain_from_url(item["path"]))
+
+        self.owner = threading.get_ident()
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.pending = defaultdict(deque)
+        self.active = defaultdict(int)
+        self.next_allowed = defaultdict(float)
+        self.backoff_delay = defaultdict(float)
+        self.pending_count = 0
+        self.seq = 0
+
+    def write(self, func, *args, **kwargs):
+        if threading.get_ident() == self.owner:
+            return func(*args, **kwargs)
+
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.closed:
+                raise KeyboardInterrupt("Download scheduler stopped")
+            self.events.put((func, args, kwargs, future))
+        return future.result()
+
+    def close(self) -> None:
+        """
+        Fail writes which are waiting for the scheduling thread and refuse new ones so that workers can exit
+        """
+        with self.lock:
+            self.closed = True
+            while True:
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                if len(event) == 4:
+                    _func, _args, _kwargs, future = event
+                    future.set_exception(KeyboardInterrupt("Download scheduler stopped"))
+
+    def backoff(self, key, failed, max_delay=600.0) -> None:
+        """
+        Double the extra delay for key after a failure (starting at one second); reset it after a success
+        """
+        if failed:
+            self.backoff_delay[key] = min(max(self.backoff_delay[key] * 2, 1.0), max_delay)
+            self.next_allowed[key] = max(self.next_allowed[key], time.monotonic() + self.backoff_delay[key])
+        else:
+            self.backoff_delay.pop(key, None)
+
+    def add(self, item) -> None:
+        self.pending[self.key(item)].append((self.seq, item))
+        self.seq += 1
+        self.pending_count += 1
+
+    def fill(self, items) -> bool:
+        while self.pending_count < self.lookahead:
+            item = next(items, None)
+            if item is None:
+                return False
+            self.add(item)
+        return True
+
+    def ready(self, now):
+        # the earliest queued item among domains that have a free slot; keeps the query order when workers=1
+        eligible = [
+            (domain_items[0][0], domain)
+            for domain, domain_items in self.pending.items()
+            if self.active[domain] < self.per_domain and self.next_allowed[domain] <= now
+        ]
+        return min(eligible)[1] if eligible else None
+
+    def next_wakeup(self, now):
+        waits = [self.next_allowed[domain] - now for domain in self.pending if self.active[domain] < self.per_domain]
+        return max(min(waits), 0.01) if waits else None
+
+    def handle_event(self, event, running):
+        if len(event) == 4:
+            func, args, kwargs, future = event
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as excinfo:
+                future.set_exception(excinfo)
+        else:
+            domain, item, future = event
+            running.remove(future)
+            self.active[domain] -= 1
+            self.next_allowed[domain] = time.monotonic() + self.domain_delay + self.backoff_delay[domain]
+            return item, future
+        return None
+
+    def start(self, pool, func, domain, item):
+        if pool is None:
+            # one worker: run on this thread so that Ctrl+C interrupts the job itself
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(func(item))
+            except Exception as excinfo:
+                future.set_exception(excinfo)
+            self.events.put((domain, item, future))
+        else:
+            future = pool.submit(func, item)
+            future.add_done_callback(lambda f: self.events.put((domain, item, f)))
+        return future
+
+    def run(self, items, func, on_result=None) -> None:
+        """
+        on_result(item, result) is called on the scheduling thread and may add() more items
+        """
+        items = iter(items)
+        more_items = True
+        running = set()
+        error = None
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            while True:
+                if error is None:
+                    if more_items:
+                        more_items = self.fill(items)
+
+                    now = time.monotonic()
+                    while len(running) < self.workers:
+                        domain = self.ready(now)
+                        if domain is None:
+                            break
+                        _seq, item = self.pending[domain].popleft()
+                        if not self.pending[domain]:
+                            del self.pending[domain]
+                        self.pending_count -= 1
+                        self.active[domain] += 1
+                        running.add(self.start(pool, func, domain, item))
+
+                if not running and (error is not None or self.pending_count == 0):
+                    break
+
+                try:
+                    event = self.events.get(timeout=self.next_wakeup(time.monotonic()) if error is None else None)
+                except queue.Empty:
+                    continue
+
+                done = self.handle_event(event, running)
+                if done is None or error is not None:
+                    continue
+
+                item, future = done
+                try:
+                    result = future.result()
+                    if on_result is not None:
+                        on_result(item, result)
+                except BaseException as excinfo:
+                    error = excinfo
+                    log.debug("Waiting for %s running jobs before raising", len(running))
+        except BaseException:
+            # Ctrl+C or an error on this thread: nobody is left to run the workers' writes
+            self.close()
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        if pool is not None:
+            pool.shutdown()
+        if error is not None:
+            raise error
+
+
+def db_call(args, func, *func_args, **kwargs):
+    """
+    Call func on the thread which owns args.db when a DownloadScheduler is running
+    """
+    scheduler = getattr(args, "download_scheduler", None)
+    if scheduler is None:
+        return func(*func_args, **kwargs)
+    return scheduler.write(func, *func_args, **kwargs)
@@ -1,5 +1,6 @@
-import errno, mimetypes, os
+import errno, itertools, mimetypes, operator, os, sqlite3, threading, time
 from collections import namedtuple
+from collections.abc import Iterator
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from functools import wraps
@@ -12,6 +13,45 @@ from library.utils import consts, processes, web
 from library.utils.log_utils import log
 
 
+def scan_open_files() -> set[str]:
+    open_files = set()
+    for proc in os.listdir("/proc"):
+        if not proc.isdigit():
+            continue
+        fd_dir = os.path.join("/proc", proc, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                link = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if link.startswith("/"):
+                open_files.add(link)
+    return open_files
+
+
+def open_files_index(max_age=2.0) -> set[str]:
+    """
+    Paths which any process has open
+
+    Reading every /proc/<pid>/fd link is slow so the snapshot is shared by calls within max_age seconds
+    """
+    with open_files_index.lock:
+        now = time.monotonic()
+        if open_files_index.snapshot is None or now - open_files_index.time > max_age:
+            open_files_index.snapshot = scan_open_files()
+            open_files_index.time = now
+        return open_files_index.snapshot
+
+
+open_files_index.lock = threading.Lock()
+open_files_index.snapshot = None
+open_files_index.time = 0.0
+
+
 def is_file_open(path):
     if os.name == "nt":
         try:
@@ -20,17 +60,7 @@ def is_file_open(path):
         except OSError:
             return True
     else:
-        open_files = set()
-        for proc in os.listdir("/proc"):
-            try:
-                fd_dir = os.path.join("/proc", proc, "fd")
-                for fd in os.listdir(fd_dir):
-                    link = os.readlink(os.path.join(fd_dir, fd))
-                    if link.startswith("/") and link == path:
-                        open_files.add(link)
-            except OSError:
-                continue
-        return path in open_files
+        return os.path.realpath(path) in open_files_index()
 
 
 def get_file_encodings(path):
@@ -96,41 +126,73 @@ def head_foot_stream(url, head_len, foot_len):
     return stream
 
 
+def read_ahead(path, size) -> None:
+    # wake up the disk and fill the page cache so that the next open() is instant
+    try:
+        with open(path, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, size, os.POSIX_FADV_WILLNEED)
+                f.read(65536)  # fadvise is a hint; some network filesystems ignore it
+            else:
+                while size > 0 and f.read(min(size, 1048576)):
+                    size -= 1048576
+    except OSError as excinfo:
+        log.debug("read_ahead %s: %s", path, excinfo)
+
+
+PANDAS_EXTENSIONS = {
+    ".dta": "Stata",
+    ".xlsx": "Excel",
+    ".xls": "Excel",
+    ".json": "JSON",
+    ".jsonl": "JSON Lines",
+    ".ndjson": "JSON Lines",
+    ".geojson": "GeoJSON",
+    ".geojsonl": "GeoJSON Lines",
+    ".ndgeojson": "GeoJSON Lines",
+    ".hdf": "HDF5",
+    ".feather": "Feather",
+    ".parquet": "Parquet",
+    ".sas7bdat": "SAS",
+    ".sav": "SPSS",
+    ".pkl": "Pickle",
+    ".orc": "ORC",
+}
+
+
+def mimetype_from_extension(path) -> str | None:
+    import puremagic
+
+    ext = puremagic.ext_from_filename(path)
+    if ext in mimetypes.encodings_map:  # .tar.gz vs .gz
+        file_type, _encoding = mimetypes.guess_type(path, strict=False)
+        return file_type
+
+    if ext not in mimetype_from_extension.memo:
+        if ext in (".zarr", ".zarr/"):
+            file_type = "Zarr"
+        else:
+            file_type, _encoding = mimetypes.guess_type(path, strict=False)
+        if ext and file_type is None:
+            file_type = PANDAS_EXTENSIONS.get(ext)
+        mimetype_from_extension.memo[ext] = file_type
+    return mimetype_from_extension.memo[ext]
+
+
+mimetype_from_extension.memo = {}
+
+
 @processes.with_timeout_thread(max(consts.REQUESTS_TIMEOUT) + 5)
 def detect_mimetype(path):
     import puremagic
 
     p = Path(path)
 
-    file_type = None
     ext = puremagic.ext_from_filename(path)
-    if ext in (".zarr", ".zarr/"):
-        file_type = "Zarr"
-    elif p.is_dir():
+    if ext not in (".zarr", ".zarr/") and p.is_dir():
         file_type = "directory"
     else:
-        file_type, encoding = mimetypes.guess_type(path, strict=False)
-
-    if ext and file_type is None:
-        pandas_ext = {
-            ".dta": "Stata",
-            ".xlsx": "Excel",
-            ".xls": "Excel",
-            ".json": "JSON",
-            ".jsonl": "JSON Lines",
-            ".ndjson": "JSON Lines",
-            ".geojson": "GeoJSON",
-            ".geojsonl": "GeoJSON Lines",
-            ".ndgeojson": "GeoJSON Lines",
-            ".hdf": "HDF5",
-            ".feather": "Feather",
-            ".parquet": "Parquet",
-            ".sas7bdat": "SAS",
-            ".sav": "SPSS",
-            ".pkl": "Pickle",
-            ".orc": "ORC",
-        }
-        file_type = pandas_ext.get(ext)
+        file_type = mimetype_from_extension(path)
 
     if file_type is None:
         try:
@@ -198,6 +260,22 @@ def retry_with_different_encodings(func):
 
 NDF = namedtuple("NamedDataFrame", ["df_name", "df"])
 
+SQLITE_MIMETYPES = ("sqlite", "sqlite3", "sqlite database file", "application/vnd.sqlite3")
+
+
+def table_mimetype(path, mimetype=None) -> str:
+    if mimetype is None:
+        with suppress(TimeoutError):
+            mimetype = detect_mimetype(path)
+    if mimetype is not None:
+        mimetype = mimetype.strip().lower()
+    log.info(mimetype)
+
+    if mimetype is None:
+        msg = f"{path}: File type could not be determined. Pass in --filetype"
+        raise ValueError(msg)
+    return mimetype
+
 
 @retry_with_different_encodings
 def read_file_to_dataframes(
@@ -215,37 +293,17 @@ def read_file_to_dataframes(
 ) -> list[NDF]:
     import pandas as pd
 
-    if mimetype is None:
-        with suppress(TimeoutError):
-            mimetype = detect_mimetype(path)
-    if mimetype is not None:
-        mimetype = mimetype.strip().lower()
-    log.info(mimetype)
-
-    if mimetype is None:
-        msg = f"{path}: File type could not be determined. Pass in --filetype"
-        raise ValueError(msg)
+    mimetype = table_mimetype(path, mimetype)
 
     dfs: list[NDF] = []
 
-    if mimetype in ("sqlite", "sqlite3", "sqlite database file", "application/vnd.sqlite3"):
+    if mimetype in SQLITE_MIMETYPES:
         import pandas as pd
         from sqlite_utils import Database
 
         db = Database(path)
 
-        if table_name:
-            tables = [table_name]
-        else:
-            tables = [
-                s
-                for s in db.table_names() + db.view_names()
-                if not any(["_fts_" in s, s.endswith("_fts"), s.startswith("sqlite_")])
-            ]
-            if table_index is not None:
-                tables = [tables[table_index]]
-
-        for table in tables:
+        for table in sqlite_tables(db, table_name, table_index):
             df = pd.DataFrame(db[table].rows_where(offset=start_row, limit=end_row, order_by=order_by))
             dfs.append(NDF(table, df))
         db.close()
@@ -353,6 +411,11 @@ def read_file_to_dataframes(
             header=None if skip_headers else 0,
         )
         dfs.append(NDF(None, df))
+    elif mimetype in ARROW_FORMATS and (start_row or end_row):
+        chunks = arrow_chunks(path, ARROW_FORMATS[mimetype], consts.DEFAULT_FILE_ROWS_READ_LIMIT)
+        chunks = list(slice_dataframes(chunks, start_row, end_row))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        dfs.append(NDF(None, df))
     elif mimetype in ("parq", "parquet", "application/parquet"):
         df = pd.read_parquet(path)
         dfs.append(NDF(None, df))
@@ -426,6 +489,317 @@ def read_file_to_dataframes(
     return dfs
 
 
+CSV_OPTIONS = {
+    "csv": {},
+    "text/csv": {},
+    "tsv": {"delimiter": "\t"},
+    "text/tsv": {"delimiter": "\t"},
+    "text/tab-separated-values": {"delimiter": "\t"},
+    "wsv": {"delim_whitespace": True},
+    "text/wsv": {"delim_whitespace": True},
+    "text/whitespace-separated-values": {"delim_whitespace": True},
+}
+JSONL_MIMETYPES = ("jsonl", "json lines", "geojson lines")
+ARROW_FORMATS = {
+    "parq": "parquet",
+    "parquet": "parquet",
+    "application/parquet": "parquet",
+    "feather": "feather",
+    "orc": "orc",
+}
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def has_chunked_reader(mimetype) -> bool:
+    return (
+        mimetype in SQLITE_MIMETYPES
+        or mimetype in CSV_OPTIONS
+        or mimetype in JSONL_MIMETYPES
+        or mimetype in ARROW_FORMATS
+    )
+
+
+def sqlite_tables(db, table_name=None, table_index=None) -> list[str]:
+    if table_name:
+        return [table_name]
+
+    tables = [
+        s
+        for s in db.table_names() + db.view_names()
+        if not any(["_fts_" in s, s.endswith("_fts"), s.startswith("sqlite_")])
+    ]
+    if table_index is not None:
+        tables = [tables[table_index]]
+    return tables
+
+
+def sql_identifier(s) -> str:
+    return '"' + str(s).replace('"', '""') + '"'
+
+
+def filters_to_sql(filters) -> tuple[str, list]:
+    clauses = []
+    params = []
+    for column, op, value in filters:
+        if op in ("in", "not in"):
+            clauses.append(f"{sql_identifier(column)} {op.upper()} ({','.join('?' * len(value))})")
+            params.extend(value)
+        elif op in FILTER_OPERATORS:
+            clauses.append(f"{sql_identifier(column)} {'=' if op == '==' else op} ?")
+            params.append(value)
+        else:
+            msg = f"Unsupported filter operator: {op}"
+            raise ValueError(msg)
+    return " AND ".join(clauses), params
+
+
+def filter_dataframe(df, filters):
+    mask = None
+    for column, op, value in filters:
+        if op == "in":
+            column_mask = df[column].isin(value)
+        elif op == "not in":
+            column_mask = ~df[column].isin(value)
+        else:
+            column_mask = FILTER_OPERATORS[op](df[column], value)
+        mask = column_mask if mask is None else mask & column_mask
+    return df if mask is None else df[mask]
+
+
+def slice_dataframes(dfs, start_row=None, end_row=None):
+    skip_rows = start_row or 0
+    remaining = end_row
+    for df in dfs:
+        if skip_rows:
+            df, skip_rows = df.iloc[skip_rows:], max(skip_rows - len(df), 0)
+        if remaining is not None:
+            df = df.iloc[:remaining]
+            remaining -= len(df)
+        if len(df):
+            yield df
+        if remaining == 0:
+            break
+
+
+def sqlite_keyset_chunks(db, table, chunk_rows, start_row=None, end_row=None, select="*", where="", params=()):
+    import pandas as pd
+
+    # seek past the last rowid of the previous page instead of using OFFSET for every page
+    last_rowid = None
+    remaining = end_row
+    while remaining is None or remaining > 0:
+        limit = chunk_rows if remaining is None else min(chunk_rows, remaining)
+        if last_rowid is None:
+            sql = f"SELECT rowid AS lb_rowid, {select} FROM {sql_identifier(table)}"
+            sql += f" WHERE {where}" if where else ""
+            cursor = db.execute(sql + " ORDER BY rowid LIMIT ? OFFSET ?", [*params, limit, start_row or 0])
+        else:
+            sql = f"SELECT rowid AS lb_rowid, {select} FROM {sql_identifier(table)} WHERE rowid > ?"
+            sql += f" AND ({where})" if where else ""
+            cursor = db.execute(sql + " ORDER BY rowid LIMIT ?", [last_rowid, *params, limit])
+
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+        columns = [d[0] for d in cursor.description][1:]
+        yield NDF(table, pd.DataFrame.from_records([row[1:] for row in rows], columns=columns))
+
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < limit:
+            break
+
+
+def has_rowid(db, table) -> bool:
+    if table not in db.table_names():
+        return False  # views
+    try:
+        db.execute(f"SELECT rowid FROM {sql_identifier(table)} LIMIT 0")
+    except sqlite3.OperationalError:  # WITHOUT ROWID
+        return False
+    return True
+
+
+def sqlite_chunks(
+    path,
+    chunk_rows,
+    table_name=None,
+    table_index=None,
+    start_row=None,
+    end_row=None,
+    order_by=None,
+    columns=None,
+    filters=None,
+):
+    import pandas as pd
+    from sqlite_utils import Database
+
+    where, params = filters_to_sql(filters or [])
+    select = ", ".join(sql_identifier(c) for c in columns) if columns else "*"
+
+    referenced_columns = {*(columns or []), *(column for column, _op, _value in filters or [])}
+
+    db = Database(path)
+    try:
+        for table in sqlite_tables(db, table_name, table_index):
+            missing_columns = referenced_columns.difference(db[table].columns_dict)
+            if missing_columns:
+                log.info("[%s]: Skipping table without columns %s", table, ", ".join(sorted(missing_columns)))
+                continue
+
+            if order_by or not has_rowid(db, table):
+                rows = db[table].rows_where(
+                    where or None, params, select=select, order_by=order_by, offset=start_row, limit=end_row
+                )
+                while chunk := list(itertools.islice(rows, chunk_rows)):
+                    yield NDF(table, pd.DataFrame(chunk))
+            else:
+                yield from sqlite_keyset_chunks(db, table, chunk_rows, start_row, end_row, select, where, params)
+    finally:
+        db.close()
+
+
+def arrow_chunks(path, file_format, chunk_rows, columns=None, filters=None):
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    dataset = ds.dataset(path, format=file_format)
+    expression = pq.filters_to_expression(filters) if filters else None
+    for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunk_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def iter_dataframe_chunks(
+    path,
+    chunk_rows,
+    table_name=None,
+    table_index=None,
+    start_row=None,
+    end_row=None,
+    order_by=None,
+    encoding=None,
+    mimetype=None,
+    columns=None,
+    filters=None,
+    skip_headers=False,
+):
+    import pandas as pd
+
+    if mimetype in SQLITE_MIMETYPES:
+        yield from sqlite_chunks(
+            path, chunk_rows, table_name, table_index, start_row, end_row, order_by, columns, filters
+        )
+        return
+    if mimetype in ARROW_FORMATS:
+        chunks = arrow_chunks(path, ARROW_FORMATS[mimetype], chunk_rows, columns, filters)
+        for df in slice_dataframes(chunks, start_row, end_row):
+            yield NDF("0", df)
+        return
+
+    if mimetype in CSV_OPTIONS:
+        reader = pd.read_csv(
+            path,
+            chunksize=chunk_rows,
+            nrows=end_row,
+            skiprows=start_row or 0,
+            encoding=encoding,
+            header=None if skip_headers else 0,
+            **CSV_OPTIONS[mimetype],
+        )
+        start_row = None
+        end_row = None
+    elif mimetype in JSONL_MIMETYPES:
+        nrows = (start_row or 0) + end_row if end_row else None
+        reader = pd.read_json(path, lines=True, chunksize=chunk_rows, nrows=nrows, encoding=encoding)
+    else:
+        # formats without a streaming reader are parsed once and then sliced
+        for df_name, df in read_file_to_dataframes(
+            path,
+            table_name=table_name,
+            table_index=table_index,
+            start_row=start_row,
+            end_row=end_row,
+            order_by=order_by,
+            encoding=encoding,
+            mimetype=mimetype,
+            skip_headers=skip_headers,
+        ):
+            if filters:
+                df = filter_dataframe(df, filters)
+            if columns:
+                df = df[columns]
+            for i in range(0, len(df), chunk_rows):
+                yield NDF(df_name, df.iloc[i : i + chunk_rows])
+        return
+
+    with reader:
+        for df in slice_dataframes(reader, start_row, end_row):
+            if skip_headers:
+                df.columns = [f"column{i}" for i in range(len(df.columns))]
+            if filters:
+                df = filter_dataframe(df, filters)
+            if columns:
+                df = df[columns]
+            if len(df):
+                yield NDF("0", df)
+
+
+@retry_with_different_encodings
+def read_file_to_dataframe_chunks(
+    path,
+    chunk_rows=consts.DEFAULT_FILE_ROWS_READ_LIMIT,
+    table_name=None,
+    table_index=None,
+    start_row=None,
+    end_row=None,
+    order_by=None,
+    encoding=None,
+    mimetype=None,
+    columns=None,
+    filters=None,
+    skip_headers=False,
+) -> Iterator[NDF]:
+    """
+    Read a table-like file from start to end once, yielding up to chunk_rows rows at a time
+
+    Unlike calling read_file_to_dataframes with increasing start_row, earlier rows are not parsed again for each chunk.
+    SQLite tables are paged by rowid and Parquet, Feather, and ORC files are scanned one record batch at a time, so
+    memory use depends on chunk_rows instead of the size of the file.
+
+    columns and filters, e.g. [("year", ">=", 2000), ("genre", "in", ["drama"])], are pushed down to SQLite and
+    pyarrow. Other formats apply them to each chunk after reading (after start_row and end_row)
+    """
+    mimetype = table_mimetype(path, mimetype)
+    chunks = iter_dataframe_chunks(
+        path,
+        chunk_rows,
+        table_name=table_name,
+        table_index=table_index,
+        start_row=start_row,
+        end_row=end_row,
+        order_by=order_by,
+        encoding=encoding,
+        mimetype=mimetype,
+        columns=columns,
+        filters=filters,
+        skip_headers=skip_headers,
+    )
+    first_chunk = next(chunks, None)  # raise UnicodeDecodeError here so that the decorator can retry
+    if first_chunk is None:
+        return iter(())
+    return itertools.chain([first_chunk], chunks)
+
+
 def filter_deleted(paths):
     deleted_paths = set()
 
@@ -479,3 +853,24 @@ def get_file_type(d):
             d["time_deleted"] = consts.APPLICATION_START
 
     return d
+
+
+def get_files_types(media) -> list[dict]:
+    """
+    Fill in the type of rows which do not have one yet
+
+    Known file extensions are resolved with only an is_dir check; the remaining files are sniffed in a thread pool
+    """
+    unknown = []
+    for d in media:
+        if d.get("type") is None:
+            d["type"] = mimetype_from_extension(d["path"])
+            if d["type"] is None:
+                unknown.append(d)
+            elif d["type"] != "Zarr" and not d["path"].startswith("http") and os.path.isdir(d["path"]):
+                d["type"] = "directory"  # eg. a folder named data.json
+
+    if unknown:
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(get_file_type, unknown))
+    return media
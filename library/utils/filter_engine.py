@@ -363,7 +363,7 @@ def is_mime_match(types: list[str], mime_type: str) -> bool:
 
 def filter_mimetype(args, files):
     if getattr(args, "type", None) or getattr(args, "no_type", None):
-        files = [d if "type" in d else file_utils.get_file_type(d) for d in files]
+        files = file_utils.get_files_types(list(files))
     if getattr(args, "no_type", None):
         files = [d for d in files if not is_mime_match(args.no_type, d["type"] or "None")]
     if getattr(args, "type", None):
@@ -434,7 +434,7 @@ def filter_items_by_criteria(args, items):
 
     if getattr(args, "to_json", False):
         items = [d if "size" in d else file_utils.get_file_stats(d) for d in items]
-        items = [d if "type" in d else file_utils.get_file_type(d) for d in items]
+        items = file_utils.get_files_types(items)
 
     if items and getattr(args, "sort", []):
         items = sort_items_by_criteria(args, items)
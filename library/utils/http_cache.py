@@ -0,0 +1,190 @@
+import sqlite3, sys, threading, time, zlib
+from collections import Counter
+
+from requests.structures import CaseInsensitiveDict
+
+from library.utils import strings
+from library.utils.log_utils import log
+
+"""
+http_cache table (SQLite sidecar)
+    url
+    etag, last_modified, content_length, content_type = response headers
+    content = zlib compressed body of pages which were parsed for links; re-used when the server replies 304
+        HEAD responses keep the stored body unless the ETag or Last-Modified changed
+    time_checked = when the server last confirmed these headers
+"""
+
+MAX_CACHED_CONTENT_SIZE = 16 * 1024 * 1024
+
+cache = None
+
+
+class CachedResponse:
+    def __init__(self, d):
+        self.status_code = 200
+        self.headers = CaseInsensitiveDict(
+            {
+                k: v
+                for k, v in {
+                    "ETag": d["etag"],
+                    "Last-Modified": d["last_modified"],
+                    "Content-Length": d["content_length"],
+                    "Content-Type": d["content_type"],
+                }.items()
+                if v is not None
+            }
+        )
+
+    def close(self):
+        pass
+
+
+class HTTPCache:
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl or 0
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_length TEXT,
+                content_type TEXT,
+                content BLOB,
+                time_checked INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def get(self, url) -> dict | None:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM http_cache WHERE url = ?", [url]).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, d) -> bool:
+        return d is not None and time.time() - d["time_checked"] < self.ttl
+
+    def put(self, url, response, content=None) -> None:
+        headers = response.headers
+        if content is not None and len(content) > MAX_CACHED_CONTENT_SIZE:
+            content = None
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO http_cache
+                (url, etag, last_modified, content_length, content_type, content, time_checked)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    content = CASE
+                        WHEN excluded.content IS NOT NULL THEN excluded.content
+                        WHEN excluded.etag IS NOT http_cache.etag
+                            OR excluded.last_modified IS NOT http_cache.last_modified THEN NULL
+                        ELSE http_cache.content
+                    END
+                    , etag = excluded.etag
+                    , last_modified = excluded.last_modified
+                    , content_length = excluded.content_length
+                    , content_type = excluded.content_type
+                    , time_checked = excluded.time_checked
+                """,
+                [
+                    url,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    headers.get("Content-Length"),
+                    headers.get("Content-Type"),
+                    zlib.compress(content) if content is not None else None,
+                    int(time.time()),
+                ],
+            )
+
+    def touch(self, url) -> None:
+        with self.lock:
+            self.conn.execute("UPDATE http_cache SET time_checked = ? WHERE url = ?", [int(time.time()), url])
+
+    def head(self, url):
+        """
+        Headers from a previous response if they were checked within the TTL
+        """
+        d = self.get(url)
+        if self.is_fresh(d):
+            self.stats["hits"] += 1
+            return CachedResponse(d)
+        self.stats["misses"] += 1
+        return None
+
+    def conditional_headers(self, url) -> tuple[dict, dict | None]:
+        d = self.get(url)
+        if d is None or d["content"] is None:
+            return {}, None
+
+        headers = {}
+        if d["etag"]:
+            headers["If-None-Match"] = d["etag"]
+        if d["last_modified"]:
+            headers["If-Modified-Since"] = d["last_modified"]
+        return headers, d if headers else None
+
+    def not_modified(self, url, d) -> bytes:
+        content = zlib.decompress(d["content"])
+        self.touch(url)
+        self.stats["revalidated"] += 1
+        self.stats["bytes_saved"] += len(content)
+        return content
+
+    def modified(self, url, response, content) -> None:
+        self.stats["misses"] += 1
+        self.put(url, response, content)
+
+    def summary(self) -> str:
+        hits = self.stats["hits"] + self.stats["revalidated"]
+        total = hits + self.stats["misses"]
+        hit_rate = strings.percent(hits / total if total else 0)
+        bytes_saved = strings.file_size(self.stats["bytes_saved"])
+        return (
+            f"HTTP cache: {hits} hits ({self.stats['revalidated']} revalidated), {self.stats['misses']} misses"
+            f" ({hit_rate} hit rate); {bytes_saved} saved"
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def default_path(database) -> str | None:
+    if not database or ":memory:" in database:
+        return None
+    return f"{database}.http_cache.db"
+
+
+def open_cache(args, path=None) -> HTTPCache | None:
+    global cache
+
+    if getattr(args, "no_http_cache", False):
+        return None
+    path = getattr(args, "http_cache", None) or path
+    if not path:
+        return None
+
+    cache = HTTPCache(path, ttl=getattr(args, "http_cache_ttl", None))
+    log.debug("Using HTTP cache %s", path)
+    return cache
+
+
+def close_cache() -> None:
+    global cache
+
+    if cache is None:
+        return
+    if sum(cache.stats.values()):
+        print(cache.summary(), file=sys.stderr)
+    cache.close()
+    cache = None
@@ -276,6 +276,30 @@ def mountpoint(path):
     return os.path.expanduser("~")
 
 
+def group_by_prefixes(prefixes, items, key=lambda d: d["path"], longest=False) -> dict[str, list]:
+    """
+    Bucket items by the prefixes that they start with in one pass
+
+    Prefixes are looked up per distinct prefix length rather than comparing each
+    item against every prefix. With longest=True each item only goes into the
+    bucket of its longest matching prefix
+    """
+    prefixes = list(dict.fromkeys(prefixes))
+    prefix_lengths = sorted({len(prefix) for prefix in prefixes}, reverse=True)
+    prefix_set = set(prefixes)
+
+    buckets = {prefix: [] for prefix in prefixes}
+    for item in items:
+        s = key(item)
+        for length in prefix_lengths:
+            prefix = s[:length]
+            if len(prefix) == length and prefix in prefix_set:
+                buckets[prefix].append(item)
+                if longest:
+                    break
+    return buckets
+
+
 def relative_from_mountpoint(src: str | Path, dest: str | Path) -> Path:
     dest = Path(dest)
     src = Path(src)
@@ -1,10 +1,10 @@
-import contextlib, functools, importlib, json, multiprocessing, os, shlex, shutil, signal, subprocess, sys, threading
+import contextlib, functools, importlib, json, os, shlex, shutil, signal, subprocess, sys
 from contextlib import suppress
 from pathlib import Path
 from typing import NoReturn
 
 from library.data import unar_errors
-from library.utils import consts, iterables, nums, path_utils, shell_utils, strings
+from library.utils import consts, iterables, nums, path_utils, shell_utils, strings, worker_pools
 from library.utils.log_utils import log
 from library.utils.objects import traverse_obj
 
@@ -65,12 +65,7 @@ def with_timeout(seconds):  # noqa: ANN201
     def decorator(decorated):
         @functools.wraps(decorated)
         def inner(*args, **kwargs):
-            pool = multiprocessing.Pool(1)
-            async_result = pool.apply_async(decorated, args, kwargs)
-            try:
-                return async_result.get(seconds)
-            finally:
-                pool.close()
+            return worker_pools.get_process_pool().run(seconds, decorated, args, kwargs)
 
         return inner
 
@@ -81,22 +76,7 @@ def with_timeout_thread(seconds):  # noqa: ANN201
     def decorator(decorated):
         @functools.wraps(decorated)
         def inner(*args, **kwargs):
-            event = threading.Event()  # task completed
-
-            result = None
-
-            def target():
-                nonlocal result
-                result = decorated(*args, **kwargs)
-                event.set()
-
-            thread = threading.Thread(target=target)
-            thread.start()
-
-            if event.wait(seconds):
-                return result
-            else:
-                raise TimeoutError
+            return worker_pools.get_thread_pool().run(seconds, decorated, args, kwargs)
 
         return inner
 
@@ -105,21 +85,8 @@ def with_timeout_thread(seconds):  # noqa: ANN201
 
 @contextlib.contextmanager
 def timeout_thread(seconds):
-    event = threading.Event()  # task completed
-    result = None
-
-    def target(func, *args, **kwargs):
-        nonlocal result
-        result = func(*args, **kwargs)
-        event.set()
-
     def run(func, *args, **kwargs):
-        thread = threading.Thread(target=target, args=(func, *args), kwargs=kwargs)
-        thread.start()
-        if event.wait(seconds):
-            return result
-        else:
-            raise TimeoutError
+        return worker_pools.get_thread_pool().run(seconds, func, args, kwargs)
 
     yield run
 
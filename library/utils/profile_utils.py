@@ -0,0 +1,202 @@
+import argparse, json, os, sys, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from library.utils.log_utils import log
+
+PROFILE_MODES = ["cprofile", "sample", "spans"]
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class Tracer:
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.spans = []
+        self.local = threading.local()
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self.stack()
+        d = {
+            "name": name,
+            "parent": stack[-1]["name"] if stack else None,
+            "path": ";".join([*(s["name"] for s in stack), name]),
+            "depth": len(stack),
+            "tid": threading.get_ident(),
+            "start": time.perf_counter_ns() - self.start_ns,
+            "duration": None,
+            "args": attrs,
+        }
+        stack.append(d)
+        try:
+            yield d
+        finally:
+            stack.pop()
+            d["duration"] = time.perf_counter_ns() - self.start_ns - d["start"]
+            self.spans.append(d)
+
+
+tracer: Tracer | None = None
+
+
+@contextmanager
+def span(name, **attrs):
+    if tracer is None:
+        yield None
+    else:
+        with tracer.span(name, **attrs) as d:
+            yield d
+
+
+class Sampler(threading.Thread):
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def argparse_profile() -> argparse.Namespace | None:
+    parser = argparse.ArgumentParser(add_help=False, exit_on_error=False)
+    parser.add_argument("--profile", dest="profiler", nargs="?", const="cprofile", choices=PROFILE_MODES)
+    parser.add_argument("--profile-output")
+    try:
+        args, _unknown = parser.parse_known_args()
+    except argparse.ArgumentError:
+        return None  # the subcommand parser will report the error
+    if args.profiler is None:
+        return None
+    return args
+
+
+def default_output_path(name):
+    return f"lb-profile-{name}-{time.strftime('%Y%m%dT%H%M%S')}.json"
+
+
+def cprofile_functions(profiler, limit=60):
+    import pstats
+
+    stats = pstats.Stats(profiler).stats  # type: ignore
+    functions = [
+        {
+            "function": f"{func_name} ({os.path.basename(filename)}:{line_number})",
+            "ncalls": ncalls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for (filename, line_number, func_name), (_primitive_calls, ncalls, tottime, cumtime, _callers) in stats.items()
+    ]
+    return sorted(functions, key=lambda d: d["cumtime"], reverse=True)[:limit]
+
+
+def span_folded_stacks(spans):
+    self_time = Counter()
+    for d in spans:
+        self_time[d["path"]] += d["duration"]
+        if d["parent"] is not None:
+            self_time[d["path"].rsplit(";", 1)[0]] -= d["duration"]
+    return {k: max(v, 0) // 1000 for k, v in self_time.items()}  # microseconds
+
+
+def trace_events(spans):
+    pid = os.getpid()
+    return [
+        {
+            "name": d["name"],
+            "ph": "X",
+            "ts": d["start"] / 1000,
+            "dur": d["duration"] / 1000,
+            "pid": pid,
+            "tid": d["tid"],
+            "args": d["args"],
+        }
+        for d in sorted(spans, key=lambda d: d["start"])
+    ]
+
+
+def write_results(output_path, mode, name, spans, profiler=None, sampler=None):
+    from library.__main__ import __version__
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if output_path.suffix in (".prof", ".pstats"):
+        if profiler is None:
+            log.error("%s output requires --profile cprofile", output_path.suffix)
+            return None
+        profiler.dump_stats(output_path)
+    elif output_path.suffix in (".folded", ".txt"):
+        stacks = sampler.stacks if sampler else span_folded_stacks(spans)
+        with output_path.open("w") as f:
+            for stack, count in stacks.items():
+                if count > 0:
+                    f.write(f"{stack} {count}\n")
+    else:
+        other_data = {
+            "version": __version__,
+            "subcommand": name,
+            "argv": sys.argv,
+            "profiler": mode,
+            "total_seconds": sum(d["duration"] for d in spans if d["depth"] == 0) / 1e9,
+        }
+        if profiler is not None:
+            other_data["functions"] = cprofile_functions(profiler)
+        if sampler is not None:
+            other_data["sample_interval"] = sampler.interval
+            other_data["samples"] = dict(sampler.stacks.most_common())
+
+        with output_path.open("w") as f:
+            json.dump({"traceEvents": trace_events(spans), "displayTimeUnit": "ms", "otherData": other_data}, f)
+
+    print("Profile written to", output_path, file=sys.stderr)
+    return output_path
+
+
+def profile_run(func, name, mode="cprofile", output_path=None):
+    global tracer
+
+    tracer = Tracer()
+    profiler = None
+    sampler = None
+    if mode == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif mode == "sample":
+        sampler = Sampler(threading.get_ident())
+        sampler.start()
+
+    try:
+        with tracer.span(name):
+            return func()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+
+        spans, tracer = tracer.spans, None
+        write_results(output_path or default_output_path(name), mode, name, spans, profiler=profiler, sampler=sampler)
@@ -322,6 +322,37 @@ def tempdir_unlink(pattern):
             pass
 
 
+def clone_file(source_file, destination_file):
+    """
+    Copy with a reflink or copy_file_range when the filesystem supports it (CoW clones, NFS server-side copy)
+    """
+    if not hasattr(os, "copy_file_range"):
+        return shutil.copy2(source_file, destination_file)
+
+    import fcntl
+
+    FICLONE = 0x40049409
+    try:
+        with open(source_file, "rb") as fsrc, open(destination_file, "wb") as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+    except OSError as excinfo:
+        if excinfo.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EBADF):
+            raise
+        log.debug("copy_file_range not supported: %s. %s", describe_os_error(excinfo), destination_file)
+        shutil.copyfile(source_file, destination_file)
+
+    shutil.copystat(source_file, destination_file)
+    return destination_file
+
+
 def copy_file(source_file, destination_file, simulate=False):
     if simulate:
         print("cp", source_file, destination_file)
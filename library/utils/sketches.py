@@ -0,0 +1,300 @@
+"""
+Mergeable summaries for columns which are read one chunk at a time
+
+Each sketch has update(values) for a new chunk and merge(other) for combining sketches built separately.
+Values are numpy arrays or pandas Series without nulls
+"""
+
+import math, random
+
+
+class Moments:
+    """
+    Count, sum, min, max, mean and central moments
+
+    Chunks are reduced exactly then combined with the pairwise form of Welford's algorithm (Chan et al., Pébay)
+    so the result matches a single pass over all values
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.min = math.nan
+        self.max = math.nan
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+
+    def update(self, values) -> None:
+        import numpy as np
+
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+
+        chunk = Moments()
+        chunk.n = len(values)
+        chunk.total = float(values.sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        chunk.mean = float(values.mean())
+        deltas = values - chunk.mean
+        chunk.m2 = float((deltas**2).sum())
+        chunk.m3 = float((deltas**3).sum())
+        chunk.m4 = float((deltas**4).sum())
+        self.merge(chunk)
+
+    def merge(self, other) -> None:
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return
+
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+
+        m4 = (
+            self.m4
+            + other.m4
+            + delta**4 * na * nb * (na * na - na * nb + nb * nb) / n**3
+            + 6 * delta**2 * (na * na * other.m2 + nb * nb * self.m2) / n**2
+            + 4 * delta * (na * other.m3 - nb * self.m3) / n
+        )
+        m3 = self.m3 + other.m3 + delta**3 * na * nb * (na - nb) / n**2 + 3 * delta * (na * other.m2 - nb * self.m2) / n
+        self.m2 = self.m2 + other.m2 + delta**2 * na * nb / n
+        self.m3 = m3
+        self.m4 = m4
+        self.mean = self.mean + delta * nb / n
+        self.n = n
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        if self.n < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.n - 1))
+
+    @property
+    def skew(self) -> float:
+        """Adjusted Fisher-Pearson skewness, like pandas.Series.skew"""
+        n = self.n
+        if n < 3:
+            return math.nan
+        if self.m2 == 0:
+            return 0.0
+        g1 = math.sqrt(n) * self.m3 / self.m2**1.5
+        return g1 * math.sqrt(n * (n - 1)) / (n - 2)
+
+    @property
+    def kurt(self) -> float:
+        """Unbiased excess kurtosis, like pandas.Series.kurt"""
+        n = self.n
+        if n < 4:
+            return math.nan
+        if self.m2 == 0:
+            return 0.0
+        g2 = n * self.m4 / self.m2**2 - 3
+        return ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3))
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch
+
+    Keeps about 3 * k values. Quantiles and ranks are within about rank_error * n positions of the exact answer
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = []
+        self.rng = random.Random(seed)
+
+    @property
+    def rank_error(self) -> float:
+        # empirical fit for KLL sketches (Apache DataSketches, single-sided, 99% confidence)
+        return 2.296 / self.k**0.9723
+
+    @property
+    def n(self) -> int:
+        return sum(len(items) << level for level, items in enumerate(self.levels))
+
+    def capacity(self, level) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def compress(self) -> None:
+        import numpy as np
+
+        is_compressed = False
+        while not is_compressed:
+            is_compressed = True
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self.capacity(level):
+                    continue
+                is_compressed = False
+
+                if level + 1 == len(self.levels):
+                    self.levels.append(items[:0])
+                items = np.sort(items)
+                if len(items) % 2:  # the odd value stays behind
+                    self.levels[level] = items[:1]
+                    items = items[1:]
+                else:
+                    self.levels[level] = items[:0]
+                promoted = items[self.rng.randrange(2) :: 2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values) -> None:
+        import numpy as np
+
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+
+        if self.levels:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+        else:
+            self.levels = [values.copy()]
+        self.compress()
+
+    def merge(self, other) -> None:
+        import numpy as np
+
+        for level, items in enumerate(other.levels):
+            if level < len(self.levels):
+                self.levels[level] = np.concatenate([self.levels[level], items])
+            else:
+                self.levels.append(items.copy())
+        self.compress()
+
+    def weighted_values(self):
+        import numpy as np
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs) -> list[float]:
+        import numpy as np
+
+        if not self.levels:
+            return [math.nan for _ in qs]
+
+        values, cumulative = self.weighted_values()
+        total = cumulative[-1]
+        positions = np.searchsorted(cumulative, [q * total for q in qs], side="left")
+        return [float(values[min(i, len(values) - 1)]) for i in positions]
+
+    def ranks(self, points):
+        """Estimated number of values <= each point"""
+        import numpy as np
+
+        if not self.levels:
+            return np.zeros(len(points), dtype=int)
+
+        values, cumulative = self.weighted_values()
+        positions = np.searchsorted(values, points, side="right")
+        return np.concatenate([[0], cumulative])[positions]
+
+
+class HyperLogLog:
+    """Distinct count estimate with a relative standard error of about 1.04 / sqrt(2 ** p)"""
+
+    def __init__(self, p=14):
+        import numpy as np
+
+        if not 11 <= p <= 18:
+            raise ValueError("p must be between 11 and 18")
+
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values) -> None:
+        import numpy as np
+        import pandas as pd
+
+        if len(values) == 0:
+            return
+
+        hashes = pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+        bits = 64 - self.p
+        buckets = (hashes >> np.uint64(bits)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << bits) - 1)
+        # frexp gives the bit length; it is exact because the remainder has fewer than 53 bits
+        _mantissa, bit_lengths = np.frexp(remainder.astype(float))
+        ranks = (bits - bit_lengths + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other) -> None:
+        import numpy as np
+
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        import numpy as np
+
+        m = len(self.registers)
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting is more accurate for small sets
+        return round(estimate)
+
+
+class HeavyHitters:
+    """
+    Space-saving counters for the most common values
+
+    A count can overestimate the true count by its error but never underestimates it.
+    A value which is not tracked occurred at most `floor` times
+    """
+
+    def __init__(self, capacity=1000):
+        import pandas as pd
+
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.errors = pd.Series(dtype="int64")
+        self.floor = 0
+
+    def update(self, values) -> None:
+        import pandas as pd
+
+        counts = pd.Series(values).value_counts()
+        if len(counts) == 0:
+            return
+
+        chunk = HeavyHitters(self.capacity)
+        if len(counts) > self.capacity:
+            chunk.floor = int(counts.iloc[self.capacity])
+            counts = counts.iloc[: self.capacity]
+        chunk.counts = counts
+        chunk.errors = pd.Series(0, index=counts.index, dtype="int64")
+        self.merge(chunk)
+
+    def merge(self, other) -> None:
+        # untracked values on either side are assumed to have occurred `floor` times there
+        index = self.counts.index.union(other.counts.index, sort=False)
+        counts = self.counts.reindex(index, fill_value=self.floor) + other.counts.reindex(index, fill_value=other.floor)
+        errors = self.errors.reindex(index, fill_value=self.floor) + other.errors.reindex(index, fill_value=other.floor)
+
+        floor = self.floor + other.floor
+        counts = counts.sort_values(ascending=False, kind="stable")
+        if len(counts) > self.capacity:
+            floor = max(floor, int(counts.iloc[self.capacity]))
+            counts = counts.iloc[: self.capacity]
+
+        self.counts = counts.astype("int64")
+        self.errors = errors.reindex(counts.index).astype("int64")
+        self.floor = floor
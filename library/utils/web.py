@@ -11,7 +11,7 @@ from bs4 import element
 from idna import encode as puny_encode
 
 from library.data.http_errors import HTTPStatus, HTTPTooManyRequests, raise_for_status
-from library.utils import consts, db_utils, iterables, nums, path_utils, pd_utils, processes, strings
+from library.utils import consts, db_utils, http_cache, iterables, nums, path_utils, pd_utils, processes, strings
 from library.utils.log_utils import clamp_index, log
 from library.utils.path_utils import path_tuple_from_url
 
@@ -983,9 +983,14 @@ def is_html(args, url, max_size=2 * 1024 * 1024):
     if url.endswith(media_extensions):
         return False
 
-    r = None
+    r = cached = None
     try:
-        r = requests_session().head(url, timeout=(5, 8))
+        if http_cache.cache:
+            r = cached = http_cache.cache.head(url)
+        if r is None:
+            r = requests_session().head(url, timeout=(5, 8))
+            if http_cache.cache and r.ok:
+                http_cache.cache.put(url, r)
 
         content_length = r.headers.get("Content-Length")
         if content_length and int(content_length) > max_size:
@@ -1004,7 +1009,8 @@ def is_html(args, url, max_size=2 * 1024 * 1024):
         if r:
             r.close()
 
-    sleep(args)
+    if cached is None:
+        sleep(args)
 
     return True  # if ambiguous, return True
 
@@ -1182,10 +1188,17 @@ def stat(url, follow_symlinks=True):
         log.warning("Creating new web.session")
         session = requests_session()
 
+    if http_cache.cache:
+        cached = http_cache.cache.head(url)
+        if cached:
+            return WebStatResult(cached)
+
     r = session.head(url, allow_redirects=follow_symlinks)
 
     code = HTTPStatus(r.status_code)
     if code.is_informational or code.is_success or code.is_redirection:
+        if http_cache.cache:
+            http_cache.cache.put(url, r)
         return WebStatResult(r)
     elif r.status_code == HTTPStatus.NOT_FOUND:
         raise FileNotFoundError
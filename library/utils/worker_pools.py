@@ -0,0 +1,183 @@
+import multiprocessing, os, signal, threading
+from concurrent.futures import Future
+
+from library.utils.log_utils import log
+
+"""
+Long-lived workers for running calls with a deadline
+
+processes.with_timeout and processes.with_timeout_thread used to create a multiprocessing.Pool or a thread
+for every call. These pools keep idle workers around between calls instead. A process worker which misses its
+deadline is killed and replaced; a thread cannot be killed so it is abandoned (it exits once its call returns)
+and a new thread takes its place
+"""
+
+
+def process_worker(conn) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C and kills its workers
+
+    while True:
+        try:
+            func, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        try:
+            result = (True, func(*args, **kwargs))
+        except BaseException as excinfo:
+            result = (False, excinfo)
+
+        try:
+            conn.send(result)
+        except Exception as excinfo:  # unpicklable result or exception
+            conn.send((False, RuntimeError(repr(excinfo))))
+
+
+class ProcessTimeoutPool:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = []
+        self.worker_count = 0
+
+    def spawn(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=process_worker, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def acquire(self):
+        with self.condition:
+            while not self.idle and self.worker_count >= self.max_workers:
+                self.condition.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.worker_count += 1
+
+        try:
+            return self.spawn()
+        except BaseException:
+            with self.condition:
+                self.worker_count -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, worker) -> None:
+        with self.condition:
+            self.idle.append(worker)
+            self.condition.notify()
+
+    def discard(self, worker) -> None:
+        process, conn = worker
+        process.kill()
+        process.join()
+        conn.close()
+        with self.condition:
+            self.worker_count -= 1
+            self.condition.notify()
+
+    def run(self, seconds, func, args=(), kwargs=None):
+        worker = self.acquire()
+        _process, conn = worker
+        try:
+            conn.send((func, args, kwargs or {}))
+        except Exception:
+            self.discard(worker)
+            raise
+
+        if not conn.poll(seconds):
+            log.debug("Replacing worker process which missed its %ss deadline", seconds)
+            self.discard(worker)
+            raise multiprocessing.TimeoutError
+
+        try:
+            is_ok, value = conn.recv()
+        except (EOFError, OSError):
+            log.warning("Worker process exited while running %s", getattr(func, "__name__", func))
+            self.discard(worker)
+            raise multiprocessing.TimeoutError from None
+
+        self.release(worker)
+        if is_ok:
+            return value
+        raise value
+
+    def close(self) -> None:
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for worker in idle:
+            self.discard(worker)
+
+
+class ThreadTimeoutPool:
+    def __init__(self, max_workers=64):
+        self.max_workers = max_workers
+        self.condition = threading.Condition()
+        self.tasks = []
+        self.idle_count = 0
+        self.worker_count = 0
+
+    def worker(self) -> None:
+        while True:
+            with self.condition:
+                self.idle_count += 1
+                while not self.tasks:
+                    self.condition.wait()
+                self.idle_count -= 1
+                task = self.tasks.pop(0)
+
+            func, args, kwargs, future = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as excinfo:
+                    future.set_exception(excinfo)
+
+            if getattr(future, "abandoned", False):
+                return  # a replacement thread was started when this call missed its deadline
+
+    def submit(self, func, args=(), kwargs=None) -> Future:
+        future = Future()
+        with self.condition:
+            self.tasks.append((func, args, kwargs or {}, future))
+            if self.idle_count < len(self.tasks) and self.worker_count < self.max_workers:
+                self.worker_count += 1
+                threading.Thread(target=self.worker, daemon=True).start()
+            self.condition.notify()
+        return future
+
+    def run(self, seconds, func, args=(), kwargs=None):
+        future = self.submit(func, args, kwargs)
+        try:
+            return future.result(timeout=seconds)
+        except TimeoutError:
+            with self.condition:
+                if not future.cancel():  # already running: leave the stuck thread behind
+                    future.abandoned = True
+                    self.worker_count -= 1
+            raise
+
+
+process_pool = None
+thread_pool = None
+pools_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessTimeoutPool:
+    global process_pool
+
+    with pools_lock:
+        if process_pool is None or process_pool.pid != os.getpid():  # don't share workers with a forked parent
+            process_pool = ProcessTimeoutPool()
+        return process_pool
+
+
+def get_thread_pool() -> ThreadTimeoutPool:
+    global thread_pool
+
+    with pools_lock:
+        if thread_pool is None:
+            thread_pool = ThreadTimeoutPool()
+        return thread_pool
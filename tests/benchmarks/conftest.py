@@ -0,0 +1,78 @@
+import os, shutil, tempfile
+from pathlib import Path
+
+import pytest
+
+from tests.benchmarks import generators
+
+# Benchmarks are skipped during normal test runs. To time them and store results for comparison across commits:
+#   pytest tests/benchmarks --benchmark-only --benchmark-autosave
+#   pytest tests/benchmarks --benchmark-only --benchmark-compare
+# LB_BENCHMARK_ROWS=1M and LB_BENCHMARK_FILES=100k scale up the generated fixtures (default 10k rows, 10k files)
+
+GENERATOR_VERSION = 1
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("benchmark_only", default=False) or os.environ.get("LB_BENCHMARK"):
+        return
+
+    skip = pytest.mark.skip(reason="use --benchmark-only to run benchmarks")
+    for item in items:
+        if "benchmark" in getattr(item, "fixturenames", ()):
+            item.add_marker(skip)
+
+
+def benchmark_data_dir() -> Path:
+    path = Path(os.environ.get("LB_BENCHMARK_DATA") or Path(tempfile.gettempdir(), "lb-benchmarks"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@pytest.fixture(scope="session")
+def bench_rows():
+    return generators.parse_count(os.environ.get("LB_BENCHMARK_ROWS", "10k"))
+
+
+@pytest.fixture(scope="session")
+def media_db(bench_rows):
+    path = benchmark_data_dir() / f"media-{bench_rows}-v{GENERATOR_VERSION}.db"
+    if not path.exists():
+        tmp_path = path.with_suffix(".tmp")
+        generators.generate_media_db(tmp_path, bench_rows)
+        tmp_path.rename(path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def file_tree():
+    files = generators.parse_count(os.environ.get("LB_BENCHMARK_FILES", "10k"))
+    path = benchmark_data_dir() / f"tree-{files}-v{GENERATOR_VERSION}"
+    if not path.exists():
+        tmp_path = path.with_suffix(".tmp")
+        generators.generate_file_tree(tmp_path, files, depth=int(os.environ.get("LB_BENCHMARK_DEPTH", 4)))
+        tmp_path.rename(path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def subtitle_tracks_video():
+    if not shutil.which("ffmpeg"):
+        pytest.skip("ffmpeg not installed")
+
+    path = benchmark_data_dir() / f"subtitle-tracks-v{GENERATOR_VERSION}.mkv"
+    if not path.exists():
+        tmp_path = path.with_suffix(".tmp")
+        generators.generate_subtitle_tracks_video(tmp_path, tracks=20)
+        tmp_path.rename(path)
+    return str(path)
+
+
+@pytest.fixture
+def run(benchmark):
+    rounds = int(os.environ.get("LB_BENCHMARK_ROUNDS", 3))
+
+    def _run(func, *args, **kwargs):
+        return benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=rounds, iterations=1, warmup_rounds=1)
+
+    return _run
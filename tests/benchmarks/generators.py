@@ -0,0 +1,194 @@
+import os, random, re, subprocess
+from pathlib import Path
+
+from library.mediadb import db_history, db_media, db_playlists
+from library.utils import db_utils
+from library.utils.objects import NoneSpace
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar papa quebec romeo"
+    " sierra tango uniform victor whiskey xray yankee zulu river mountain city night summer winter ocean forest"
+    " desert island storm quiet golden silver broken lost found return rise fall"
+).split()
+VIDEO_EXTENSIONS = ("mkv", "mp4", "webm", "avi")
+AUDIO_EXTENSIONS = ("mp3", "opus", "flac", "m4a")
+OTHER_EXTENSIONS = ("jpg", "png", "txt", "pdf", "epub", "zip")
+
+
+def parse_count(s) -> int:
+    if isinstance(s, int):
+        return s
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([kmb]?)", str(s).strip().lower())
+    if not match:
+        msg = f"Could not parse count: {s!r}"
+        raise ValueError(msg)
+    value, unit = match.groups()
+    return int(float(value) * {"": 1, "k": 1_000, "m": 1_000_000, "b": 1_000_000_000}[unit])
+
+
+def random_title(rng, min_words=1, max_words=5):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def random_relative_path(rng, depth, fanout, ext):
+    parts = [f"{rng.choice(WORDS)}{rng.randrange(fanout)}" for _ in range(rng.randint(1, depth))]
+    return os.path.join(*parts, f"{random_title(rng, 1, 3)} {rng.randrange(1_000_000)}.{ext}")
+
+
+def generate_media(rng, rows, playlists_count=100, root="/mnt/d", depth=6, fanout=8, deleted_ratio=0.05):
+    now = 1_700_000_000
+    for media_id in range(1, rows + 1):
+        kind = rng.random()
+        if kind < 0.6:
+            ext = rng.choice(VIDEO_EXTENSIONS)
+            duration = rng.randint(30, 3 * 60 * 60)
+            media_type = "video/" + ext
+        elif kind < 0.85:
+            ext = rng.choice(AUDIO_EXTENSIONS)
+            duration = rng.randint(30, 20 * 60)
+            media_type = "audio/" + ext
+        else:
+            ext = rng.choice(OTHER_EXTENSIONS)
+            duration = None
+            media_type = "application/octet-stream"
+
+        title = random_title(rng)
+        size = int(rng.lognormvariate(18, 2))
+        time_created = now - rng.randrange(5 * 365 * 24 * 60 * 60)
+        yield {
+            "id": media_id,
+            "playlists_id": rng.randint(1, playlists_count),
+            "time_created": time_created,
+            "time_modified": time_created + rng.randrange(60 * 60 * 24 * 30),
+            "time_deleted": now if rng.random() < deleted_ratio else 0,
+            "time_uploaded": time_created - rng.randrange(60 * 60 * 24 * 365),
+            "time_downloaded": time_created,
+            "size": size,
+            "duration": duration,
+            "path": os.path.join(root, random_relative_path(rng, depth, fanout, ext)),
+            "title": title,
+            "type": media_type,
+            "video_count": 1 if media_type.startswith("video/") else 0,
+            "audio_count": 1 if duration else 0,
+            "subtitle_count": rng.randint(0, 3) if media_type.startswith("video/") else 0,
+            "width": rng.choice((640, 1280, 1920, 3840)) if media_type.startswith("video/") else None,
+            "height": rng.choice((360, 720, 1080, 2160)) if media_type.startswith("video/") else None,
+            "hash": f"{rng.randrange(rows // 4 + 1):016x}" if rng.random() < 0.1 else f"{media_id:032x}",
+        }
+
+
+def generate_playlists(rng, rows, root="/mnt/d"):
+    for playlists_id in range(1, rows + 1):
+        yield {
+            "id": playlists_id,
+            "path": os.path.join(root, f"{rng.choice(WORDS)}{playlists_id}"),
+            "extractor_key": "Local",
+            "title": random_title(rng),
+            "time_created": 1_600_000_000 + playlists_id,
+        }
+
+
+def generate_history(rng, media_rows, rows):
+    for _ in range(rows):
+        yield {
+            "media_id": rng.randint(1, media_rows),
+            "time_played": 1_700_000_000 - rng.randrange(2 * 365 * 24 * 60 * 60),
+            "playhead": rng.randrange(60 * 60),
+            "done": int(rng.random() < 0.7),
+        }
+
+
+def generate_captions(rng, media_rows, rows):
+    for _ in range(rows):
+        yield {
+            "media_id": rng.randint(1, media_rows),
+            "time": rng.randrange(60 * 60),
+            "text": random_title(rng, 3, 12),
+        }
+
+
+def generate_media_db(
+    path, rows=10_000, seed=0, history_ratio=0.5, captions_ratio=2.0, playlists_count=None, optimize=True
+) -> str:
+    rows = parse_count(rows)
+    rng = random.Random(seed)
+    playlists_count = playlists_count or max(rows // 1000, 1)
+
+    Path(path).unlink(missing_ok=True)
+    Path(path).touch()
+    args = NoneSpace(database=str(path), verbose=0, action="fs-add", force=False, fts=True)
+    args.db = db_utils.connect(args)
+
+    db_playlists.create(args)
+    db_media.create(args)
+    db_history.create(args)
+
+    batch_size = 10_000
+    args.db["playlists"].insert_all(generate_playlists(rng, playlists_count), alter=True, batch_size=batch_size)
+    args.db["media"].insert_all(
+        generate_media(rng, rows, playlists_count=playlists_count), alter=True, batch_size=batch_size
+    )
+    args.db["history"].insert_all(
+        generate_history(rng, rows, int(rows * history_ratio)), alter=True, batch_size=batch_size
+    )
+    args.db["captions"].insert_all(
+        generate_captions(rng, rows, int(rows * captions_ratio)), alter=True, batch_size=batch_size
+    )
+
+    if optimize:
+        db_utils.optimize(args)
+    args.db.close()
+    return str(path)
+
+
+def generate_file_tree(base_dir, files=1_000, depth=4, fanout=6, seed=0, file_size=0) -> str:
+    files = parse_count(files)
+    rng = random.Random(seed)
+    base_dir = Path(base_dir)
+    extensions = VIDEO_EXTENSIONS + AUDIO_EXTENSIONS + OTHER_EXTENSIONS
+
+    content = b"\0" * file_size
+    for _ in range(files):
+        p = base_dir / random_relative_path(rng, depth, fanout, rng.choice(extensions))
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(content)
+    return str(base_dir)
+
+
+def generate_subtitle_tracks_video(path, tracks=20, video="tests/data/test.mp4", sub="tests/data/test.eng.vtt") -> str:
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", video]
+    for _ in range(tracks):
+        cmd.extend(["-i", sub])
+    cmd.extend(["-map", "0"])
+    for i in range(tracks):
+        cmd.extend(["-map", str(i + 1)])
+    cmd.extend(["-c", "copy", "-c:s", "srt", "-f", "matroska", str(path)])
+    subprocess.run(cmd, check=True)
+    return str(path)
+
+
+def generate_disks(rng, computers=40, disks=300):
+    GiB = 1024**3
+    result = []
+    for i in range(disks):
+        total = rng.choice([4, 8, 12, 16, 20]) * 1000 * GiB
+        result.append(
+            {
+                "host": f"computer{i % computers}",
+                "mountpoint": f"/mnt/d{i // computers}",
+                "free": int(total * rng.uniform(0.05, 0.9)),
+                "total": total,
+            }
+        )
+    return sorted(result, key=lambda d: d["free"])
+
+
+def generate_torrents(rng, rows, trackers=20):
+    return [
+        {
+            "path": f"/torrents/{i}.torrent",
+            "size": int(rng.lognormvariate(23, 1.5)),
+            "tracker": f"tracker{rng.randrange(trackers)}.example",
+        }
+        for i in range(rows)
+    ]
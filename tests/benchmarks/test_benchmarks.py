@@ -0,0 +1,161 @@
+import random, shutil
+
+import pytest
+
+from library.__main__ import library as lb
+from library.createdb import subtitle
+from library.editdb import dedupe_media
+from library.files import similar_files
+from library.folders import similar_folders
+from library.mediafiles import media_check
+from library.multidb import allocate_torrents
+from library.utils import nums, processes, shell_utils
+from library.utils.objects import NoneSpace
+from tests.benchmarks import generators
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["-p", "-L", "100"],
+        ["-p", "-L", "100", "-u", "size desc"],
+        ["-p", "-L", "100", "-s", "alpha", "bravo"],
+        ["-pa"],
+        ["-p", "--duration=+30", "--size=-1GB", "-L", "inf"],
+    ],
+)
+def test_media_sql(run, capsys, media_db, args):
+    run(lb, ["media", media_db, *args])
+    capsys.readouterr()
+
+
+def test_media_sql_history(run, capsys, media_db):
+    run(lb, ["media", media_db, "-p", "--played-before", "1 day", "-u", "time_last_played desc", "-L", "100"])
+    capsys.readouterr()
+
+
+@pytest.mark.parametrize("args", [["--depth=5"], ["--parents", "--depth=4"], ["--group-by-extensions"]])
+def test_disk_usage(run, capsys, media_db, args):
+    run(lb, ["disk-usage", media_db, "--to-json", *args])
+    capsys.readouterr()
+
+
+def test_rglob(run, file_tree):
+    files, _filtered_files, _filtered_folders = run(shell_utils.rglob, file_tree)
+    assert files
+
+
+def test_rglob_extensions(run, file_tree):
+    run(shell_utils.rglob, file_tree, extensions=["mkv", "mp4"], exclude=["*/alpha*"])
+
+
+def test_dedupe_media(run, monkeypatch, media_db):
+    monkeypatch.setattr("sys.argv", ["dedupe-media", "--filesystem", media_db, "-L", "inf"])
+    args = dedupe_media.parse_args()
+    run(dedupe_media.get_fs_duplicates, args)
+
+
+@pytest.mark.parametrize("limit", ["1000", "5000"])
+def test_cluster_sort(run, capsys, media_db, limit):
+    pytest.importorskip("sklearn")
+    run(lb, ["media", media_db, "-p", "-L", limit, "--cluster-sort", "--tfidf"])
+    capsys.readouterr()
+
+
+@pytest.fixture(scope="session")
+def file_sizes(bench_rows):
+    rng = random.Random(0)
+    return [{"size": int(rng.lognormvariate(18, 2)), "duration": rng.randint(30, 10_000)} for _ in range(bench_rows)]
+
+
+@pytest.mark.parametrize("filters", [{"filter_sizes": True}, {"filter_sizes": True, "filter_durations": True}])
+def test_similar_files_cluster_by_size(run, file_sizes, filters):
+    args = NoneSpace(sizes_delta=10.0, durations_delta=10.0, **filters)
+    run(similar_files.cluster_by_size, args, file_sizes)
+
+
+def test_similar_files_cluster_by_size_linear(run, file_sizes):
+    args = NoneSpace(sizes_delta=10.0, durations_delta=10.0, filter_sizes=True)
+    run(similar_folders.cluster_by_leaders_linear, args, file_sizes[:10_000], similar_files.is_same_size_group)
+
+
+@pytest.fixture(scope="session")
+def tube_urls():
+    rng = random.Random(0)
+    urls = []
+    for i in range(3_000):
+        r = rng.random()
+        if r < 0.5:
+            urls.append(f"https://www.youtube.com/watch?v={rng.randbytes(8).hex()[:10]}A")
+        elif r < 0.7:
+            urls.append(f"https://vimeo.com/{rng.randint(1, 10**8)}")
+        else:
+            urls.append(f"https://example{rng.randint(1, 50)}.com/files/{i}.mp4")
+    return urls
+
+
+def check_supported(is_supported, urls):
+    is_supported.domain_ies.clear()  # measure the first lookup of each domain
+    return [is_supported(url) for url in urls]
+
+
+def test_tube_is_supported(run, tube_urls):
+    pytest.importorskip("yt_dlp")
+    from library.createdb import tube_backend
+
+    tube_backend.is_supported(tube_urls[0])
+    assert any(run(check_supported, tube_backend.is_supported, tube_urls))
+
+
+def test_gallery_is_supported(run, tube_urls):
+    pytest.importorskip("gallery_dl")
+    from library.createdb import gallery_backend
+
+    gallery_backend.load_module_level_gallery_dl(NoneSpace(download_archive=None))
+    run(check_supported, gallery_backend.is_supported, tube_urls)
+
+
+@pytest.mark.parametrize("path", ["tests/data/test.mp4", "tests/data/corrupt.mp4"])
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_media_check_quick_scan(run, path, batch_size):
+    if not shutil.which("ffmpeg"):
+        pytest.skip("ffmpeg not installed")
+    run(media_check.decode_quick_scan, path, nums.calculate_segments(12, 0.5, gap=0.05), 0.5, batch_size=batch_size)
+
+
+def read_subtitles_per_stream(path, streams):
+    captions = []
+    for subtitle_path in subtitle.externalize_internal_subtitles(path, streams):
+        captions.extend(subtitle.read_sub(subtitle_path))
+    return captions
+
+
+@pytest.mark.parametrize("one_pass", [True, False])
+def test_read_internal_subtitles(run, subtitle_tracks_video, one_pass):
+    streams = processes.FFProbe(subtitle_tracks_video).streams
+    if one_pass:
+        run(subtitle.read_internal_subtitles, subtitle_tracks_video, streams)
+    else:
+        run(read_subtitles_per_stream, subtitle_tracks_video, streams)
+
+
+@pytest.fixture(scope="session")
+def torrent_fleet(bench_rows):
+    rng = random.Random(0)
+    disks = generators.generate_disks(rng, computers=40, disks=300)
+    return disks, generators.generate_torrents(rng, min(bench_rows, 20_000))
+
+
+@pytest.mark.parametrize("method", ["allocate_greedy", "allocate_balanced"])
+def test_allocate_torrents(run, benchmark, torrent_fleet, method):
+    disks, torrents = torrent_fleet
+    args = NoneSpace(min_free_space=nums.human_to_bytes("50GiB"), max_per_tracker=100)
+
+    def allocate():
+        allocation = allocate_torrents.Allocation(args, disks)
+        getattr(allocation, method)(torrents)
+        return allocate_torrents.allocation_stats(allocation.disks)
+
+    benchmark.extra_info.update(run(allocate))  # max_fill and fill_stddev are saved with --benchmark-autosave
@@ -0,0 +1,40 @@
+import threading, time
+
+from library.createdb import playlist_update
+from library.utils import db_utils
+from library.utils.download_scheduler import db_call
+from library.utils.objects import NoneSpace
+
+
+def test_update_playlists_per_extractor(capsys):
+    args = NoneSpace(
+        db=db_utils.connect(NoneSpace(verbose=0), memory=True), update_workers=4, per_extractor=1, extractor_delay=0
+    )
+    args.db["media"].insert({"path": "seed"})
+    playlists = [{"path": f"https://{key}.com/{i}", "extractor_key": key} for key in ["a", "b"] for i in range(4)]
+    playlists.append({"path": "https://c.com/0", "extractor_key": None})
+
+    lock = threading.Lock()
+    active = {}
+    max_active = {}
+
+    def func(d):
+        key = playlist_update.extractor_key(d)
+        with lock:
+            active[key] = active.get(key, 0) + 1
+            max_active[key] = max(max_active.get(key, 0), active[key])
+        time.sleep(0.01)
+        db_call(args, lambda: args.db["media"].insert({"path": d["path"]}))
+        with lock:
+            active[key] -= 1
+        return None if d["path"].endswith("/3") else 1
+
+    playlist_update.update_playlists(args, playlists, func)
+
+    assert max_active == {"a": 1, "b": 1, "c.com": 1}
+    assert args.db.execute("select count(*) from media").fetchone()[0] == 1 + len(playlists)
+    assert args.download_scheduler is None
+
+    out = capsys.readouterr().out
+    assert "c.com" in out
+    assert "playlists_per_minute" in out
@@ -0,0 +1,61 @@
+import os, stat, sys
+
+import pytest
+
+from library.createdb import subtitle
+
+FAKE_FFMPEG = """#!{python}
+import os, sys
+
+args = sys.argv[1:]
+if "fail" in args[args.index("-i") + 1]:
+    sys.exit(1)
+for i, arg in enumerate(args):
+    if arg.startswith("pipe:"):
+        stream = args[i - 3].split(":")[1]
+        with os.fdopen(int(arg.split(":")[1]), "w") as f:
+            f.write(f"1\\n00:00:0{{stream}},000 --> 00:00:09,000\\nstream {{stream}}\\n\\n")
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+
+
+@pytest.mark.skipif(os.name != "posix", reason="pass_fds")
+def test_extract_all_from_video(fake_ffmpeg):
+    srt_texts = subtitle.extract_all_from_video("video.mkv", [2, 3, 5])
+    assert list(srt_texts) == [2, 3, 5]
+    assert "stream 5" in srt_texts[5]
+
+    assert subtitle.extract_all_from_video("fail.mkv", [2]) is None
+
+
+@pytest.mark.skipif(os.name != "posix", reason="pass_fds")
+def test_read_internal_subtitles(fake_ffmpeg):
+    streams = [
+        {"index": 0, "codec_type": "video"},
+        {"index": 2, "codec_type": "subtitle", "codec_name": "subrip"},
+        {"index": 3, "codec_type": "subtitle", "codec_name": "hdmv_pgs_subtitle"},
+        {"index": 4, "codec_type": "subtitle", "codec_name": "ass"},
+    ]
+    assert subtitle.read_internal_subtitles("video.mkv", streams) == [
+        {"time": 2, "text": "stream 2"},
+        {"time": 4, "text": "stream 4"},
+    ]
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="counts open fds")
+def test_extract_all_from_video_closes_pipes_when_ffmpeg_fails_to_start(monkeypatch):
+    def popen(*_args, **_kwargs):
+        raise FileNotFoundError("ffmpeg")
+
+    monkeypatch.setattr(subtitle.subprocess, "Popen", popen)
+    open_fds = len(os.listdir("/proc/self/fd"))
+    with pytest.raises(FileNotFoundError):
+        subtitle.extract_all_from_video("video.mkv", [2, 3])
+    assert len(os.listdir("/proc/self/fd")) == open_fds
@@ -88,6 +88,23 @@ def test_safe_mode():
     assert tube_backend.is_supported("www.com") is False
 
 
+def test_is_supported_domain_cache():
+    url = "https://www.youtube.com/watch?v=l9-w69bPApk"
+    assert tube_backend.is_supported(url)
+    assert tube_backend.is_supported.domain_ies["www.youtube.com"].suitable(url)
+
+    assert tube_backend.is_supported("https://youtu.be/HoY5RbzRcmo")
+    assert tube_backend.is_supported("https://www.youtube.com/") == any(
+        ie.suitable("https://www.youtube.com/") for ie in tube_backend.is_supported.yt_ies
+    )
+
+
+def test_get_ydl_reused_per_thread():
+    opts = {"quiet": True, "skip_download": True}
+    assert tube_backend.get_ydl(opts) is tube_backend.get_ydl(dict(opts))
+    assert tube_backend.get_ydl(opts) is not tube_backend.get_ydl({**opts, "noplaylist": True})
+
+
 @pytest.mark.skip("network")
 def test_get_video_metadata():
     args = SimpleNamespace(verbose=0, ignore_errors=False)
@@ -1,3 +1,5 @@
+import functools, http.server, threading
+
 import pytest
 
 from library.__main__ import library as lb
@@ -13,3 +15,30 @@ def test_web_add(temp_db):
     media = list(args.db.query("SELECT * FROM media"))
 
     assert len(media) >= 4
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def open_dir(tmp_path):
+    for p in ["a/1.mp4", "a/b/2.mkv", "a/b/3.txt", "c/4.mp3", "5.jpg"]:
+        (tmp_path / p).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / p).write_text("x")
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=tmp_path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("threads", ["1", "4"])
+def test_web_add_spider(temp_db, open_dir, threads):
+    db1 = temp_db()
+    lb(["web-add", db1, open_dir, "--threads", threads])
+
+    args = connect_db_args(db1)
+    paths = sorted(d["path"].removeprefix(open_dir) for d in args.db.query("SELECT path FROM media"))
+    assert paths == ["5.jpg", "a/1.mp4", "a/b/2.mkv", "a/b/3.txt", "c/4.mp3"]
@@ -1,9 +1,11 @@
-import os
+import os, threading
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
 from library.__main__ import library as lb
+from library.folders import merge_mv
 from library.utils import arggroups, consts, devices, objects, path_utils
 from tests.conftest import read_relative_file_tree_dict
 
@@ -443,3 +445,38 @@ def test_filter_time_combined(temp_file_tree):
     assert not (Path(src1) / "just_right.txt").exists()
     assert (Path(src1) / "too_new.txt").exists()
     assert (Path(dest) / "just_right.txt").exists()
+
+
+def test_transfer_lanes():
+    args = objects.NoneSpace(threads=4, per_device=1, simulate=False)
+    started = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def transfer(args, src, dest):
+        calls.append((src, dest))
+        if src.startswith("/a"):
+            started.wait()  # both lanes are running at the same time
+
+    lanes = merge_mv.TransferLanes(args, transfer)
+    with patch.object(lanes, "lane_key", side_effect=lambda src, dest: (src[:2], dest[:2])):
+        lanes.submit("/a/1", "/x/1")
+        lanes.submit("/b/1", "/y/1")
+        lanes.submit("/a/2", "/y/2")
+        lanes.wait_for("/y")
+        lanes.close()
+    lanes.raise_errors()
+    assert sorted(calls) == [("/a/1", "/x/1"), ("/a/2", "/y/2"), ("/b/1", "/y/1")]
+
+
+def test_transfer_lanes_errors():
+    args = objects.NoneSpace(threads=1, simulate=False)
+
+    def transfer(args, src, dest):
+        raise OSError(28, "No space left on device")
+
+    lanes = merge_mv.TransferLanes(args, transfer)
+    with patch.object(lanes, "lane_key", return_value=(1, 2)):
+        lanes.submit("/a/1", "/x/1")
+        lanes.close()
+    with pytest.raises(OSError, match="No space"):
+        lanes.raise_errors()
@@ -1,4 +1,5 @@
 from library.folders import scatter
+from library.utils.objects import NoneSpace
 from tests import utils
 
 
@@ -51,3 +52,33 @@ def test_get_rel_stats_free_weight():
     ]
     stats = scatter.get_rel_stats(parents, files)
     assert stats[0]["free"] != stats[0]["used"]
+
+
+def test_rebin_files_optimal():
+    args = NoneSpace(group="size", relative_paths=["/mnt/d1", "/mnt/d2"], targets=["/mnt/d1", "/mnt/d2"])
+    disk_stats = [
+        {"mount": "/mnt/d1", "total": 100, "used": 90, "free": 10},
+        {"mount": "/mnt/d2", "total": 100, "used": 10, "free": 90},
+    ]
+    files = [
+        {"path": "/mnt/d1/a", "size": 50},
+        {"path": "/mnt/d1/b", "size": 30},
+        {"path": "/mnt/d1/c", "size": 10},
+        {"path": "/mnt/d2/d", "size": 10},
+    ]
+    untouched, rebinned = scatter.rebin_files_optimal(args, disk_stats, files)
+    assert [(d["from_path"], d["path"]) for d in rebinned] == [("/mnt/d1/b", "/mnt/d2/b"), ("/mnt/d1/c", "/mnt/d2/c")]
+    assert sorted(d["path"] for d in untouched) == ["/mnt/d1/a", "/mnt/d2/d"]
+
+
+def test_rebin_files_optimal_without_targets():
+    args = NoneSpace(group="size", relative_paths=["/mnt/d1", "/mnt/d2"], targets=["/mnt/d1", "/mnt/d2"])
+    files = [
+        {"path": "/mnt/d1/a", "size": 50},
+        {"path": "/mnt/d1/b", "size": 30},
+        {"path": "/mnt/d1/c", "size": 10},
+        {"path": "/mnt/d2/d", "size": 10},
+    ]
+    disk_stats = scatter.get_rel_stats(args.targets, files)
+    untouched, rebinned = scatter.rebin_files_optimal(args, disk_stats, files, equal_shares=True)
+    assert [(d["from_path"], d["path"]) for d in rebinned] == [("/mnt/d1/b", "/mnt/d2/b"), ("/mnt/d1/c", "/mnt/d2/c")]
@@ -50,3 +50,43 @@ def test_cluster_by_size():
         {"duration": 108, "size": 108},
     ]
     assert similar_files.cluster_by_size(args, media) == [0, 1, 0, 2, 0, 2]
+
+
+def test_cluster_by_leaders_matches_linear():
+    import random
+
+    rng = random.Random(0)
+    folders = [
+        {
+            "exists": rng.randint(0, 40),
+            "size": rng.choice([0, None, rng.randint(1, 5000)]),
+            "median_size": rng.randint(0, 500),
+            "duration": rng.choice([None, 0, rng.randint(1, 300)]),
+            "median_duration": rng.randint(0, 30),
+        }
+        for _ in range(500)
+    ]
+    for delta in [0.5, 5, 50, 150, 250]:
+        for filters in [
+            {"filter_sizes": True},
+            {"filter_counts": True},
+            {"filter_durations": True},
+            {"filter_sizes": True, "filter_durations": True},
+            {"filter_counts": True, "filter_sizes": True, "filter_durations": True},
+        ]:
+            for totals in [True, False]:
+                a = NoneSpace(
+                    sizes_delta=delta,
+                    counts_delta=delta,
+                    durations_delta=delta,
+                    total_sizes=totals,
+                    total_durations=totals,
+                    **filters,
+                )
+                assert similar_folders.cluster_by_numbers(a, folders) == similar_folders.cluster_by_leaders_linear(
+                    a, folders, similar_folders.is_same_group
+                )
+                if "filter_counts" not in filters:
+                    assert similar_files.cluster_by_size(a, folders) == similar_folders.cluster_by_leaders_linear(
+                        a, folders, similar_files.is_same_size_group
+                    )
@@ -0,0 +1,34 @@
+from library.mediadb import db_media
+from library.utils import consts, db_utils
+from library.utils.objects import NoneSpace
+
+
+def test_exists_many(monkeypatch):
+    args = NoneSpace(db=db_utils.connect(NoneSpace(verbose=0), memory=True))
+    db_media.create(args)
+    args.db["media"].insert_all(
+        [
+            {"path": "/local/a.mp4", "webpath": "https://example.com/a.mp4", "time_deleted": 0},
+            {"path": "https://example.com/b.mp4", "time_deleted": 0},
+        ],
+        alter=True,
+    )
+
+    monkeypatch.setattr(consts, "SQLITE_PARAM_LIMIT", 2)
+    paths = ["https://example.com/a.mp4", "https://example.com/b.mp4", "https://example.com/c.mp4", "/local/a.mp4"]
+    known = db_media.exists_many(args, paths)
+    assert known == {"https://example.com/a.mp4", "https://example.com/b.mp4", "/local/a.mp4"}
+    assert db_media.exists_many(args, []) == set()
+    assert all(db_media.exists(args, p) == (p in known) for p in paths)
+
+
+def test_update_types():
+    args = NoneSpace(db=db_utils.connect(NoneSpace(verbose=0), memory=True))
+    db_media.create(args)
+    args.db["media"].insert_all([{"path": "/a.mp4", "type": None}, {"path": "/b"}], alter=True)
+
+    db_media.update_types(args, [{"path": "/a.mp4", "type": "video/mp4"}, {"path": "/b", "type": None}])
+    assert {d["path"]: d["type"] for d in args.db.query("select path, type from media")} == {
+        "/a.mp4": "video/mp4",
+        "/b": None,
+    }
@@ -2,7 +2,10 @@ import pytest
 
 from library.__main__ import library as lb
 from library.createdb.tube_add import tube_add
-from library.utils import consts
+from library.mediadb import db_media, download
+from library.utils import consts, db_utils
+from library.utils.download_scheduler import DownloadScheduler
+from library.utils.objects import NoneSpace
 from tests.utils import connect_db_args
 
 URL = "https://www.youtube.com/watch?v=5DqJwmzG6Fk"
@@ -31,3 +34,31 @@ def test_yt():
 
     captions = list(args.db.query("select * from captions"))
     assert {"media_id": 1, "text": "welcome to the Microsoft Windows 95", "time": 3} in captions
+
+
+def test_download_rechecks_state_before_each_download(monkeypatch):
+    args = NoneSpace(
+        db=db_utils.connect(NoneSpace(verbose=0), memory=True), blocklist_rules=[], download_retries=3, force=False
+    )
+    db_media.create(args)
+    media = [{"path": f"https://{domain}/0", "time_modified": 0, "time_deleted": 0} for domain in ("a.com", "b.com")]
+    args.db["media"].insert_all(media, alter=True)
+    m_columns = db_utils.columns(args, "media")
+
+    downloaded = []
+
+    def download_media(args, m, _get_inner_urls):
+        downloaded.append(m["path"])
+        # another process starts on the queued item after the prefilter already passed it
+        with args.db.conn:
+            args.db.conn.execute(
+                "UPDATE media SET time_modified = ? WHERE path = ?", [consts.now() + 1, "https://b.com/0"]
+            )
+
+    monkeypatch.setattr(download, "download_media", download_media)
+    args.download_scheduler = DownloadScheduler(lookahead=10)
+    args.download_scheduler.run(
+        download.gen_media_to_download(args, m_columns, media),
+        lambda m: download.download_unattempted(args, m_columns, m, None),
+    )
+    assert downloaded == ["https://a.com/0"]
@@ -19,3 +19,23 @@ def test_decode_quick_scan():
     assert media_check.decode_quick_scan("tests/data/corrupt.mp4", nums.calculate_segments(12, 1), 1) == 1.0
     assert media_check.decode_quick_scan("tests/data/corrupt.mp4", nums.calculate_segments(12, 2), 1) == 1.0
     assert media_check.decode_quick_scan("tests/data/corrupt.mp4", nums.calculate_segments(12, 3), 1) == 1.0
+
+
+@pytest.mark.parametrize(
+    ("corrupt", "expected_calls"),
+    [
+        (set(), 3),
+        ({5}, 3 + 2 + 2 + 2),  # bisect the failing batch of 8
+        ({5, 19}, 3 + 8 + 4),  # 2 of 3 batches failed: rescan those one at a time
+        (set(range(20)), 3 + 20),  # every batch failed: rescan one at a time
+    ],
+)
+def test_count_failed_scans(corrupt, expected_calls):
+    calls = []
+
+    def decode(batch):
+        calls.append(batch)
+        return not any(scan in corrupt for scan in batch)
+
+    assert media_check.count_failed_scans(decode, list(range(20)), batch_size=8) == len(corrupt)
+    assert len(calls) == expected_calls
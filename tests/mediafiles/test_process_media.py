@@ -1,7 +1,13 @@
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
 import pytest
 
 from library.__main__ import library as lb
+from library.mediafiles import process_media
 from library.utils import devices
+from tests.utils import connect_db_args
 
 
 def test_shrink(temp_db, capsys):
@@ -13,3 +19,47 @@ def test_shrink(temp_db, capsys):
     captured = capsys.readouterr().out
     assert "Video: mp4" in captured.replace("\n", "")
     assert len(captured) > 150
+
+
+def test_shrink_resume(temp_db, tmp_path, monkeypatch):
+    db1 = temp_db()
+    paths = []
+    for name in ["a", "b"]:
+        p = tmp_path / f"{name}.mp4"
+        p.write_bytes(b"0" * 100)
+        paths.append(p)
+        lb(["row-add", db1, "--path", str(p), "--duration", "600", "--size", "200000000", "--video-count", "1"])
+
+    monkeypatch.setattr(process_media, "which", lambda s: s)
+
+    def interrupted(args, path):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(process_media.process_ffmpeg, "process_path", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        lb(["shrink", db1, "--no-confirm", "--workers", "1"])
+
+    args = connect_db_args(db1)
+    jobs = {d["path"]: d for d in args.db.query("select * from process_jobs")}
+    assert len(jobs) == 2
+    assert sorted(d["state"] for d in jobs.values()) == ["queued", "running"]
+
+    def transcoded(args, path):
+        new_path = Path(path).with_suffix(".mkv")
+        new_path.write_bytes(b"0" * 10)
+        Path(path).unlink()
+        return new_path
+
+    check_shrink = mock.Mock(wraps=process_media.check_shrink)
+    monkeypatch.setattr(process_media, "check_shrink", check_shrink)
+    monkeypatch.setattr(process_media.process_ffmpeg, "process_path", transcoded)
+    monkeypatch.setattr(process_media.processes, "FFProbe", lambda path: SimpleNamespace(duration=600))
+    lb(["shrink", db1, "--no-confirm", "--workers", "2"])
+
+    assert check_shrink.call_count == 0  # estimates were loaded from the queue
+    jobs = {d["path"]: d for d in args.db.query("select * from process_jobs")}
+    assert {d["state"] for d in jobs.values()} == {"done"}
+    assert max(d["attempts"] for d in jobs.values()) == 2
+    assert sorted(d["path"] for d in args.db.query("select path from media")) == [
+        str(p.with_suffix(".mkv")) for p in paths
+    ]
@@ -1 +1,55 @@
-# this page is intentionally left blank
+from library.multidb import allocate_torrents
+from library.utils.objects import NoneSpace
+
+
+def make_disks(count, free=1000, total=1000, computers=1):
+    return [
+        {"host": f"pc{i % computers}", "mountpoint": f"/mnt/d{i}", "free": free, "total": total} for i in range(count)
+    ]
+
+
+def make_torrents(sizes, tracker="tracker.example"):
+    return [{"path": f"/{i}.torrent", "size": size, "tracker": tracker} for i, size in enumerate(sizes)]
+
+
+def allocate(args, disks, torrents, method="allocate_balanced"):
+    allocation = allocate_torrents.Allocation(args, disks)
+    getattr(allocation, method)(torrents)
+    return allocation.disks
+
+
+def test_allocate_balanced_spreads_torrents():
+    args = NoneSpace(min_free_space=0)
+    torrents = make_torrents([100] * 8)
+
+    greedy = allocate(args, make_disks(4), torrents, "allocate_greedy")
+    assert [len(d["downloads"]) for d in greedy] == [8, 0, 0, 0]
+
+    disks = allocate(args, make_disks(4), torrents)
+    assert [len(d["downloads"]) for d in disks] == [2, 2, 2, 2]
+
+    greedy_stats = allocate_torrents.allocation_stats(greedy)
+    stats = allocate_torrents.allocation_stats(disks)
+    assert stats["allocated_size"] == greedy_stats["allocated_size"] == 800
+    assert stats["max_fill"] == 0.2
+    assert stats["fill_stddev"] == 0
+    assert greedy_stats["max_fill"] == 0.8
+
+
+def test_allocate_balanced_rebalances():
+    disks = allocate(NoneSpace(min_free_space=0), make_disks(2), make_torrents([300, 300, 600]))
+    assert sorted(d["download_size"] for d in disks) == [600, 600]
+
+
+def test_allocate_limits():
+    args = NoneSpace(min_free_space=500)
+    disks = allocate(args, make_disks(1), make_torrents([400, 200, 50]))
+    assert sorted(t["size"] for d in disks for t in d["downloads"]) == [50, 400]
+
+    args = NoneSpace(min_free_space=0, max_per_computer=3)
+    disks = allocate(args, make_disks(4, computers=2), make_torrents([10] * 10))
+    assert allocate_torrents.allocation_stats(disks)["allocated_count"] == 6
+
+    args = NoneSpace(min_free_space=0, max_per_tracker=1)
+    disks = allocate(args, make_disks(3), make_torrents([10] * 2, "a") + make_torrents([10] * 5, "b"))
+    assert [sorted(t["tracker"] for t in d["downloads"]) for d in disks] == [["a", "b"], ["a", "b"], ["b"]]
@@ -1,4 +1,4 @@
-import tempfile, unittest
+import tempfile, threading, unittest
 from pathlib import Path
 from types import SimpleNamespace
 from unittest import mock
@@ -79,6 +79,58 @@ def test_prefetch(media):
     assert prep.remaining == 0
 
 
+def test_prefetch_background(media):
+    args = NoneSpace(prefetch=2, database=":memory:", prefix="", action=consts.SC.watch, readahead=1024)
+    prep = MediaPrefetcher(args, media)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_prep(m):
+        started.set()
+        release.wait(5)
+        return m
+
+    with (
+        mock.patch.object(prep, "prep_media", side_effect=slow_prep),
+        mock.patch("library.playback.media_player.file_utils.read_ahead") as mock_read_ahead,
+    ):
+        prep.fetch()  # does not wait for prep_media
+        assert started.wait(5)
+        assert len(prep.futures) == 2
+        release.set()
+
+        assert prep.get_m()["path"] == "tests/data/test.mp4"
+        prep.close()
+    assert [c.args for c in mock_read_ahead.call_args_list[:2]] == [
+        ("tests/data/test.mp4", 1024),
+        ("tests/data/test.opus", 1024),
+    ]
+
+
+def test_prefetch_reuses_connection(media):
+    args = NoneSpace(
+        prefetch=2,
+        database=":memory:",
+        prefix="",
+        transcode=False,
+        transcode_audio=False,
+        folders=False,
+        action=consts.SC.watch,
+        verbose=2,
+        fullscreen=None,
+        delete_unplayable=False,
+    )
+    prep = MediaPrefetcher(args, media)
+    with mock.patch("library.playback.media_player.db_utils.connect", wraps=media_player.db_utils.connect) as connect:
+        prep.fetch()
+        while prep.remaining:
+            prep.get_m()
+        prep.close()
+        prep.executor.shutdown(wait=True)
+    assert connect.call_count == 1
+    assert prep.args.db is None
+
+
 def test_wt_help(capsys):
     wt_help_text = ["usage:", "where", "sort", "--duration"]
 
@@ -1,4 +1,9 @@
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+import pytest
 
 from library.playback import torrents_info
 
@@ -22,3 +27,101 @@ def test_avg_sizes_treats_zero_file_torrent_as_zero(monkeypatch):
 
     assert torrents_info.filter_torrents_by_criteria(args, [torrent]) == [torrent]
     assert average_sizes == [0]
+
+
+class FakeWebAPI(BaseHTTPRequestHandler):
+    torrent = {"state": "uploading", "downloaded_session": 0, "uploaded_session": 0, "time_active": 0, "seeding_time": 0}
+    torrents = [
+        {**torrent, "hash": "a" * 40, "name": "one", "tracker": ""},
+        {**torrent, "hash": "b" * 40, "name": "two", "tracker": ""},
+        {**torrent, "hash": "c" * 40, "name": "three", "tracker": "https://tracker.example.org/announce"},
+    ]
+    trackers = {
+        "https://tracker.example.org/announce": ["a" * 40, "b" * 40, "c" * 40],
+        "http://backup.example.net/announce": ["b" * 40],
+        "udp://tracker.example.com:1337": ["a" * 40],
+    }
+    files = {
+        "a" * 40: [{"index": 0, "name": "one/1.mkv", "size": 1}],
+        "b" * 40: [{"index": 0, "name": "two/1.mkv", "size": 2}, {"index": 1, "name": "two/2.mkv", "size": 3}],
+        "c" * 40: [],
+    }
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        endpoint = self.path.split("?")[0].removeprefix("/api/v2/")
+        self.server.requests.append(endpoint)
+
+        if endpoint == "torrents/info":
+            body = self.torrents
+        elif endpoint == "sync/maindata":
+            body = {"rid": 1, "full_update": True, "torrents": {}}
+            if self.trackers is not None:
+                body["trackers"] = self.trackers
+        elif endpoint == "torrents/files":
+            body = self.files[form["hash"][0]]
+        elif endpoint == "torrents/trackers":
+            body = [{"url": "** [DHT] **"}, {"url": "http://tracker.example.com/announce"}]
+        else:
+            body = "Ok."
+
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain" if isinstance(body, str) else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST
+
+
+@pytest.fixture
+def qbt_client():
+    import qbittorrentapi
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWebAPI)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = qbittorrentapi.Client(host="127.0.0.1", port=server.server_address[1])
+        client.requests = server.requests
+        yield client
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_snapshot_batches_tracker_and_file_requests(qbt_client):
+    torrents = qbt_client.torrents_info()
+    torrents_info.qbt_enhance_torrents(qbt_client, torrents)
+    one, two, three = torrents
+
+    assert [t.tracker_domain() for t in torrents] == ["example.org", "example.org", "example.org"]
+    assert [t.tracker_count() for t in torrents] == [1, 2, 1]
+    assert qbt_client.requests.count("sync/maindata") == 1
+    assert "torrents/trackers" not in qbt_client.requests
+
+    torrents_info.prefetch_torrent_files(torrents)
+    assert qbt_client.requests.count("torrents/files") == 3
+    assert [f.name for f in torrents_info.torrent_files(two)] == ["two/1.mkv", "two/2.mkv"]
+    assert torrents_info.torrent_files(three) == []
+    torrents_info.prefetch_torrent_files(torrents)
+    assert qbt_client.requests.count("torrents/files") == 3
+
+    one.snapshot.max_age = 0
+    assert [f.size for f in torrents_info.torrent_files(one)] == [1]
+    assert qbt_client.requests.count("torrents/files") == 4
+
+
+def test_snapshot_falls_back_to_per_torrent_trackers(qbt_client, monkeypatch):
+    monkeypatch.setattr(FakeWebAPI, "trackers", None)  # WebAPI before sync/maindata included trackers
+    torrents = qbt_client.torrents_info()
+    torrents_info.qbt_enhance_torrents(qbt_client, torrents)
+
+    assert [t.tracker_count() for t in torrents] == [1, 1, 1]
+    assert torrents[0].snapshot.trackers(torrents[0].hash) == ["http://tracker.example.com/announce"]
+    assert qbt_client.requests.count("torrents/trackers") == 3
@@ -59,3 +59,16 @@ def test_eda_end_row_checks_row_count(capsys):
     lb(["eda", "--end-row", "4", "tests/data/test.xml"])
 
     assert "(limited by --end-row 4)" not in capsys.readouterr().out
+
+
+def test_eda_streaming(tmp_path, capsys):
+    f = tmp_path / "test.csv"
+    f.write_text("num,cat\n" + "".join(f"{i},{'ab'[i % 2] if i % 5 else ''}\n" for i in range(100)))
+
+    lb(["eda", "--streaming", str(f)])
+    captured = capsys.readouterr().out
+    assert "(100, 2)" in captured
+    assert "| sum   | 4950" in captured
+    assert "Quartiles are approximate" in captured
+    assert "#### common values of cat column" in captured
+    assert "20 nulls/NaNs (10.0% dataset values missing)" in captured
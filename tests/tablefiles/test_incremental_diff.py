@@ -25,3 +25,30 @@ def test_lb_incremental_diff(args, stdout, capsys):
     lb(["incremental-diff", *args])
     captured = capsys.readouterr().out
     assert all(l in captured for l in stdout)
+
+
+def table_rows(stdout):
+    lines = [l.split("|") for l in stdout.splitlines()]
+    return [[s.strip() for s in l[2:-1]] for l in lines if len(l) > 2 and l[1].strip().isdigit()]
+
+
+def test_incremental_diff_matches_rows_across_batches(tmp_path, capsys):
+    path1 = tmp_path / "1.csv"
+    path2 = tmp_path / "2.csv"
+    path1.write_text("id,name,score\n1,a,10\n2,b,20\n3,c,30\n4,d,40\n5,e,50\n")
+    path2.write_text("id,name,score\n5,e,50\n4,d,41\n2,b,20\n1,a,10\n6,f,60\n")
+
+    lb(["incremental-diff", "--batch-size=2", "--join-keys", "id", str(path1), str(path2)])
+    assert table_rows(capsys.readouterr().out) == [
+        ["3", "c", "30", "left_only"],
+        ["6", "f", "60", "right_only"],
+        ["4", "d", "40", "41", "changed"],
+    ]
+
+    lb(["incremental-diff", "--batch-size=2", str(path1), str(path2)])
+    assert [row[-1] for row in table_rows(capsys.readouterr().out)] == [
+        "left_only",
+        "left_only",
+        "right_only",
+        "right_only",
+    ]
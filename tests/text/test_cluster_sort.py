@@ -1,5 +1,7 @@
 import json
 
+import pytest
+
 from library.__main__ import library as lb
 from library.text import cluster_sort
 from library.utils.objects import NoneSpace
@@ -99,7 +101,7 @@ def test_image_groups_use_neighbor_identities():
 
 
 def test_sort_dicts_reverses_duration_groups(monkeypatch):
-    monkeypatch.setattr(cluster_sort, "find_clusters", lambda _args, _sentences: [0, 0, 1])
+    monkeypatch.setattr(cluster_sort, "find_clusters", lambda _args, _sentences, **_kwargs: [0, 0, 1])
     args = NoneSpace(verbose=0, sort_groups_by="duration desc")
     media = [
         {"path": "first", "duration": 10},
@@ -108,3 +110,61 @@ def test_sort_dicts_reverses_duration_groups(monkeypatch):
     ]
 
     assert [m["path"] for m in cluster_sort.sort_dicts(args, media)] == ["second", "first", "third"]
+
+
+def test_fit_kmeans_minibatch(monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(cluster_sort.consts, "MINIBATCH_KMEANS_THRESHOLD", 10)
+    monkeypatch.setattr(cluster_sort.consts, "MINIBATCH_KMEANS_BATCH_SIZE", 8)
+    X = np.vstack([np.zeros((20, 2)), np.ones((20, 2)) * 10])
+
+    clusterizer = cluster_sort.fit_kmeans(X, 2)
+
+    assert len(clusterizer.labels_) == 40
+    assert len(set(clusterizer.labels_[:20])) == 1
+    assert len(set(clusterizer.labels_[20:])) == 1
+    assert clusterizer.labels_[0] != clusterizer.labels_[-1]
+
+
+def test_cached_embeddings_only_embeds_new_text():
+    from library.mediadb import db_embeddings
+    from library.utils import db_utils
+
+    args = NoneSpace(db=db_utils.connect(NoneSpace(verbose=0), memory=True))
+    embedded = []
+
+    def embed(strings):
+        embedded.extend(strings)
+        return [[len(s), 1.0] for s in strings]
+
+    X = db_embeddings.cached_embeddings(args, "test", embed, ["a", "b"], ["red apple", "green"])
+    assert X.tolist() == [[9.0, 1.0], [5.0, 1.0]]
+    assert embedded == ["red apple", "green"]
+
+    embedded.clear()
+    X = db_embeddings.cached_embeddings(args, "test", embed, ["a", "b", "c"], ["red apple", "greener", "blue"])
+    assert X.tolist() == [[9.0, 1.0], [7.0, 1.0], [4.0, 1.0]]
+    assert embedded == ["greener", "blue"]
+
+
+def test_embeddings_cache_clusters_like_wordllama():
+    pytest.importorskip("wordllama")
+    from library.utils import db_utils
+
+    lines = ["red apple", "broccoli", "yellow", "green", "orange apple", "red apple", "green apple", "blue"]
+    paths = [f"/{i}.txt" for i in range(len(lines))]
+
+    def partition(args):
+        groups = cluster_sort.map_cluster_to_paths(paths, cluster_sort.find_clusters(args, lines, keys=paths))
+        return sorted(sorted(group) for group in groups.values())
+
+    args = NoneSpace(
+        verbose=0,
+        tfidf=False,
+        wordllama={"config": "l3_supercat", "dim": 64},
+        db=db_utils.connect(NoneSpace(verbose=0), memory=True),
+    )
+    uncached = partition(NoneSpace(**vars(args), embeddings_cache=False))
+    assert partition(NoneSpace(**vars(args), embeddings_cache=True)) == uncached
+    assert partition(NoneSpace(**vars(args), embeddings_cache=True)) == uncached  # read back from the database
@@ -0,0 +1,57 @@
+import shutil, threading
+
+import pytest
+
+from library.utils import disk_admission
+from library.utils.objects import NoneSpace
+
+
+def test_reserve_disabled(tmp_path):
+    with disk_admission.reserve(NoneSpace(), 10**18, [tmp_path]) as destination:
+        assert destination == str(tmp_path)
+
+
+def test_reserve_tracks_reservations(tmp_path):
+    args = NoneSpace(min_free_space=0, free_space_wait=0.01)
+    device, available = disk_admission.device_available(tmp_path)
+    with disk_admission.reserve(args, 1000, [tmp_path / "new" / "folder"]) as destination:
+        assert destination == str(tmp_path / "new" / "folder")
+        assert disk_admission.reserved[device] == 1000
+    assert disk_admission.reserved[device] == 0
+
+
+def test_reserve_waits_for_space(tmp_path):
+    free = shutil.disk_usage(tmp_path).free
+    args = NoneSpace(min_free_space=free // 2, free_space_wait=0.01)
+
+    with disk_admission.reserve(args, free // 3, [tmp_path]):
+        started = threading.Event()
+
+        def second_job():
+            with disk_admission.reserve(args, free // 3, [tmp_path]):
+                started.set()
+
+        t = threading.Thread(target=second_job)
+        t.start()
+        assert not started.wait(0.1)
+    t.join(timeout=5)
+    assert started.is_set()
+
+
+def test_reserve_spread_prefixes(tmp_path, monkeypatch):
+    d1, d2 = tmp_path / "d1", tmp_path / "d2"
+    monkeypatch.setattr(disk_admission, "device_available", lambda p: (str(p), 100 if str(p) == str(d1) else 200))
+    args = NoneSpace(spread_prefixes=[d1, d2], free_space_wait=0.01)
+    with disk_admission.reserve(args, 50, [d1, d2]) as destination:
+        assert destination == str(d2)
+
+    args.min_free_space = 100
+    with disk_admission.reserve(args, 100, [d1, d2]) as destination:
+        assert destination == str(d2)
+
+
+def test_reserve_raises_when_it_can_never_fit(tmp_path):
+    args = NoneSpace(min_free_space=0, free_space_wait=0.01)
+    with pytest.raises(disk_admission.InsufficientSpace):
+        with disk_admission.reserve(args, shutil.disk_usage(tmp_path).free * 2, [tmp_path]):
+            pass
@@ -0,0 +1,170 @@
+import threading, time
+
+import pytest
+
+from library.utils.download_scheduler import DownloadScheduler
+
+
+def test_scheduler_keeps_order_with_one_worker():
+    items = [{"path": f"https://{domain}/{i}"} for i, domain in enumerate(["a.com", "b.com", "a.com", "c.com"])]
+    seen = []
+    DownloadScheduler().run(items, lambda m: seen.append(m["path"]))
+    assert seen == [d["path"] for d in items]
+
+
+def test_scheduler_per_domain_limit():
+    items = [{"path": f"https://{domain}/{i}"} for i in range(6) for domain in ("a.com", "b.com")]
+    lock = threading.Lock()
+    active = {"a.com": 0, "b.com": 0}
+    max_active = {"a.com": 0, "b.com": 0}
+
+    def func(m):
+        domain = m["path"].split("/")[2]
+        with lock:
+            active[domain] += 1
+            max_active[domain] = max(max_active[domain], active[domain])
+        time.sleep(0.01)
+        with lock:
+            active[domain] -= 1
+
+    DownloadScheduler(workers=4, per_domain=2).run(items, func)
+    assert max_active == {"a.com": 2, "b.com": 2}
+
+
+def test_scheduler_domain_delay():
+    items = [{"path": f"https://a.com/{i}"} for i in range(3)] + [{"path": "https://b.com/0"}]
+    started = {}
+    DownloadScheduler(workers=2, domain_delay=0.05).run(
+        items, lambda m: started.setdefault(m["path"], time.monotonic())
+    )
+
+    assert started["https://a.com/2"] - started["https://a.com/0"] >= 0.1
+    assert started["https://b.com/0"] < started["https://a.com/1"]
+
+
+def test_scheduler_writes_on_owner_thread():
+    scheduler = DownloadScheduler(workers=3)
+    owner = threading.get_ident()
+    written = []
+
+    def write(path):
+        assert threading.get_ident() == owner
+        written.append(path)
+        return len(written)
+
+    def func(m):
+        assert threading.get_ident() != owner
+        assert scheduler.write(write, m["path"]) > 0
+
+    scheduler.run([{"path": f"https://{i}.com/"} for i in range(5)], func)
+    assert len(written) == 5
+
+
+def test_scheduler_raises_worker_error():
+    def func(m):
+        if m["path"].endswith("/1"):
+            raise ValueError(m["path"])
+
+    with pytest.raises(ValueError, match="/1"):
+        DownloadScheduler(workers=2).run([{"path": f"https://a{i}.com/{i}"} for i in range(4)], func)
+
+
+def test_scheduler_on_result_adds_items():
+    scheduler = DownloadScheduler(workers=3, per_domain=2)
+    seen = []
+
+    def on_result(item, result):
+        seen.append(result)
+        if item["depth"] < 2:
+            for i in range(2):
+                scheduler.add({"path": f"{item['path']}{i}/", "depth": item["depth"] + 1})
+
+    scheduler.add({"path": "https://a.com/", "depth": 0})
+    scheduler.run([], lambda m: m["path"], on_result)
+    assert len(seen) == 1 + 2 + 4
+
+
+def test_scheduler_backoff():
+    scheduler = DownloadScheduler(workers=2)
+    started = []
+
+    def on_result(item, result):
+        scheduler.backoff("a.com", failed=result == "https://a.com/0")
+
+    scheduler.run(
+        [{"path": "https://a.com/0"}, {"path": "https://a.com/1"}],
+        lambda m: started.append(time.monotonic()) or m["path"],
+        on_result,
+    )
+    assert started[1] - started[0] >= 1.0
+    assert "a.com" not in scheduler.backoff_delay  # reset by the second success
+
+
+def test_scheduler_interrupt_fails_pending_writes():
+    items = [{"path": f"https://{domain}/0"} for domain in ("a.com", "b.com")]
+    scheduler = DownloadScheduler(workers=2)
+    events_get = scheduler.events.get
+
+    def interrupted_get(block=True, timeout=None):
+        if not block:  # get_nowait
+            return events_get(block=False)
+        while scheduler.events.qsize() < 2:  # both workers are waiting in write()
+            time.sleep(0.01)
+        raise KeyboardInterrupt
+
+    scheduler.events.get = interrupted_get
+    errors = []
+
+    def func(_m):
+        try:
+            scheduler.write(lambda: None)
+        except KeyboardInterrupt as excinfo:
+            errors.append(excinfo)
+            raise
+
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.run(items, func)
+
+    deadline = time.monotonic() + 5
+    while len(errors) < 2 and time.monotonic() < deadline:  # run() does not wait for the workers
+        time.sleep(0.01)
+    assert len(errors) == 2
+
+    late = []
+    thread = threading.Thread(target=lambda: late.append(pytest.raises(KeyboardInterrupt, scheduler.write, print)))
+    thread.start()
+    thread.join(timeout=5)
+    assert late  # writes after the scheduler stopped fail instead of waiting forever
+
+
+def test_scheduler_one_worker_runs_inline():
+    owner = threading.get_ident()
+
+    def func(_m):
+        assert threading.get_ident() == owner
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        DownloadScheduler().run([{"path": "https://a.com/0"}], func)
+
+
+def test_scheduler_interrupt_does_not_wait_for_running_jobs():
+    scheduler = DownloadScheduler(workers=2)
+    started = threading.Event()
+    release = threading.Event()
+
+    def interrupted_get(block=True, timeout=None):
+        started.wait(timeout=5)
+        raise KeyboardInterrupt
+
+    scheduler.events.get = interrupted_get
+
+    def func(_m):
+        started.set()
+        release.wait(timeout=5)
+
+    start_time = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.run([{"path": "https://a.com/0"}], func)
+    assert time.monotonic() - start_time < 2
+    release.set()
@@ -1,3 +1,8 @@
+import os, sqlite3
+from unittest.mock import patch
+
+import pytest
+
 from library.utils import consts, file_utils
 
 
@@ -76,3 +81,122 @@ def test_read_file_to_dataframes_csv(tmp_path):
     assert len(df) == 2
     assert df.iloc[0]["col1"] == 1
     assert df.iloc[1]["col2"] == "b"
+
+
+def test_read_file_to_dataframe_chunks(tmp_path):
+    f = tmp_path / "test.csv"
+    f.write_text("col1,col2\n" + "".join(f"{i},{chr(97 + i)}\n" for i in range(5)))
+
+    chunks = list(file_utils.read_file_to_dataframe_chunks(str(f), chunk_rows=2))
+    assert [len(df) for _df_name, df in chunks] == [2, 2, 1]
+    assert [v for _df_name, df in chunks for v in df["col2"]] == ["a", "b", "c", "d", "e"]
+
+    db_path = str(tmp_path / "test.db")
+    sqlite3.connect(db_path).executescript(
+        "CREATE TABLE t1 (id INTEGER); INSERT INTO t1 VALUES (1), (2), (3); CREATE TABLE t2 (id INTEGER);"
+    )
+    chunks = list(file_utils.read_file_to_dataframe_chunks(db_path, chunk_rows=2, start_row=1, mimetype="sqlite"))
+    assert [(df_name, df["id"].tolist()) for df_name, df in chunks] == [("t1", [2, 3])]
+
+
+def test_read_file_to_dataframe_chunks_sqlite_keyset(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    sqlite3.connect(db_path).executescript("""
+        CREATE TABLE t1 (id INTEGER, name TEXT);
+        INSERT INTO t1 VALUES (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd'), (5, 'e');
+        CREATE VIEW v1 AS SELECT * FROM t1;
+        CREATE TABLE t2 (id INTEGER PRIMARY KEY, name TEXT) WITHOUT ROWID;
+        INSERT INTO t2 VALUES (1, 'a'), (2, 'b'), (3, 'c');
+        """)
+
+    def read(table, **kwargs):
+        chunks = file_utils.read_file_to_dataframe_chunks(
+            db_path, chunk_rows=2, table_name=table, mimetype="sqlite", **kwargs
+        )
+        return [df.to_dict("records") for _df_name, df in chunks]
+
+    assert read("t1", start_row=1, end_row=3) == [
+        [{"id": 2, "name": "b"}, {"id": 3, "name": "c"}],
+        [{"id": 4, "name": "d"}],
+    ]
+    assert read("t1", columns=["name"], filters=[("id", ">", 2)]) == [[{"name": "c"}, {"name": "d"}], [{"name": "e"}]]
+    assert read("v1", start_row=3) == [[{"id": 4, "name": "d"}, {"id": 5, "name": "e"}]]
+    assert read("t2", order_by="id desc", end_row=2) == [[{"id": 3, "name": "c"}, {"id": 2, "name": "b"}]]
+
+
+def test_read_file_to_dataframe_chunks_arrow(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+
+    f = str(tmp_path / "test.parquet")
+    pd.DataFrame({"id": range(10), "name": [chr(97 + i) for i in range(10)]}).to_parquet(f)
+
+    chunks = list(
+        file_utils.read_file_to_dataframe_chunks(
+            f, chunk_rows=3, columns=["name"], filters=[("id", ">=", 2)], start_row=1, end_row=5
+        )
+    )
+    assert [v for _df_name, df in chunks for v in df["name"]] == ["d", "e", "f", "g", "h"]
+    assert all(df.columns.to_list() == ["name"] for _df_name, df in chunks)
+
+    dfs = file_utils.read_file_to_dataframes(f, start_row=8)
+    assert dfs[0][1]["name"].to_list() == ["i", "j"]
+
+
+def test_read_ahead(tmp_path):
+    f = tmp_path / "test.bin"
+    f.write_bytes(b"0" * 4096)
+
+    file_utils.read_ahead(str(f), 1024)
+    file_utils.read_ahead(str(tmp_path / "missing.bin"), 1024)  # errors are ignored
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="requires procfs")
+def test_is_file_open(tmp_path):
+    f = tmp_path / "open.txt"
+    f.touch()
+    closed = tmp_path / "closed.txt"
+    closed.touch()
+
+    file_utils.open_files_index.snapshot = None
+    with open(f):
+        assert file_utils.is_file_open(str(f))
+        assert not file_utils.is_file_open(closed)
+
+
+def test_open_files_index_reuses_snapshot():
+    file_utils.open_files_index.snapshot = None
+    with patch("library.utils.file_utils.scan_open_files", return_value={"/a"}) as scan:
+        assert file_utils.open_files_index() == {"/a"}
+        assert file_utils.open_files_index() == {"/a"}
+        assert scan.call_count == 1
+
+        file_utils.open_files_index(max_age=0)
+        assert scan.call_count == 2
+    file_utils.open_files_index.snapshot = None
+
+
+def test_get_files_types(tmp_path):
+    png = tmp_path / "image"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 32)
+    folder = tmp_path / "data.json"
+    folder.mkdir()
+
+    media = [
+        {"path": "/x/a.MP4"},
+        {"path": str(folder)},
+        {"path": "/x/b.tar.gz"},
+        {"path": "/x/c.parquet"},
+        {"path": str(png)},
+        {"path": "/x/d.mp4", "type": "keep"},
+    ]
+    file_utils.get_files_types(media)
+    assert [d["type"] for d in media] == [
+        "video/mp4",
+        "directory",
+        "application/x-tar",
+        "Parquet",
+        "Portable Network Graphics file",
+        "keep",
+    ]
+    assert file_utils.mimetype_from_extension.memo[".mp4"] == "video/mp4"
@@ -0,0 +1,85 @@
+import functools, http.server, threading
+
+import pytest
+
+from library.__main__ import library as lb
+from library.utils import http_cache, web
+from library.utils.objects import NoneSpace
+
+
+class CachingHandler(http.server.SimpleHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append((self.command, self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = b'<html><a href="/a.mp4">a</a><a href="/b.mkv">b</a></html>'
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.requests.append((self.command, self.path, None))
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", "1234")
+        self.end_headers()
+
+
+@pytest.fixture
+def server():
+    CachingHandler.requests = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(CachingHandler, directory="."))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_extract_links_conditional_get(server, tmp_path, capsys):
+    cache_path = str(tmp_path / "http_cache.db")
+    lb(["extract-links", "--http-cache", cache_path, server + "/"])
+    first = capsys.readouterr()
+    lb(["extract-links", "--http-cache", cache_path, server + "/"])
+    second = capsys.readouterr()
+
+    assert first.out == second.out == f"{server}/a.mp4\n{server}/b.mkv\n"
+    assert CachingHandler.requests == [("GET", "/", None), ("GET", "/", '"v1"')]
+    assert "1 hits (1 revalidated)" in second.err
+
+
+def test_is_html_ttl(server, tmp_path):
+    web.requests_session()
+    cache = http_cache.open_cache(NoneSpace(http_cache_ttl=3600), str(tmp_path / "http_cache.db"))
+    try:
+        assert web.is_html(NoneSpace(), server + "/a") is False
+        assert web.is_html(NoneSpace(), server + "/a") is False
+    finally:
+        http_cache.close_cache()
+
+    assert CachingHandler.requests == [("HEAD", "/a", None)]
+    assert cache.stats["hits"] == 1
+
+
+def test_head_keeps_cached_content(tmp_path):
+    cache = http_cache.HTTPCache(str(tmp_path / "http_cache.db"), ttl=0)
+    url = "http://127.0.0.1/page"
+
+    cache.put(url, NoneSpace(headers={"ETag": '"v1"', "Content-Type": "text/html"}), b"<html></html>")
+    cache.put(url, NoneSpace(headers={"ETag": '"v1"', "Content-Type": "text/html"}))  # HEAD
+    headers, d = cache.conditional_headers(url)
+    assert headers == {"If-None-Match": '"v1"'}
+    assert cache.not_modified(url, d) == b"<html></html>"
+
+    cache.put(url, NoneSpace(headers={"ETag": '"v2"', "Content-Type": "text/html"}))  # HEAD after a change
+    assert cache.conditional_headers(url) == ({}, None)
+    cache.close()
@@ -208,3 +208,16 @@ def test_domain_from_url(url, expected):
 def test_path_tuple_from_url_parameterized(url, expected_parent_path, expected_filename):
     parent_path, filename = path_utils.path_tuple_from_url(url)
     assert (utils.p(parent_path), utils.p(filename)) == (utils.p(expected_parent_path), utils.p(expected_filename))
+
+
+def test_group_by_prefixes():
+    items = [{"path": "/mnt/d1/a"}, {"path": "/mnt/d10/b"}, {"path": "/mnt/d1/c/d"}, {"path": "/other"}]
+    buckets = path_utils.group_by_prefixes(["/mnt/d1", "/mnt/d1/c", "/mnt/d2"], items)
+    assert buckets == {
+        "/mnt/d1": [{"path": "/mnt/d1/a"}, {"path": "/mnt/d10/b"}, {"path": "/mnt/d1/c/d"}],
+        "/mnt/d1/c": [{"path": "/mnt/d1/c/d"}],
+        "/mnt/d2": [],
+    }
+
+    buckets = path_utils.group_by_prefixes(["/mnt/d1", "/mnt/d1/c"], items, longest=True)
+    assert buckets["/mnt/d1"] == [{"path": "/mnt/d1/a"}, {"path": "/mnt/d10/b"}]
@@ -1,9 +1,9 @@
-import multiprocessing, subprocess, time
-from unittest.mock import Mock, patch
+import multiprocessing, os, subprocess, threading, time
+from unittest.mock import patch
 
 import pytest
 
-from library.utils import processes
+from library.utils import processes, worker_pools
 
 
 def test_sizeout():
@@ -32,21 +32,41 @@ def test_with_timeout_success():
     assert decorated_func() == "success"
 
 
-@patch("library.utils.processes.multiprocessing.Pool")
-def test_with_timeout_failure(mock_pool):
-    pool_instance = Mock()
-    mock_pool.return_value = pool_instance
-    async_result = Mock()
-    async_result.get.side_effect = multiprocessing.TimeoutError
-    pool_instance.apply_async.return_value = async_result
+def slow_function_top_level():
+    time.sleep(5)
+    return "too slow"
+
+
+def pid_top_level():
+    return os.getpid()
 
-    @processes.with_timeout(1)
-    def slow_function():
-        time.sleep(2)
-        return "too slow"
 
+def raise_top_level():
+    raise ValueError("worker error")
+
+
+def test_with_timeout_failure():
     with pytest.raises(multiprocessing.TimeoutError):
-        slow_function()
+        processes.with_timeout(0.2)(slow_function_top_level)()
+
+
+def test_with_timeout_reuses_worker():
+    pool = worker_pools.ProcessTimeoutPool(max_workers=1)
+    try:
+        first_pid = pool.run(2, pid_top_level)
+        assert pool.run(2, pid_top_level) == first_pid
+        assert first_pid != os.getpid()
+
+        with pytest.raises(ValueError, match="worker error"):
+            pool.run(2, raise_top_level)
+        assert pool.run(2, pid_top_level) == first_pid
+
+        with pytest.raises(multiprocessing.TimeoutError):
+            pool.run(0.2, slow_function_top_level)
+        assert pool.worker_count == 0  # stuck worker was killed
+        assert pool.run(2, pid_top_level) != first_pid
+    finally:
+        pool.close()
 
 
 def test_with_timeout_thread_success():
@@ -67,6 +87,19 @@ def test_with_timeout_thread_failure():
         slow_function()
 
 
+def test_with_timeout_thread_replaces_stuck_thread():
+    pool = worker_pools.ThreadTimeoutPool(max_workers=1)
+    release = threading.Event()
+
+    with pytest.raises(TimeoutError):
+        pool.run(0.1, release.wait)
+    assert pool.run(1, lambda: "next") == "next"  # not queued behind the stuck thread
+
+    with pytest.raises(ValueError):
+        pool.run(1, int, ("not a number",))
+    release.set()
+
+
 @patch("subprocess.run")
 def test_cmd_success(mock_run):
     mock_run.return_value = subprocess.CompletedProcess(args=["ls"], returncode=0, stdout="file1\nfile2", stderr="")
@@ -0,0 +1,57 @@
+import json, sys
+
+import pytest
+
+from library.utils import profile_utils
+
+
+def test_span_without_tracer():
+    with profile_utils.span("query") as d:
+        assert d is None
+
+
+def test_tracer_nested_spans():
+    tracer = profile_utils.Tracer()
+    with tracer.span("outer"):
+        with tracer.span("inner", rows=3):
+            pass
+
+    inner, outer = tracer.spans
+    assert inner["path"] == "outer;inner"
+    assert inner["parent"] == "outer"
+    assert inner["depth"] == 1
+    assert inner["args"] == {"rows": 3}
+    assert outer["parent"] is None
+    assert outer["duration"] >= inner["duration"]
+
+
+def test_span_folded_stacks():
+    spans = [
+        {"path": "a;b", "parent": "a", "duration": 4000},
+        {"path": "a", "parent": None, "duration": 10000},
+    ]
+    assert profile_utils.span_folded_stacks(spans) == {"a;b": 4, "a": 6}
+
+
+@pytest.mark.parametrize("mode", profile_utils.PROFILE_MODES)
+def test_profile_run_json(tmp_path, mode):
+    output_path = tmp_path / "profile.json"
+
+    def func():
+        with profile_utils.span("query"):
+            return sum(range(1000))
+
+    assert profile_utils.profile_run(func, "test", mode=mode, output_path=output_path) == 499500
+    assert profile_utils.tracer is None
+
+    data = json.loads(output_path.read_text())
+    assert [e["name"] for e in data["traceEvents"]] == ["test", "query"]
+    assert data["otherData"]["profiler"] == mode
+    assert ("functions" in data["otherData"]) == (mode == "cprofile")
+
+
+def test_profile_run_folded(tmp_path):
+    output_path = tmp_path / "profile.folded"
+    with pytest.raises(SystemExit):
+        profile_utils.profile_run(lambda: sys.exit(2), "test", mode="spans", output_path=output_path)
+    assert output_path.read_text().startswith("test ")
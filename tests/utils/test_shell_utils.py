@@ -1,4 +1,4 @@
-import argparse, errno
+import argparse, errno, os
 from unittest.mock import patch
 
 import pytest
@@ -256,3 +256,13 @@ def test_rglob_warns_and_skips_eio(caplog):
     assert files == {"/base/root.txt", "/base/good_dir/nested.txt"}
     assert folders == {"/base/good_dir", "/base/bad_dir"}
     assert "Skipping folder /base/bad_dir" in caplog.text
+
+
+def test_clone_file(tmp_path):
+    src = tmp_path / "src"
+    src.write_bytes(b"data" * 100_000)
+    os.utime(src, (1_000_000, 1_000_000))
+
+    assert shell_utils.clone_file(str(src), str(tmp_path / "dst")) == str(tmp_path / "dst")
+    assert (tmp_path / "dst").read_bytes() == src.read_bytes()
+    assert (tmp_path / "dst").stat().st_mtime == 1_000_000
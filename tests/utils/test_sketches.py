@@ -0,0 +1,65 @@
+import pytest
+
+from library.utils import sketches
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+
+def test_moments_merge_matches_pandas():
+    values = pd.Series(np.random.default_rng(0).lognormal(size=10_000))
+
+    m = sketches.Moments()
+    for chunk in np.array_split(values.to_numpy(), 7):
+        m.update(chunk)
+
+    assert m.n == len(values)
+    assert m.total == pytest.approx(values.sum())
+    assert (m.min, m.max) == (values.min(), values.max())
+    assert m.mean == pytest.approx(values.mean())
+    assert m.std == pytest.approx(values.std())
+    assert m.skew == pytest.approx(values.skew())
+    assert m.kurt == pytest.approx(values.kurt())
+
+
+def test_quantile_sketch():
+    values = np.random.default_rng(0).normal(size=100_000)
+
+    left, right = sketches.QuantileSketch(seed=0), sketches.QuantileSketch(seed=1)
+    left.update(values[:30_000])
+    for chunk in np.array_split(values[30_000:], 5):
+        right.update(chunk)
+    left.merge(right)
+
+    assert left.n == len(values)
+    assert sum(len(items) for items in left.levels) < 1000
+    for q, estimate in zip([0.1, 0.5, 0.9], left.quantiles([0.1, 0.5, 0.9])):
+        assert abs((values <= estimate).mean() - q) < left.rank_error
+    assert left.ranks([values.max()])[0] == len(values)
+
+
+def test_hyperloglog():
+    h = sketches.HyperLogLog()
+    assert h.count() == 0
+
+    h.update(pd.Series(["a", "b", "a"]))
+    assert h.count() == 2
+
+    other = sketches.HyperLogLog()
+    other.update(pd.Series(range(50_000)).astype(str))
+    h.merge(other)
+    assert h.count() == pytest.approx(50_002, rel=4 * h.relative_error)
+
+
+def test_heavy_hitters():
+    values = pd.Series(np.random.default_rng(0).zipf(1.5, 100_000)).astype(str)
+
+    hh = sketches.HeavyHitters(capacity=50)
+    for chunk in np.array_split(values, 10):
+        hh.update(chunk)
+
+    expected = values.value_counts()
+    assert len(hh.counts) == 50
+    assert hh.counts.index[:5].to_list() == expected.index[:5].to_list()
+    for value, count in hh.counts.items():
+        assert count - hh.errors[value] <= expected[value] <= count